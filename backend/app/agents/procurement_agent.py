@@ -1,9 +1,10 @@
 from app.tools.file_processor import file_processor
-from app.core.llm import llm_engine
+from app.core.llm import llm_engine, is_chat_error
 from app.core.memory import memory_manager
-from app.tools.comparison_engine import comparison_engine
+from app.tools.computer_search import computer_tools
 import os
 import json
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
@@ -26,6 +27,20 @@ class ProcurementAgent:
     }, indent=2)
 
     async def process_new_document(self, file_path: str) -> dict:
+        """Run the pipeline in a worker thread: reads, LLM calls and store writes all block."""
+        return await asyncio.to_thread(self.process_document, file_path)
+
+    def process_document(self, file_path: str) -> dict:
+        """Pipeline result; failures carry an "error" key so the ingestion job is recorded as failed."""
+        result = self._process_document(file_path)
+        if result.get("type") == "Error":
+            result.setdefault("error", result.get("summary"))
+        elif is_chat_error(result.get("summary")) and not result.get("data"):
+            # A quote that was extracted and stored is kept even if its summary failed: a retry would store it twice
+            result["error"] = result["summary"]
+        return result
+
+    def _process_document(self, file_path: str) -> dict:
         logger.info(f"Processing document: {file_path}")
         
         # 1. Read raw content
@@ -37,6 +52,9 @@ class ProcurementAgent:
         
         if not raw_content or len(raw_content.strip()) < 10:
             return {"type": "Error", "summary": "File appears to be empty or unreadable."}
+
+        # Chunk and embed now, while we are off the event loop, so prompts and later chat questions only query
+        computer_tools.index_document(file_path)
         
         # 2. Detect document type
         doc_type = file_processor.detect_document_type(raw_content)
@@ -44,21 +62,38 @@ class ProcurementAgent:
         
         # 3. Process based on type
         if doc_type == "Quotation":
-            return await self._process_quotation(file_path, raw_content)
+            return self._process_quotation(file_path, raw_content)
         elif doc_type == "Purchase Order":
-            return await self._process_po(file_path, raw_content)
+            return self._process_po(file_path, raw_content)
         elif doc_type == "Invoice":
-            return await self._process_invoice(file_path, raw_content)
+            return self._process_invoice(file_path, raw_content)
         else:
-            return await self._process_general(file_path, raw_content, doc_type)
+            return self._process_general(file_path, raw_content, doc_type)
+
+    def extract_quote(self, file_path: str) -> dict:
+        """Read a document and extract quote fields without storing or summarizing (used for bulk ingestion)."""
+        raw_content = file_processor.read_file(file_path)
+        if not raw_content or len(raw_content.strip()) < 10:
+            return {"type": "Error", "error": "File appears to be empty or unreadable."}
+        
+        doc_type = file_processor.detect_document_type(raw_content)
+        if doc_type != "Quotation":
+            return {"type": doc_type}
+        
+        structured = llm_engine.extract_structured_data(raw_content, self.QUOTE_SCHEMA)
+        if "error" in structured:
+            return {"type": doc_type, "error": structured.get("error")}
+        structured['file_path'] = file_path
+        return {"type": doc_type, "data": structured}
 
-    async def _process_quotation(self, file_path: str, raw_content: str) -> dict:
+    def _process_quotation(self, file_path: str, raw_content: str) -> dict:
         """Full pipeline for quotation processing."""
         # Extract structured data
         structured = llm_engine.extract_structured_data(raw_content, self.QUOTE_SCHEMA)
         
         if "error" in structured:
-            return {"type": "Quotation", "summary": f"Extraction issue: {structured.get('error')}", "data": {}}
+            return {"type": "Quotation", "summary": f"Extraction issue: {structured.get('error')}", "data": {},
+                    "error": f"Extraction failed: {structured.get('error')}"}
         
         structured['file_path'] = file_path
         
@@ -68,13 +103,15 @@ class ProcurementAgent:
         
         history = []
         try:
-            history = memory_manager.search_history(f"quotes from {vendor} for {material}")
+            history = memory_manager.search_history(f"quotes from {vendor} for {material}", vendor=vendor)
         except:
             pass
         
-        # Store in memory
+        # Store in memory (the revision diff against this vendor's previous quote is computed on insert)
+        revision = None
         try:
-            memory_manager.store_quote(structured)
+            quote_id = memory_manager.store_quote(structured)
+            revision = memory_manager.get_revision(quote_id)
         except Exception as e:
             logger.error(f"Memory store error: {e}")
         
@@ -89,6 +126,7 @@ class ProcurementAgent:
 **Validity:** {structured.get('validity', 'N/A')}
 
 Historical context: {json.dumps(history[:2]) if history else 'No prior quotes on record.'}
+Revision vs previous quote from this vendor: {json.dumps(revision['fields']) if revision and revision['changed'] else 'None'}
 
 End with a recommendation (accept / negotiate / compare with alternatives).
 """
@@ -98,24 +136,32 @@ End with a recommendation (accept / negotiate / compare with alternatives).
             "type": "Quotation",
             "data": structured,
             "summary": summary,
+            "revision": revision,
             "needs_approval": False
         }
 
-    async def _process_po(self, file_path: str, raw_content: str) -> dict:
+    @staticmethod
+    def _relevant_text(file_path: str, raw_content: str, focus: str, max_chars: int = 3000) -> str:
+        """Short documents go in whole; long ones contribute only the chunks relevant to `focus` (indexed at ingest)."""
+        if len(raw_content) <= max_chars:
+            return raw_content
+        return computer_tools.relevant_content(file_path, focus, k=4, max_chars=max_chars)
+
+    def _process_po(self, file_path: str, raw_content: str) -> dict:
         summary = llm_engine.chat([
-            {"role": "user", "content": f"Summarize this Purchase Order in clean bullet points. Highlight: PO number, vendor, items ordered, total value, delivery date.\n\n{raw_content[:3000]}"}
+            {"role": "user", "content": f"Summarize this Purchase Order in clean bullet points. Highlight: PO number, vendor, items ordered, total value, delivery date.\n\n{self._relevant_text(file_path, raw_content, 'PO number vendor items ordered quantity total value delivery date')}"}
         ])
         return {"type": "Purchase Order", "summary": summary, "data": {}}
 
-    async def _process_invoice(self, file_path: str, raw_content: str) -> dict:
+    def _process_invoice(self, file_path: str, raw_content: str) -> dict:
         summary = llm_engine.chat([
-            {"role": "user", "content": f"Summarize this Invoice. Highlight: invoice number, vendor, amount, due date, payment status.\n\n{raw_content[:3000]}"}
+            {"role": "user", "content": f"Summarize this Invoice. Highlight: invoice number, vendor, amount, due date, payment status.\n\n{self._relevant_text(file_path, raw_content, 'invoice number vendor amount total due date payment status')}"}
         ])
         return {"type": "Invoice", "summary": summary, "data": {}}
 
-    async def _process_general(self, file_path: str, raw_content: str, doc_type: str) -> dict:
+    def _process_general(self, file_path: str, raw_content: str, doc_type: str) -> dict:
         summary = llm_engine.chat([
-            {"role": "user", "content": f"This is a '{doc_type}' document. Provide a concise summary of its contents:\n\n{raw_content[:3000]}"}
+            {"role": "user", "content": f"This is a '{doc_type}' document. Provide a concise summary of its contents:\n\n{self._relevant_text(file_path, raw_content, f'{doc_type} overview purpose key points totals dates parties')}"}
         ])
         return {"type": doc_type, "summary": summary, "data": {}}
 
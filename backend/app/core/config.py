@@ -7,7 +7,40 @@ class Settings(BaseSettings):
     WORKSPACE_ROOT: str = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "workspace")
     GMAIL_USER: str = ""
     GMAIL_APP_PASSWORD: str = ""
+    # Outgoing mail; point at a local stand-in (e.g. SMTP_HOST=localhost SMTP_PORT=1025 SMTP_SECURITY=none) for testing
+    SMTP_HOST: str = "smtp.gmail.com"
+    SMTP_PORT: int = 465
+    SMTP_SECURITY: str = "ssl"  # "ssl", "starttls" or "none"
+    SMTP_FROM: str = ""  # Defaults to GMAIL_USER
+    EMAIL_BATCH_SIZE: int = 20  # Messages sent per SMTP session
+    EMAIL_MAX_ATTEMPTS: int = 5
+    # Embeddings for the vector store: "onnx" (Chroma's bundled MiniLM), "sentence-transformers" or "hashing" (no model)
+    EMBEDDING_BACKEND: str = "onnx"
+    EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"
+    EMBEDDING_MODEL_DIR: str = ""  # Pre-downloaded model folder for fully offline use
+    EMBEDDING_BATCH_SIZE: int = 64
+    BASE_CURRENCY: str = "INR"  # Quote comparisons are normalized to this currency
+    INGEST_CONCURRENCY: int = 2  # Documents processed in parallel by the folder watcher
+    INGEST_SETTLE_SECONDS: float = 2.0  # Size/mtime must be stable this long before a new file is read
+    # "auto" polls network shares / bind mounts and uses native events elsewhere; "poll" or "native" force one
+    WATCH_MODE: str = "auto"
+    WATCH_PATHS: str = ""  # Extra trees to watch recursively, ';'-separated (e.g. /host_capex)
+    POLL_MIN_INTERVAL: float = 2.0
+    POLL_MAX_INTERVAL: float = 60.0
+    POLL_DEEP_MINUTES: float = 15.0  # How often all files are re-stat'ed to catch in-place edits
+    # Full-text index of document contents ("files containing ..."); empty roots = workspace folders + WATCH_PATHS
+    CONTENT_INDEX_ROOTS: str = ""
+    CONTENT_INDEX_INTERVAL: float = 300.0  # Seconds between incremental rescans
+    CONTENT_INDEX_FULL_HOURS: float = 6.0  # Rescans in between only re-list directories whose mtime moved
+    CONTENT_INDEX_MAX_MB: int = 50
+    TRANSFER_CONCURRENCY: int = 4  # Files copied in parallel by a bulk copy/move job
+    # Multi-worker serving: one elected worker runs the watcher/ingestion, the rest serve requests
+    WORKERS: int = 1  # uvicorn worker processes (run_local.py --workers N sets this)
+    LEADER_RETRY_SECONDS: float = 5.0  # How often non-leader workers retry the leader lock (failover delay)
+    CHROMA_SERVER: str = ""  # host:port of a shared `chroma run` server; required for WORKERS > 1
     
+    @property
+    def WATCH_PATH_LIST(self): return [p.strip() for p in self.WATCH_PATHS.split(";") if p.strip()]
     @property
     def DB_PATH(self): return os.path.join(self.WORKSPACE_ROOT, "memory", "procurement.db")
     @property
@@ -24,6 +57,16 @@ class Settings(BaseSettings):
     def OUTPUT_DIR(self): return os.path.join(self.WORKSPACE_ROOT, "output")
     @property
     def MEMORY_DIR(self): return os.path.join(self.WORKSPACE_ROOT, "memory")
+    @property
+    def ANALYTICS_DIR(self): return os.path.join(self.OUTPUT_DIR, "analytics")
+    @property
+    def EMBEDDING_CACHE_PATH(self): return os.path.join(self.MEMORY_DIR, "embeddings.db")
+    @property
+    def CONTENT_INDEX_PATH(self): return os.path.join(self.MEMORY_DIR, "content_index.db")
+    @property
+    def FX_RATES_PATH(self): return os.path.join(self.MEMORY_DIR, "fx_rates.json")
+    @property
+    def KNOWN_LOCATIONS_PATH(self): return os.path.join(self.MEMORY_DIR, "known_locations.json")
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,154 @@
+import sqlite3
+import asyncio
+import logging
+import threading
+from contextlib import contextmanager, asynccontextmanager
+from typing import Any, Dict, List, Optional, Sequence
+
+import aiosqlite
+
+logger = logging.getLogger(__name__)
+
+PRAGMAS = [
+    "PRAGMA journal_mode=WAL",        # Readers never block the writer
+    "PRAGMA synchronous=NORMAL",      # Safe with WAL, far fewer fsyncs
+    "PRAGMA busy_timeout=5000",       # Wait for the write lock instead of failing with "database is locked"
+    "PRAGMA foreign_keys=ON",
+]
+
+
+class Database:
+    """SQLite access layer: WAL mode, one connection per thread and a small aiosqlite pool for async callers."""
+
+    def __init__(self, path: str, async_pool_size: int = 4):
+        self.path = path
+        self.async_pool_size = async_pool_size
+        self._local = threading.local()
+        self._write_lock = threading.RLock()
+        self._pool: Optional[asyncio.Queue] = None
+        self._pool_loop = None
+        self._pool_created = 0
+
+    # ─── SYNC (per-thread connections) ─────────────────────────────────
+
+    def _apply_pragmas(self, conn: sqlite3.Connection):
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+
+    def connection(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            self._apply_pragmas(conn)
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """Run several statements as one transaction (one commit, rolled back on error). Nests safely."""
+        conn = self.connection()
+        # Serialize writers inside this process; other processes wait on busy_timeout
+        with self._write_lock:
+            depth = getattr(self._local, "depth", 0)
+            cursor = conn.cursor()
+            self._local.depth = depth + 1
+            try:
+                if depth == 0:
+                    cursor.execute("BEGIN IMMEDIATE")
+                yield cursor
+                if depth == 0:
+                    conn.commit()
+            except Exception:
+                if depth == 0:
+                    conn.rollback()
+                raise
+            finally:
+                self._local.depth = depth
+                cursor.close()
+
+    def execute(self, sql: str, params: Sequence[Any] = ()) -> sqlite3.Cursor:
+        with self.transaction() as cursor:
+            cursor.execute(sql, params)
+            return cursor
+
+    def fetch_all(self, sql: str, params: Sequence[Any] = ()) -> List[Dict[str, Any]]:
+        cursor = self.connection().execute(sql, params)
+        try:
+            if cursor.description is None:
+                return []
+            columns = [col[0] for col in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+
+    def fetch_one(self, sql: str, params: Sequence[Any] = ()) -> Optional[tuple]:
+        cursor = self.connection().execute(sql, params)
+        try:
+            return cursor.fetchone()
+        finally:
+            cursor.close()
+
+    # ─── ASYNC (aiosqlite pool) ────────────────────────────────────────
+
+    async def _new_async_connection(self) -> aiosqlite.Connection:
+        conn = aiosqlite.connect(self.path, timeout=5.0)
+        # Pooled connections live for the whole process; don't let their threads block interpreter exit
+        conn.daemon = True
+        await conn
+        for pragma in PRAGMAS:
+            await conn.execute(pragma)
+        return conn
+
+    @asynccontextmanager
+    async def async_connection(self):
+        """Borrow a pooled aiosqlite connection so endpoints never block the event loop."""
+        loop = asyncio.get_running_loop()
+        if self._pool is None or self._pool_loop is not loop:
+            self._pool = asyncio.Queue()
+            self._pool_loop = loop
+            self._pool_created = 0
+
+        if self._pool.empty() and self._pool_created < self.async_pool_size:
+            self._pool_created += 1
+            try:
+                conn = await self._new_async_connection()
+            except Exception:
+                self._pool_created -= 1
+                raise
+        else:
+            conn = await self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put_nowait(conn)
+
+    async def fetch_all_async(self, sql: str, params: Sequence[Any] = ()) -> List[Dict[str, Any]]:
+        async with self.async_connection() as conn:
+            async with conn.execute(sql, params) as cursor:
+                if cursor.description is None:
+                    return []
+                columns = [col[0] for col in cursor.description]
+                return [dict(zip(columns, row)) for row in await cursor.fetchall()]
+
+    async def execute_async(self, sql: str, params: Sequence[Any] = ()):
+        async with self.async_connection() as conn:
+            await conn.execute(sql, params)
+            await conn.commit()
+
+    async def close_async(self):
+        if self._pool is None:
+            return
+        while not self._pool.empty():
+            conn = self._pool.get_nowait()
+            try:
+                await conn.close()
+            except Exception as e:
+                logger.warning(f"Error closing async connection: {e}")
+        self._pool_created = 0
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
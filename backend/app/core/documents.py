@@ -0,0 +1,113 @@
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.database import Database
+
+logger = logging.getLogger(__name__)
+
+CHUNK_CHARS = 1200
+CHUNK_OVERLAP = 150
+
+
+def chunk_sections(sections: List[Tuple[str, str]], size: int = CHUNK_CHARS,
+                   overlap: int = CHUNK_OVERLAP) -> List[Dict[str, Any]]:
+    """
+    Split (label, text) sections into ~`size`-char chunks on line boundaries, with a small overlap
+    so a sentence cut at a boundary is still retrievable. Chunks never span sections.
+    """
+    chunks = []
+    for label, text in sections:
+        pieces = []
+        for line in (text or "").splitlines():
+            line = line.strip()
+            # Very long lines (e.g. a PDF page without line breaks) are hard-split
+            while len(line) > size:
+                pieces.append(line[:size])
+                line = line[size - overlap:]
+            if line:
+                pieces.append(line)
+        current = ""
+        for piece in pieces:
+            if current and len(current) + len(piece) + 1 > size:
+                chunks.append({"section": label, "text": current})
+                current = current[-overlap:] + "\n" + piece
+            else:
+                current = f"{current}\n{piece}" if current else piece
+        if current:
+            chunks.append({"section": label, "text": current})
+    for i, chunk in enumerate(chunks):
+        chunk["index"] = i
+    return chunks
+
+
+class DocumentStore:
+    """
+    Processed documents split into chunks and embedded in their own Chroma collection, so prompts can
+    carry only the sections relevant to a question. Re-indexing happens only when size/mtime change.
+    """
+
+    def __init__(self, db: Database, collection):
+        self.db = db
+        self.collection = collection
+
+    def create_schema(self, cursor):
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS document_index (
+                path TEXT PRIMARY KEY,
+                size INTEGER,
+                mtime REAL,
+                chunk_count INTEGER,
+                char_count INTEGER,
+                indexed_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+    def info(self, path: str) -> Optional[Dict[str, Any]]:
+        rows = self.db.fetch_all("SELECT * FROM document_index WHERE path = ?", (path,))
+        return rows[0] if rows else None
+
+    def is_current(self, path: str, size: int, mtime: float) -> bool:
+        info = self.info(path)
+        return info is not None and info["size"] == size and info["mtime"] == mtime
+
+    def index_document(self, path: str, sections: List[Tuple[str, str]], size: int = None,
+                       mtime: float = None) -> int:
+        """(Re)chunk and embed a document. Returns the number of chunks stored."""
+        chunks = chunk_sections(sections)
+        old = self.info(path)
+        if old and old["chunk_count"]:
+            self.collection.delete(ids=[f"{path}#{i}" for i in range(old["chunk_count"])])
+        for i in range(0, len(chunks), 256):
+            batch = chunks[i:i + 256]
+            self.collection.upsert(
+                ids=[f"{path}#{c['index']}" for c in batch],
+                documents=[c["text"] for c in batch],
+                metadatas=[{"path": path, "section": c["section"], "chunk": c["index"]}
+                           for c in batch],
+            )
+        self.db.execute("""
+            INSERT OR REPLACE INTO document_index (path, size, mtime, chunk_count, char_count, indexed_at)
+            VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        """, (path, size, mtime, len(chunks), sum(len(t or "") for _, t in sections)))
+        return len(chunks)
+
+    def retrieve(self, question: str, paths: List[str], k: int = 5) -> List[Dict[str, Any]]:
+        """Top-k chunks of the given documents for a question, most relevant first."""
+        if not paths:
+            return []
+        marks = ", ".join("?" * len(paths))
+        row = self.db.fetch_one(f"SELECT SUM(chunk_count) FROM document_index WHERE path IN ({marks})", paths)
+        available = (row[0] or 0) if row else 0
+        if not available:
+            return []
+        where = {"path": paths[0]} if len(paths) == 1 else {"path": {"$in": paths}}
+        results = self.collection.query(query_texts=[question], n_results=min(k, available), where=where)
+        return [{"path": meta["path"], "section": meta["section"], "chunk": meta["chunk"],
+                 "text": doc, "distance": round(dist, 4)}
+                for doc, meta, dist in zip(results["documents"][0], results["metadatas"][0], results["distances"][0])]
+
+    @staticmethod
+    def format_context(chunks: List[Dict[str, Any]]) -> str:
+        """Retrieved chunks in document order, each labelled with its section for citation."""
+        ordered = sorted(chunks, key=lambda c: (c["path"], c["chunk"]))
+        return "\n\n".join(f"[{c['section']}, part {c['chunk'] + 1}]\n{c['text']}" for c in ordered)
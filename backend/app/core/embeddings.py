@@ -0,0 +1,159 @@
+import re
+import math
+import time
+import hashlib
+import logging
+import threading
+from array import array
+from typing import Dict, List, Any, Optional
+
+from app.core.config import settings
+from app.core.database import Database
+
+logger = logging.getLogger(__name__)
+
+# Same shapes as chromadb.api.types; declared here so importing this module does not load chromadb
+Documents = List[str]
+Embeddings = List[List[float]]
+
+
+class HashingEmbedding:
+    """Model-free embedding (signed feature hashing of word uni/bigrams). Always available offline."""
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def __call__(self, input: Documents) -> Embeddings:
+        vectors = []
+        for text in input:
+            vec = [0.0] * self.dim
+            tokens = re.findall(r"[a-z0-9]+", text.lower())
+            for feature in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+                h = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little")
+                vec[h % self.dim] += 1.0 if (h >> 63) else -1.0
+            norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+            vectors.append([v / norm for v in vec])
+        return vectors
+
+
+def _load_backend(backend: str, model: str, model_dir: str):
+    """Instantiate the configured local embedding model."""
+    backend = backend.lower()
+    if backend == "hashing":
+        return HashingEmbedding()
+    if backend == "sentence-transformers":
+        from chromadb.utils.embedding_functions import SentenceTransformerEmbeddingFunction
+        return SentenceTransformerEmbeddingFunction(model_name=model_dir or model)
+    if backend == "onnx":
+        from chromadb.utils.embedding_functions import ONNXMiniLM_L6_V2
+        if model_dir:
+            # Point Chroma at a pre-extracted model so nothing is downloaded
+            class _LocalONNX(ONNXMiniLM_L6_V2):
+                DOWNLOAD_PATH = model_dir
+            return _LocalONNX()
+        return ONNXMiniLM_L6_V2()
+    raise ValueError(f"Unknown EMBEDDING_BACKEND: {backend}")
+
+
+class CachedEmbeddingFunction:
+    """
+    Chroma embedding function that batches model calls and caches vectors by content hash,
+    so re-ingesting a document or repeating a query never hits the model twice.
+    """
+
+    def __init__(self, backend: str = None, model: str = None, model_dir: str = None,
+                 batch_size: int = None, cache_path: str = None):
+        self.backend_name = backend or settings.EMBEDDING_BACKEND
+        self.model_name = model or settings.EMBEDDING_MODEL
+        self.model_dir = model_dir if model_dir is not None else settings.EMBEDDING_MODEL_DIR
+        self.batch_size = batch_size or settings.EMBEDDING_BATCH_SIZE
+        # Cache lives in its own file so embedding writes never contend with quote writes
+        self.cache = Database(cache_path or settings.EMBEDDING_CACHE_PATH)
+        with self.cache.transaction() as cursor:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS embedding_cache (
+                    key TEXT PRIMARY KEY,
+                    vector BLOB
+                )
+            """)
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats = {"calls": 0, "texts": 0, "cache_hits": 0, "cache_misses": 0,
+                      "model_batches": 0, "model_seconds": 0.0}
+
+    @property
+    def model(self):
+        # Loaded on first cache miss; fully cached workloads never load the model
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    self._model = _load_backend(self.backend_name, self.model_name, self.model_dir)
+        return self._model
+
+    @property
+    def signature(self) -> str:
+        """Which vector space this function produces; vectors from different signatures must not be mixed."""
+        return f"{self.backend_name}:{self.model_name}"
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.signature}\x00{text}".encode("utf-8")).hexdigest()
+
+    def _cache_get(self, keys: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        # Stay well below SQLite's bound-parameter limit
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            rows = self.cache.fetch_all(
+                f"SELECT key, vector FROM embedding_cache WHERE key IN ({','.join('?' * len(chunk))})", chunk)
+            for row in rows:
+                found[row["key"]] = array("f", row["vector"]).tolist()
+        return found
+
+    def _cache_put(self, items: Dict[str, List[float]]):
+        with self.cache.transaction() as cursor:
+            cursor.executemany("INSERT OR REPLACE INTO embedding_cache (key, vector) VALUES (?, ?)",
+                               [(k, array("f", v).tobytes()) for k, v in items.items()])
+
+    def __call__(self, input: Documents) -> Embeddings:
+        keys = [self._key(t) for t in input]
+        cached = self._cache_get(list(dict.fromkeys(keys)))
+
+        # Embed each distinct missing text once, in model-sized batches
+        missing = {}
+        for key, text in zip(keys, input):
+            if key not in cached:
+                missing.setdefault(key, text)
+        fresh = {}
+        miss_keys = list(missing)
+        for i in range(0, len(miss_keys), self.batch_size):
+            batch_keys = miss_keys[i:i + self.batch_size]
+            started = time.perf_counter()
+            vectors = self.model([missing[k] for k in batch_keys])
+            elapsed = time.perf_counter() - started
+            fresh.update({k: [float(x) for x in v] for k, v in zip(batch_keys, vectors)})
+            with self._stats_lock:
+                self.stats["model_batches"] += 1
+                self.stats["model_seconds"] += elapsed
+        if fresh:
+            self._cache_put(fresh)
+
+        with self._stats_lock:
+            self.stats["calls"] += 1
+            self.stats["texts"] += len(input)
+            self.stats["cache_misses"] += len(missing)
+            self.stats["cache_hits"] += len(input) - len(missing)
+        cached.update(fresh)
+        return [cached[k] for k in keys]
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self.stats)
+        looked_up = stats["cache_hits"] + stats["cache_misses"]
+        stats["backend"] = self.backend_name
+        stats["model"] = self.model_name
+        stats["cache_hit_rate"] = round(stats["cache_hits"] / looked_up, 3) if looked_up else None
+        stats["model_texts_per_sec"] = round(stats["cache_misses"] / stats["model_seconds"], 1) if stats["model_seconds"] else None
+        stats["model_seconds"] = round(stats["model_seconds"], 3)
+        stats["cached_vectors"] = self.cache.fetch_one("SELECT COUNT(*) FROM embedding_cache")[0]
+        return stats
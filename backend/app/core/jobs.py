@@ -0,0 +1,163 @@
+import json
+from typing import Any, Dict, List, Optional
+
+from app.core.database import Database
+from app.core.leader import leader_election
+
+STATUSES = ("pending", "running", "done", "failed")
+MAX_ATTEMPTS = 3  # Failed pipeline runs (LLM or extraction errors) are retried on restart up to this many runs
+# Failures about the file version itself; retrying cannot help
+MISSING_ERROR = "File no longer exists"
+SUPERSEDED_ERROR = "Superseded by a newer version of the file"
+
+
+class JobStore:
+    """
+    Durable record of every watched-folder document: one job per file version (path, size, mtime),
+    moving pending -> running -> done/failed with its result and duration.
+    """
+
+    def __init__(self, db: Database):
+        self.db = db
+
+    def create_schema(self, cursor):
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS ingest_jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                path TEXT NOT NULL,
+                size INTEGER,
+                mtime REAL,
+                digest TEXT,
+                source TEXT,
+                status TEXT NOT NULL DEFAULT 'pending',
+                doc_type TEXT,
+                result_json TEXT,
+                error TEXT,
+                attempts INTEGER DEFAULT 0,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                started_at TEXT,
+                finished_at TEXT,
+                duration_seconds REAL,
+                worker TEXT
+            )
+        """)
+        cursor.execute("PRAGMA table_info(ingest_jobs)")
+        if "worker" not in {row[1] for row in cursor.fetchall()}:
+            cursor.execute("ALTER TABLE ingest_jobs ADD COLUMN worker TEXT")  # Process running the job
+        cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_version ON ingest_jobs(path, size, mtime)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON ingest_jobs(status, id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_digest ON ingest_jobs(digest)")
+
+    # ─── WRITES ────────────────────────────────────────────────────────
+
+    def enqueue(self, path: str, size: int, mtime: float, source: str = "watcher") -> Dict[str, Any]:
+        """Create the job for this file version, or return the existing one (never duplicates work)."""
+        with self.db.transaction() as cursor:
+            cursor.execute("""
+                INSERT INTO ingest_jobs (path, size, mtime, source) VALUES (?, ?, ?, ?)
+                ON CONFLICT(path, size, mtime) DO NOTHING
+            """, (path, size, mtime, source))
+            created = cursor.rowcount > 0
+        job = self.find(path, size, mtime)
+        job["created"] = created
+        return job
+
+    def start(self, job_id: int, digest: str = None) -> bool:
+        """Claim the job for this process; False if another live worker process is already running it."""
+        claim = """
+            UPDATE ingest_jobs SET status = 'running', digest = COALESCE(?, digest), worker = ?,
+                   attempts = attempts + 1, started_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND {}
+        """
+        worker = leader_election.claim_id()
+        if self.db.execute(claim.format("status != 'running'"), (digest, worker, job_id)).rowcount:
+            return True
+        row = self.db.fetch_one("SELECT worker FROM ingest_jobs WHERE id = ? AND status = 'running'", (job_id,))
+        if row is None or leader_election.is_alive(row[0]):
+            return False
+        # Left 'running' by a worker that crashed
+        return self.db.execute(claim.format("status = 'running' AND worker IS ?"),
+                               (digest, worker, job_id, row[0])).rowcount > 0
+
+    def finish(self, job_id: int, result: Dict[str, Any], duration: float = None):
+        self.db.execute("""
+            UPDATE ingest_jobs SET status = 'done', doc_type = ?, result_json = ?, error = NULL,
+                   finished_at = CURRENT_TIMESTAMP, duration_seconds = ?
+            WHERE id = ?
+        """, ((result or {}).get("type"), json.dumps(result, default=str), duration, job_id))
+
+    def fail(self, job_id: int, error: str, duration: float = None):
+        self.db.execute("""
+            UPDATE ingest_jobs SET status = 'failed', error = ?, finished_at = CURRENT_TIMESTAMP,
+                   duration_seconds = ?
+            WHERE id = ?
+        """, (error, duration, job_id))
+
+    def recover_interrupted(self) -> int:
+        """Jobs left 'running' by a crash or restart go back to 'pending' (not those another live worker is running)."""
+        return leader_election.recover_dead_claims(self.db, "ingest_jobs", "status = 'running'", "status = 'pending'")
+
+    def retry_failed(self, max_attempts: int = MAX_ATTEMPTS) -> int:
+        """Failed runs with attempts left go back to 'pending' (not versions that are gone or superseded)."""
+        return self.db.execute("""
+            UPDATE ingest_jobs SET status = 'pending'
+            WHERE status = 'failed' AND attempts BETWEEN 1 AND ? AND error NOT IN (?, ?)
+        """, (max_attempts - 1, MISSING_ERROR, SUPERSEDED_ERROR)).rowcount
+
+    # ─── READS ─────────────────────────────────────────────────────────
+
+    def _row(self, row: Optional[Dict[str, Any]], include_result: bool = True) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        result_json = row.pop("result_json", None)
+        if include_result:
+            row["result"] = json.loads(result_json) if result_json else None
+        return row
+
+    def get(self, job_id: int) -> Optional[Dict[str, Any]]:
+        rows = self.db.fetch_all("SELECT * FROM ingest_jobs WHERE id = ?", (job_id,))
+        return self._row(rows[0] if rows else None)
+
+    def find(self, path: str, size: int, mtime: float) -> Optional[Dict[str, Any]]:
+        rows = self.db.fetch_all("SELECT * FROM ingest_jobs WHERE path = ? AND size = ? AND mtime = ?",
+                                 (path, size, mtime))
+        return self._row(rows[0] if rows else None, include_result=False)
+
+    def find_done_by_digest(self, digest: str, exclude_id: int = None) -> Optional[int]:
+        row = self.db.fetch_one("SELECT id FROM ingest_jobs WHERE digest = ? AND status = 'done' AND id != ? LIMIT 1",
+                                (digest, exclude_id or -1))
+        return row[0] if row else None
+
+    def pending(self) -> List[Dict[str, Any]]:
+        return self.db.fetch_all("SELECT id, path, size, mtime FROM ingest_jobs WHERE status = 'pending' ORDER BY id")
+
+    def known_versions(self, paths: List[str]) -> set:
+        """(path, size, mtime) of every job among `paths` (used by the startup scan)."""
+        known = set()
+        for i in range(0, len(paths), 500):
+            chunk = paths[i:i + 500]
+            rows = self.db.fetch_all(
+                f"SELECT path, size, mtime FROM ingest_jobs WHERE path IN ({', '.join('?' * len(chunk))})", chunk)
+            known.update((r["path"], r["size"], r["mtime"]) for r in rows)
+        return known
+
+    def list(self, status: str = None, cursor: int = None, limit: int = 50) -> Dict[str, Any]:
+        """Newest first, keyset-paginated like /quotes; results are fetched per job."""
+        limit = max(1, min(limit, 500))
+        clauses, params = [], []
+        if status:
+            clauses.append("status = ?"); params.append(status)
+        if cursor:
+            clauses.append("id < ?"); params.append(cursor)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self.db.fetch_all(f"""
+            SELECT id, path, size, source, status, doc_type, error, attempts, created_at, started_at,
+                   finished_at, duration_seconds
+            FROM ingest_jobs {where} ORDER BY id DESC LIMIT ?
+        """, (*params, limit + 1))
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        counts = {s: 0 for s in STATUSES}
+        counts.update({r["status"]: r["n"] for r in
+                       self.db.fetch_all("SELECT status, COUNT(*) AS n FROM ingest_jobs GROUP BY status")})
+        return {"items": rows, "next_cursor": rows[-1]["id"] if has_more else None, "counts": counts}
@@ -0,0 +1,222 @@
+import re
+import math
+import time
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Any
+
+from app.core.database import Database
+
+logger = logging.getLogger(__name__)
+
+STOP_WORDS = {
+    "the", "a", "an", "user", "users", "user's", "s", "is", "are", "to", "of", "in", "on", "for", "by",
+    "and", "or", "their", "his", "her", "my", "with", "at", "be", "that", "this", "it", "as",
+}
+# Verbs the fact extractor uses interchangeably
+SYNONYMS = {"lik": "prefer", "want": "prefer", "lov": "prefer", "favor": "prefer", "favour": "prefer",
+            "organis": "organiz", "arrang": "sort", "order": "sort", "folder": "dir", "directory": "dir"}
+
+
+def _stem(word: str) -> str:
+    if not word.isalpha():
+        return word  # Paths, drive letters and numbers must match exactly
+    for suffix in ("sses", "shes", "ches", "xes", "ing", "ed", "s"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 2:
+            # "classes" -> "class", "boxes" -> "box", "sorting" -> "sort", "files" -> "file"
+            word = word[:-2] if suffix.endswith("es") and len(suffix) > 2 else word[: -len(suffix)]
+            break
+    if word.endswith("e") and len(word) >= 4:
+        word = word[:-1]  # "like"/"liking" -> "lik", "organize"/"organizing" -> "organiz"
+    return SYNONYMS.get(word, word)
+
+
+# Wording the fact extractor varies freely; any other differing token (a folder, vendor, project, sort key,
+# path or number) means the facts say different things and must not be merged
+PHRASING_WORDS = {_stem(w) for w in [
+    "prefers", "always", "usually", "often", "typically", "generally", "normally", "mostly", "tends",
+    "keeps", "files", "folders", "documents", "items", "things", "them", "all", "should", "would", "wants",
+]}
+
+
+def _is_specific(token: str) -> bool:
+    """Tokens other than interchangeable phrasing make facts different even if most of the wording matches."""
+    return token not in PHRASING_WORDS
+
+
+def fact_tokens(fact: str) -> frozenset:
+    """Content-word signature of a fact, robust to phrasing ("prefers sorting" vs "likes sorting files")."""
+    words = re.findall(r"[a-z0-9:/\\._'-]+", fact.lower())
+    return frozenset(_stem(w.strip("'.-")) for w in words if w.strip("'.-") and w.strip("'.-") not in STOP_WORDS)
+
+
+def fact_key(fact: str) -> str:
+    return " ".join(sorted(fact_tokens(fact)))
+
+
+def _cosine(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    na = math.sqrt(sum(x * x for x in a)) or 1.0
+    nb = math.sqrt(sum(y * y for y in b)) or 1.0
+    return dot / (na * nb)
+
+
+class KnowledgeStore:
+    """
+    Learned facts with indexed exact lookup, near-duplicate merging, time-decayed ranking
+    and a cached prompt block that is only rebuilt after a write (by this or another worker process).
+    """
+
+    JACCARD_THRESHOLD = 0.6
+    COSINE_THRESHOLD = 0.9
+
+    def __init__(self, db: Database, embed: Optional[Callable[[List[str]], List[List[float]]]] = None,
+                 half_life_days: float = 30.0):
+        self.db = db
+        self.embed = embed
+        self.half_life_days = half_life_days
+        self._lock = threading.RLock()
+        self._facts: Optional[List[Dict[str, Any]]] = None
+        self._prompt_cache: Dict[tuple, str] = {}
+        self._revision: Optional[int] = None
+
+    def migrate(self, cursor):
+        """Add the normalized key column + indexes to databases created before they existed."""
+        cursor.execute("PRAGMA table_info(personal_knowledge)")
+        columns = {row[1] for row in cursor.fetchall()}
+        if "fact_key" not in columns:
+            cursor.execute("ALTER TABLE personal_knowledge ADD COLUMN fact_key TEXT")
+            cursor.execute("SELECT id, fact FROM personal_knowledge")
+            cursor.executemany("UPDATE personal_knowledge SET fact_key = ? WHERE id = ?",
+                               [(fact_key(fact or ""), fid) for fid, fact in cursor.fetchall()])
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_knowledge_key ON personal_knowledge(fact_key)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_knowledge_category ON personal_knowledge(category)")
+        # Bumped by every write, so a worker checks for other workers' writes with one primary-key lookup
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS knowledge_revision (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                revision INTEGER NOT NULL
+            )
+        """)
+        cursor.execute("INSERT OR IGNORE INTO knowledge_revision (id, revision) VALUES (1, 0)")
+
+    # ─── CACHE ─────────────────────────────────────────────────────────
+
+    def _load(self) -> List[Dict[str, Any]]:
+        if self._facts is None:
+            rows = self.db.fetch_all("SELECT id, category, fact, usage_count, last_used FROM personal_knowledge")
+            for row in rows:
+                row["tokens"] = fact_tokens(row["fact"] or "")
+                row["vector"] = None
+            self._facts = rows
+        return self._facts
+
+    def _invalidate_prompt(self):
+        self._prompt_cache.clear()
+
+    def _read_revision(self) -> int:
+        return self.db.fetch_one("SELECT revision FROM knowledge_revision WHERE id = 1")[0]
+
+    def _sync(self):
+        """Drop the caches when the table changed outside this process (another uvicorn worker stored a fact)."""
+        revision = self._read_revision()
+        if revision != self._revision:
+            self._facts = None
+            self._prompt_cache.clear()
+            self._revision = revision
+
+    # ─── WRITES ────────────────────────────────────────────────────────
+
+    def _find_duplicate(self, category: str, fact: str, tokens: frozenset) -> Optional[Dict[str, Any]]:
+        key = " ".join(sorted(tokens))
+        row = self.db.fetch_one("SELECT id FROM personal_knowledge WHERE fact_key = ? AND category = ? LIMIT 1",
+                                (key, category))
+        if row:
+            return next((f for f in self._load() if f["id"] == row[0]), None)
+
+        candidates = [f for f in self._load() if f["category"] == category
+                      and not any(_is_specific(t) for t in tokens ^ f["tokens"])]
+        best, best_score = None, 0.0
+        for f in candidates:
+            union = len(tokens | f["tokens"])
+            score = len(tokens & f["tokens"]) / union if union else 0.0
+            if score > best_score:
+                best, best_score = f, score
+        if best is not None and best_score >= self.JACCARD_THRESHOLD:
+            return best
+
+        if self.embed and candidates:
+            try:
+                missing = [f for f in candidates if f["vector"] is None]
+                if missing:
+                    for f, vec in zip(missing, self.embed([f["fact"] for f in missing])):
+                        f["vector"] = vec
+                vec = self.embed([fact])[0]
+                scored = max(candidates, key=lambda f: _cosine(vec, f["vector"]))
+                if _cosine(vec, scored["vector"]) >= self.COSINE_THRESHOLD:
+                    return scored
+            except Exception as e:
+                logger.warning(f"Semantic dedupe skipped: {e}")
+        return None
+
+    def store(self, category: str, fact: str) -> Dict[str, Any]:
+        """Store a fact, or bump usage of an existing fact that says the same thing."""
+        fact = fact.strip()
+        tokens = fact_tokens(fact)
+        now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        with self._lock:
+            self._sync()
+            dup = self._find_duplicate(category, fact, tokens)
+            with self.db.transaction() as cursor:
+                cursor.execute("SELECT revision FROM knowledge_revision WHERE id = 1")
+                seen = cursor.fetchone()[0]
+                cursor.execute("UPDATE knowledge_revision SET revision = revision + 1 WHERE id = 1")
+                if dup:
+                    cursor.execute("UPDATE personal_knowledge SET usage_count = usage_count + 1, last_used = ? WHERE id = ?",
+                                   (now, dup["id"]))
+                    dup["usage_count"] += 1
+                    dup["last_used"] = now
+                    result = {"status": "merged", "id": dup["id"], "fact": dup["fact"]}
+                else:
+                    cursor.execute("INSERT INTO personal_knowledge (category, fact, fact_key, last_used) VALUES (?, ?, ?, ?)",
+                                   (category, fact, " ".join(sorted(tokens)), now))
+                    self._load().append({"id": cursor.lastrowid, "category": category, "fact": fact,
+                                         "usage_count": 1, "last_used": now, "tokens": tokens, "vector": None})
+                    result = {"status": "stored", "id": cursor.lastrowid, "fact": fact}
+            self._invalidate_prompt()
+            if seen != self._revision:
+                self._facts = None  # Another worker wrote after our _sync(); reload rather than miss its fact
+            self._revision = seen + 1
+        return result
+
+    # ─── READS ─────────────────────────────────────────────────────────
+
+    def _relevance(self, fact: Dict[str, Any], now: float) -> float:
+        """Usage weighted by exponential decay since last use."""
+        try:
+            last = datetime.strptime(fact["last_used"], "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc).timestamp()
+        except (TypeError, ValueError):
+            last = now
+        age_days = max(0.0, (now - last) / 86400)
+        return fact["usage_count"] * 0.5 ** (age_days / self.half_life_days)
+
+    def top_facts(self, category: str = None, limit: int = 10) -> List[str]:
+        now = time.time()
+        with self._lock:
+            self._sync()
+            facts = [f for f in self._load() if category is None or f["category"] == category]
+            facts.sort(key=lambda f: self._relevance(f, now), reverse=True)
+            return [f["fact"] for f in facts[:limit]]
+
+    def prompt_block(self, limit: int = 10) -> str:
+        """Bullet list of the most relevant facts for the system prompt; cached until the next write."""
+        key = (limit,)
+        # All under the lock, so a concurrent store() cannot clear the cache and then have a stale block written back
+        with self._lock:
+            self._sync()
+            cached = self._prompt_cache.get(key)
+            if cached is None:
+                cached = "\n".join(f"- {fact}" for fact in self.top_facts(limit=limit))
+                self._prompt_cache[key] = cached
+            return cached
@@ -0,0 +1,218 @@
+import os
+import json
+import time
+import socket
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# host:pid:start-ms — unique even when the OS reuses a pid after a crash
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{int(time.time() * 1000)}"
+
+
+class FileLock:
+    """
+    Exclusive lock on a file; the OS releases it when the holding process exits or dies. Used as a
+    context manager it blocks until acquired (one holder per object: pair it with a threading lock).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fh = None
+
+    @property
+    def held(self) -> bool:
+        return self._fh is not None
+
+    def acquire(self, blocking: bool = False) -> bool:
+        if self._fh is not None:
+            return True
+        fh = open(self.path, "a+")
+        while True:
+            try:
+                if os.name == "nt":
+                    import msvcrt
+                    fh.seek(0)
+                    msvcrt.locking(fh.fileno(), msvcrt.LK_NBLCK, 1)
+                else:
+                    import fcntl
+                    fcntl.flock(fh.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+                break
+            except OSError:
+                if not blocking:
+                    fh.close()
+                    return False
+                time.sleep(0.05)  # Windows has no indefinitely blocking lock call
+        self._fh = fh
+        return True
+
+    def __enter__(self):
+        self.acquire(blocking=True)
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    def release(self):
+        if self._fh is None:
+            return
+        try:
+            if os.name == "nt":
+                import msvcrt
+                self._fh.seek(0)
+                msvcrt.locking(self._fh.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(self._fh.fileno(), fcntl.LOCK_UN)
+        finally:
+            self._fh.close()
+            self._fh = None
+
+
+class LeaderElection:
+    """
+    Lets several uvicorn worker processes share one workspace. Exactly one of them — whoever holds
+    `leader.lock` — runs the folder watcher, ingestion queue, email outbox and content index; the others
+    serve requests and retry the lock, so when the leader exits or crashes another worker takes over.
+    Each worker also holds a lock of its own for its lifetime, which lets any process tell whether the
+    worker that left a job 'running' is still alive (single machine only: locks are not shared across hosts).
+    """
+
+    def __init__(self, lock_dir: str = None, retry_seconds: float = None):
+        self.lock_dir = lock_dir or os.path.join(settings.MEMORY_DIR, "locks")
+        self.retry_seconds = retry_seconds or settings.LEADER_RETRY_SECONDS
+        self.worker_id = WORKER_ID
+        self._alive: Optional[FileLock] = None
+        self._leader = FileLock(os.path.join(self.lock_dir, "leader.lock"))
+        self.elected_at: Optional[float] = None
+
+    def _worker_lock_path(self, worker_id: str) -> str:
+        _, pid, started = worker_id.rsplit(":", 2)
+        return os.path.join(self.lock_dir, f"worker-{pid}-{started}.lock")
+
+    def register(self):
+        """Hold this worker's liveness lock and clear lock files left by dead workers."""
+        if self._alive is not None:
+            return
+        os.makedirs(self.lock_dir, exist_ok=True)
+        path = self._worker_lock_path(self.worker_id)
+        while True:
+            alive = FileLock(path)
+            if not alive.acquire():
+                time.sleep(0.01)  # Another worker is probing this file right now; it releases at once
+                continue
+            if os.path.exists(path):
+                break
+            alive.release()  # That probe removed the file between our open and lock
+        self._alive = alive
+        for name in os.listdir(self.lock_dir):
+            if name.startswith("worker-") and name.endswith(".lock"):
+                self._probe(os.path.join(self.lock_dir, name))
+
+    @staticmethod
+    def _probe(path: str) -> bool:
+        """True if some process holds the lock at `path`; a free lock file is removed."""
+        probe = FileLock(path)
+        try:
+            if not probe.acquire():
+                return True
+        except OSError:
+            return False
+        probe.release()
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return False
+
+    def is_alive(self, worker_id: Optional[str]) -> bool:
+        """Whether the worker that recorded `worker_id` is still running (None = a pre-multi-worker row)."""
+        if not worker_id:
+            return False
+        if worker_id == self.worker_id:
+            return True
+        try:
+            host = worker_id.rsplit(":", 2)[0]
+            path = self._worker_lock_path(worker_id)
+        except ValueError:
+            return False
+        if host != socket.gethostname():
+            return True  # Cannot be checked from here; never recover another machine's work
+        return os.path.exists(path) and self._probe(path)
+
+    def dead(self, worker_ids: Iterable[Optional[str]]) -> List[Optional[str]]:
+        return [w for w in set(worker_ids) if not self.is_alive(w)]
+
+    # ─── CLAIMED ROWS ──────────────────────────────────────────────────
+
+    def claim_id(self) -> str:
+        """This worker's id for stamping the rows it claims; holds the liveness lock first so others see it alive."""
+        self.register()
+        return self.worker_id
+
+    def recover_dead_claims(self, db, table: str, claimed: str, reset: str, worker_col: str = "worker") -> int:
+        """
+        Apply `reset` (a SET clause) to the rows of `table` matching `claimed` (a WHERE condition) whose
+        claiming worker has died. Rows held by live workers, on this or another process, are left alone.
+        """
+        workers = [r["w"] for r in db.fetch_all(f"SELECT DISTINCT {worker_col} AS w FROM {table} WHERE {claimed}")]
+        recovered = 0
+        for worker in self.dead(workers):
+            recovered += db.execute(f"UPDATE {table} SET {reset} WHERE ({claimed}) AND {worker_col} IS ?",
+                                    (worker,)).rowcount
+        return recovered
+
+    # ─── ELECTION ──────────────────────────────────────────────────────
+
+    @property
+    def is_leader(self) -> bool:
+        return self._leader.held
+
+    def try_acquire(self) -> bool:
+        self.register()
+        if self._leader.held:
+            return True
+        if not self._leader.acquire():
+            return False
+        self.elected_at = time.time()
+        tmp = os.path.join(self.lock_dir, f"leader.json.{os.getpid()}")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"worker": self.worker_id, "elected_at": self.elected_at}, f)
+        os.replace(tmp, os.path.join(self.lock_dir, "leader.json"))
+        logger.info(f"Worker {self.worker_id} elected to run background services")
+        return True
+
+    async def campaign(self, on_elected: Callable[[], Awaitable[Any]]):
+        """Retry the leader lock until this worker wins it, then start the leader-only services once."""
+        while not await asyncio.to_thread(self.try_acquire):
+            await asyncio.sleep(self.retry_seconds)
+        await on_elected()
+
+    def resign(self):
+        """Give up leadership on shutdown so a waiting worker takes over without a crash-detection delay."""
+        self._leader.release()
+        self.elected_at = None
+
+    def leader(self) -> Optional[str]:
+        try:
+            with open(os.path.join(self.lock_dir, "leader.json"), encoding="utf-8") as f:
+                worker = json.load(f).get("worker")
+        except (OSError, ValueError):
+            return None
+        return worker if self.is_alive(worker) else None
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "worker": self.worker_id,
+            "role": "leader" if self.is_leader else "follower",
+            "leader": self.worker_id if self.is_leader else self.leader(),
+            "elected_at": self.elected_at,
+            "workers": settings.WORKERS,
+        }
+
+
+leader_election = LeaderElection()
@@ -0,0 +1,166 @@
+import json
+from typing import Any, Dict, List, Optional
+
+from app.core.vendor_stats import unit_price_of
+
+NUMERIC_FIELDS = ["unit_price", "qty", "total", "delivery_weeks"]
+TEXT_FIELDS = ["currency", "payment_terms", "validity", "deviations", "date"]
+
+
+def _num(value) -> Optional[float]:
+    try:
+        return float(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _total_of(data: Dict[str, Any], unit: Optional[float]) -> Optional[float]:
+    total, qty = _num(data.get("total")), _num(data.get("qty"))
+    # Derive a missing total so "1100 total" vs "110 x 10" is not reported as a change
+    return total if total is not None else (unit * qty if unit is not None and qty is not None else None)
+
+
+def diff_quotes(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """Field-level diff between two versions of a quote. Only changed fields are listed."""
+    changes = {}
+    old_unit, new_unit = unit_price_of(old), unit_price_of(new)
+    for field in NUMERIC_FIELDS:
+        if field == "unit_price":
+            a, b = old_unit, new_unit
+        elif field == "total":
+            a, b = _total_of(old, old_unit), _total_of(new, new_unit)
+        else:
+            a, b = _num(old.get(field)), _num(new.get(field))
+        if a == b:
+            continue
+        change = {"old": a, "new": b}
+        if a is not None and b is not None:
+            change["delta"] = round(b - a, 4)
+            change["pct"] = round((b - a) / a * 100, 2) if a else None
+        changes[field] = change
+    for field in TEXT_FIELDS:
+        a, b = old.get(field), new.get(field)
+        if (str(a).strip().lower() if a is not None else None) != (str(b).strip().lower() if b is not None else None):
+            changes[field] = {"old": a, "new": b}
+
+    summary = []
+    price = changes.get("unit_price") or changes.get("total")
+    if price and price.get("delta") is not None:
+        direction = "up" if price["delta"] > 0 else "down"
+        summary.append(f"price {direction} {abs(price['pct'])}%" if price.get("pct") is not None else f"price {direction}")
+    if "delivery_weeks" in changes and changes["delivery_weeks"].get("delta") is not None:
+        summary.append(f"delivery {changes['delivery_weeks']['delta']:+g} weeks")
+    if "payment_terms" in changes:
+        summary.append("payment terms changed")
+    if "currency" in changes:
+        summary.append("currency changed")
+    return {"changed": bool(changes), "fields": changes, "summary": ", ".join(summary) or "no material change"}
+
+# Versions of a quote, newest first, each joined to its diff against the version before it
+CHAIN_SQL = """
+    WITH RECURSIVE chain(id, depth) AS (
+        SELECT ?, 0
+        UNION ALL
+        SELECT r.previous_id, chain.depth + 1
+        FROM quote_revisions r JOIN chain ON r.quote_id = chain.id
+        WHERE r.previous_id IS NOT NULL AND chain.depth < ?
+    )
+    SELECT q.id, q.vendor_name, q.material, q.unit_price, q.qty, q.total, q.currency,
+           q.delivery_weeks, q.payment_terms, q.date, q.file_path, r.previous_id, r.diff_json
+    FROM chain JOIN quotes q ON q.id = chain.id
+    LEFT JOIN quote_revisions r ON r.quote_id = q.id
+    ORDER BY chain.depth
+"""
+
+
+# Quotes are ordered by their own date (undated first), ingestion order breaking ties
+QUOTE_ORDER = "COALESCE(date, '')"
+
+
+def _order_key(quote_id: int, data: Dict[str, Any]) -> tuple:
+    return ("" if data.get("date") is None else str(data["date"]), quote_id)
+
+
+class QuoteLineage:
+    """
+    Links each quote to the previous quote (by quote date) from the same vendor for the same material,
+    with a stored diff. A back-dated quote ingested late slots into the chain where its date puts it.
+    """
+
+    def create_schema(self, cursor):
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'quote_revisions'")
+        is_new = cursor.fetchone() is None
+        # Revisions linked in ingestion order (before quote dates were used) are relinked once
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'idx_quotes_lineage'")
+        relink = is_new or cursor.fetchone() is not None
+        cursor.execute("DROP INDEX IF EXISTS idx_quotes_lineage")
+        cursor.execute(f"""
+            CREATE INDEX IF NOT EXISTS idx_quotes_lineage_date
+            ON quotes(vendor_name COLLATE NOCASE, material COLLATE NOCASE, {QUOTE_ORDER}, id)
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS quote_revisions (
+                quote_id INTEGER PRIMARY KEY,
+                previous_id INTEGER,
+                diff_json TEXT,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_revisions_previous ON quote_revisions(previous_id)")
+
+        if relink:
+            # One-time link-up of quotes stored before lineage (or its date ordering) existed
+            cursor.execute("DELETE FROM quote_revisions")
+            cursor.execute(f"SELECT id, raw_json FROM quotes ORDER BY {QUOTE_ORDER}, id")
+            for quote_id, raw in cursor.fetchall():
+                try:
+                    data = json.loads(raw)
+                    self._link(cursor, quote_id, data, self.find_previous(cursor, data, before=_order_key(quote_id, data)))
+                except (TypeError, ValueError):
+                    continue
+
+    def _neighbour(self, cursor, data: Dict[str, Any], key: tuple, later: bool) -> Optional[tuple]:
+        if not data.get("vendor_name") or not data.get("material"):
+            return None
+        cursor.execute(f"""
+            SELECT id, raw_json FROM quotes
+            WHERE vendor_name = ? COLLATE NOCASE AND material = ? COLLATE NOCASE
+              AND ({QUOTE_ORDER}, id) {'>' if later else '<'} (?, ?)
+            ORDER BY {QUOTE_ORDER} {'ASC' if later else 'DESC'}, id {'ASC' if later else 'DESC'} LIMIT 1
+        """, (data["vendor_name"], data["material"], *key))
+        return cursor.fetchone()
+
+    def find_previous(self, cursor, data: Dict[str, Any], before: tuple) -> Optional[tuple]:
+        """Latest quote from the same vendor for the same material ordered before `before` = (date, id) (index seek)."""
+        return self._neighbour(cursor, data, before, later=False)
+
+    def find_next(self, cursor, data: Dict[str, Any], after: tuple) -> Optional[tuple]:
+        """Earliest quote from the same vendor for the same material ordered after `after` = (date, id)."""
+        return self._neighbour(cursor, data, after, later=True)
+
+    def _link(self, cursor, quote_id: int, data: Dict[str, Any], prev: Optional[tuple]) -> Optional[Dict[str, Any]]:
+        if prev is None:
+            cursor.execute("DELETE FROM quote_revisions WHERE quote_id = ?", (quote_id,))
+            return None
+        diff = diff_quotes(json.loads(prev[1] or "{}"), data)
+        diff["previous_id"] = prev[0]
+        cursor.execute("INSERT OR REPLACE INTO quote_revisions (quote_id, previous_id, diff_json) VALUES (?, ?, ?)",
+                       (quote_id, prev[0], json.dumps(diff)))
+        return diff
+
+    def record(self, cursor, quote_id: int, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Store the link + diff for a freshly inserted quote. Runs inside the caller's transaction."""
+        key = _order_key(quote_id, data)
+        diff = self._link(cursor, quote_id, data, self.find_previous(cursor, data, before=key))
+        following = self.find_next(cursor, data, after=key)
+        if following is not None:
+            # Back-dated: the quote after it in date order is now diffed against this one
+            self._link(cursor, following[0], json.loads(following[1] or "{}"), (quote_id, json.dumps(data)))
+        return diff
+
+    @staticmethod
+    def format_chain(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        for row in rows:
+            diff_json = row.pop("diff_json")
+            row["diff"] = json.loads(diff_json) if diff_json else None
+        return rows
@@ -1,4 +1,3 @@
-from openai import OpenAI
 from app.core.config import settings
 import json
 import logging
@@ -6,12 +5,26 @@ from typing import Dict, Any, List, Optional
 
 logger = logging.getLogger(__name__)
 
+CHAT_ERROR_PREFIX = "Error communicating with DeepSeek:"  # `chat` returns this instead of raising
+
+
+def is_chat_error(text: Optional[str]) -> bool:
+    return isinstance(text, str) and text.startswith(CHAT_ERROR_PREFIX)
+
 class LLMEngine:
     def __init__(self):
-        self.client = OpenAI(
-            api_key=settings.DEEPSEEK_API_KEY,
-            base_url="https://api.deepseek.com"
-        )
+        self._client = None
+
+    @property
+    def client(self):
+        # Built on first call: importing openai (and httpx) is a noticeable share of cold start
+        if self._client is None:
+            from openai import OpenAI
+            self._client = OpenAI(
+                api_key=settings.DEEPSEEK_API_KEY,
+                base_url="https://api.deepseek.com"
+            )
+        return self._client
 
     def chat(self, messages: List[Dict[str, str]], json_mode: bool = False) -> str:
         """
@@ -32,7 +45,7 @@ class LLMEngine:
             return response.choices[0].message.content
         except Exception as e:
             logger.error(f"LLM chat error: {e}")
-            return f"Error communicating with DeepSeek: {str(e)}"
+            return f"{CHAT_ERROR_PREFIX} {str(e)}"
 
     def reason(self, user_prompt: str) -> str:
         """
@@ -1,23 +1,119 @@
-import sqlite3
-import chromadb
-from chromadb.config import Settings as ChromaSettings
 from app.core.config import settings
+from app.core.database import Database
+from app.core.documents import DocumentStore
+from app.core.embeddings import CachedEmbeddingFunction
+from app.core.jobs import JobStore
+from app.core.knowledge import KnowledgeStore
+from app.core.leader import FileLock
+from app.core.lineage import CHAIN_SQL, QuoteLineage
+from app.core.startup import LazySingleton
+from app.core.vendor_stats import VendorStatsEngine
+from typing import List, Dict, Any, Optional, Tuple
 import json
 import os
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+QUOTE_COLUMNS = [
+    "id", "vendor_name", "material", "unit_price", "qty", "total", "currency",
+    "delivery_weeks", "payment_terms", "date", "file_path", "raw_json",
+]
+
+# Bumped when the per-quote vector metadata changes; a collection tagged with an older version is re-indexed.
+# 2: lowercased vendor_key / material_key, matched like SQLite's NOCASE filters
+QUOTE_METADATA_VERSION = 2
+
+
+def _filter_key(value: Optional[str]) -> Optional[str]:
+    return value.strip().lower() if isinstance(value, str) and value.strip() else None
+
 
 class MemoryManager:
     def __init__(self):
         # Structured Memory (SQLite)
         os.makedirs(settings.MEMORY_DIR, exist_ok=True)
-        self.sqlite_conn = sqlite3.connect(settings.DB_PATH, check_same_thread=False)
+        self.db = Database(settings.DB_PATH)
+        self.knowledge = KnowledgeStore(self.db)
+        self.vendor_stats = VendorStatsEngine()
+        self.lineage = QuoteLineage()
+        self.jobs = JobStore(self.db)
+        self.documents = DocumentStore(self.db, collection=None)
+        self._filter_names: Optional[Tuple[Any, Dict[str, List[str]]]] = None  # (max quote id, names by filter)
         self._init_sqlite()
 
-        # Vector Memory (ChromaDB)
-        self.chroma_client = chromadb.PersistentClient(path=settings.CHROMA_PATH)
-        self.collection = self.chroma_client.get_or_create_collection(name="procurement_docs")
+        # Vector Memory (ChromaDB; imported here because loading it takes most of a second)
+        import chromadb
+        if settings.CHROMA_SERVER:
+            # Shared server: the only safe setup for several worker processes (each embedded client keeps its own index)
+            host, _, port = settings.CHROMA_SERVER.rpartition(":")
+            self.chroma_client = chromadb.HttpClient(host=host or "localhost", port=int(port))
+        else:
+            if settings.WORKERS > 1:
+                logger.warning("WORKERS > 1 with an embedded ChromaDB: vector writes from different workers can "
+                               "overwrite each other. Set CHROMA_SERVER (run_local.py --workers does this).")
+            self.chroma_client = chromadb.PersistentClient(path=settings.CHROMA_PATH)
+        self.embedding_function = CachedEmbeddingFunction()
+        os.makedirs(os.path.join(settings.MEMORY_DIR, "locks"), exist_ok=True)
+        # One process at a time checks (and if needed rebuilds) the collections for the configured model
+        with FileLock(os.path.join(settings.MEMORY_DIR, "locks", "collections.lock")):
+            self.collection, rebuilt = self._open_collection("procurement_docs")
+            metadata = self.collection.metadata or {}
+            if rebuilt or metadata.get("quote_metadata") != QUOTE_METADATA_VERSION:
+                self._reindex_all_quotes()  # Upserts rewrite each quote's metadata in place
+                self.collection.modify(metadata={**metadata, "quote_metadata": QUOTE_METADATA_VERSION})
+            self.knowledge.embed = self.embedding_function  # Semantic near-duplicate check for facts
+            # Chunks of processed documents live apart from quotes so quote search stays precise
+            self.documents.collection, rebuilt = self._open_collection("document_chunks")
+            if rebuilt:
+                self.db.execute("DELETE FROM document_index")  # Re-chunked and embedded on next use
+
+    def _open_collection(self, name: str):
+        """
+        The named collection, tagged with the embedding backend:model that produced its vectors.
+        A collection built with another model is dropped and recreated empty (returns rebuilt=True),
+        since its vectors are in a different space (or have a different dimension).
+        """
+        signature = self.embedding_function.signature
+        # No metadata here: get_or_create_collection overwrites an existing collection's metadata with it
+        collection = self.chroma_client.get_or_create_collection(name=name, embedding_function=self.embedding_function)
+        stored = (collection.metadata or {}).get("embedding")
+        if stored == signature:
+            return collection, False
+        if not collection.count():
+            # Other tags describe vectors this collection no longer holds
+            collection.modify(metadata={"embedding": signature})
+            return collection, False
+        logger.warning(f"Collection {name} was embedded with {stored or 'an unrecorded model'}; re-embedding with {signature}")
+        self.chroma_client.delete_collection(name)
+        return self.chroma_client.create_collection(
+            name=name, embedding_function=self.embedding_function, metadata={"embedding": signature}), True
+
+    def _reindex_all_quotes(self, batch_size: int = 500):
+        """Re-embed every stored quote (SQLite is the source of truth) into a fresh collection."""
+        last_id = 0
+        while True:
+            rows = self.db.fetch_all("SELECT * FROM quotes WHERE id > ? ORDER BY id LIMIT ?", (last_id, batch_size))
+            if not rows:
+                break
+            self._index_quotes([(row["id"], self._quote_data(row)) for row in rows], batch_size=batch_size)
+            last_id = rows[-1]["id"]
+            logger.info(f"Re-embedded quotes up to id {last_id}")
+
+    @staticmethod
+    def _quote_data(row: Dict[str, Any]) -> Dict[str, Any]:
+        """The extracted fields a quote was stored with (its raw JSON, else the columns)."""
+        try:
+            return json.loads(row["raw_json"]) if row.get("raw_json") else dict(row)
+        except ValueError:
+            return dict(row)
 
     def _init_sqlite(self):
-        cursor = self.sqlite_conn.cursor()
+        with self.db.transaction() as cursor:
+            self._create_schema(cursor)
+
+    def _create_schema(self, cursor):
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS quotes (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -34,6 +130,12 @@ class MemoryManager:
                 raw_json TEXT
             )
         """)
+        # Filter columns are indexed together with id so keyset pagination stays an index walk
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_quotes_vendor ON quotes(vendor_name COLLATE NOCASE, id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_quotes_material ON quotes(material COLLATE NOCASE, id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_quotes_currency ON quotes(currency COLLATE NOCASE, id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_quotes_date ON quotes(date, id)")
+        self.fts_enabled = self._create_fts(cursor)
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS vendor_performance (
                 vendor_name TEXT PRIMARY KEY,
@@ -43,6 +145,8 @@ class MemoryManager:
                 last_interaction TEXT
             )
         """)
+        self.vendor_stats.create_schema(cursor)
+        self.lineage.create_schema(cursor)
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS personal_knowledge (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -52,30 +156,70 @@ class MemoryManager:
                 last_used TEXT DEFAULT CURRENT_TIMESTAMP
             )
         """)
-        self.sqlite_conn.commit()
+        self.knowledge.migrate(cursor)
+        # Ledger of bulk-ingested files so an interrupted backfill can resume
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS ingest_files (
+                path TEXT PRIMARY KEY,
+                size INTEGER,
+                mtime REAL,
+                status TEXT,
+                doc_type TEXT,
+                quote_id INTEGER,
+                error TEXT,
+                ingested_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        self.jobs.create_schema(cursor)
+        self.documents.create_schema(cursor)
+
+    def _create_fts(self, cursor) -> bool:
+        """Full-text index over quote fields, kept in sync with `quotes` by triggers."""
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'quotes_fts'")
+        exists = cursor.fetchone() is not None
+        try:
+            cursor.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS quotes_fts USING fts5(
+                    vendor_name, material, payment_terms, raw_json,
+                    content='quotes', content_rowid='id'
+                )
+            """)
+        except Exception as e:
+            logger.warning(f"SQLite FTS5 unavailable, search falls back to vectors only: {e}")
+            return False
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS quotes_fts_ai AFTER INSERT ON quotes BEGIN
+                INSERT INTO quotes_fts(rowid, vendor_name, material, payment_terms, raw_json)
+                VALUES (new.id, new.vendor_name, new.material, new.payment_terms, new.raw_json);
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS quotes_fts_ad AFTER DELETE ON quotes BEGIN
+                INSERT INTO quotes_fts(quotes_fts, rowid, vendor_name, material, payment_terms, raw_json)
+                VALUES ('delete', old.id, old.vendor_name, old.material, old.payment_terms, old.raw_json);
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS quotes_fts_au AFTER UPDATE ON quotes BEGIN
+                INSERT INTO quotes_fts(quotes_fts, rowid, vendor_name, material, payment_terms, raw_json)
+                VALUES ('delete', old.id, old.vendor_name, old.material, old.payment_terms, old.raw_json);
+                INSERT INTO quotes_fts(rowid, vendor_name, material, payment_terms, raw_json)
+                VALUES (new.id, new.vendor_name, new.material, new.payment_terms, new.raw_json);
+            END
+        """)
+        if not exists:
+            # Index quotes stored before the FTS table existed
+            cursor.execute("INSERT INTO quotes_fts(quotes_fts) VALUES ('rebuild')")
+        return True
 
     def store_learned_fact(self, category: str, fact: str):
-        """Stores a learned pattern, user preference, or discovered file location."""
-        cursor = self.sqlite_conn.cursor()
-        # Check if fact already exists to increment usage
-        cursor.execute("SELECT id, usage_count FROM personal_knowledge WHERE fact = ?", (fact,))
-        row = cursor.fetchone()
-        if row:
-            cursor.execute("UPDATE personal_knowledge SET usage_count = usage_count + 1, last_used = CURRENT_TIMESTAMP WHERE id = ?", (row[0],))
-        else:
-            cursor.execute("INSERT INTO personal_knowledge (category, fact) VALUES (?, ?)", (category, fact))
-        self.sqlite_conn.commit()
+        """Stores a learned pattern, user preference, or discovered file location (near-duplicates are merged)."""
+        return self.knowledge.store(category, fact)
 
     def get_learned_facts(self, category: str = None, limit: int = 10) -> List[str]:
-        cursor = self.sqlite_conn.cursor()
-        if category:
-            cursor.execute("SELECT fact FROM personal_knowledge WHERE category = ? ORDER BY usage_count DESC, last_used DESC LIMIT ?", (category, limit))
-        else:
-            cursor.execute("SELECT fact FROM personal_knowledge ORDER BY usage_count DESC, last_used DESC LIMIT ?", (limit,))
-        return [row[0] for row in cursor.fetchall()]
+        return self.knowledge.top_facts(category, limit)
 
-    def store_quote(self, data: dict):
-        cursor = self.sqlite_conn.cursor()
+    def _insert_quote(self, cursor, data: dict) -> int:
         cursor.execute("""
             INSERT INTO quotes (vendor_name, material, unit_price, qty, total, currency, delivery_weeks, payment_terms, date, file_path, raw_json)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
@@ -85,18 +229,282 @@ class MemoryManager:
             data.get('delivery_weeks'), data.get('payment_terms'), data.get('date'),
             data.get('file_path'), json.dumps(data)
         ))
-        self.sqlite_conn.commit()
-        
+        quote_id = cursor.lastrowid
+        # Aggregates are folded in within the same transaction so they never drift from `quotes`
+        self.vendor_stats.record_quote(cursor, data)
+        self.lineage.record(cursor, quote_id, data)
+        return quote_id
+
+    def get_revision(self, quote_id: int) -> Dict[str, Any]:
+        """Stored diff of a quote against the same vendor's previous quote for the material (None if first)."""
+        row = self.db.fetch_one("SELECT diff_json FROM quote_revisions WHERE quote_id = ?", (quote_id,))
+        return json.loads(row[0]) if row and row[0] else None
+
+    def _index_quotes(self, quotes: List[tuple], batch_size: int = 500):
+        """Add (quote_id, data) pairs to the vector store in large batches. Idempotent (upsert)."""
+        for i in range(0, len(quotes), batch_size):
+            chunk = quotes[i:i + batch_size]
+            self.collection.upsert(
+                documents=[json.dumps(data) for _, data in chunk],
+                metadatas=[self._quote_metadata(data) for _, data in chunk],
+                ids=[f"quote_{quote_id}" for quote_id, _ in chunk]
+            )
+
+    @staticmethod
+    def _quote_metadata(data: dict) -> Dict[str, str]:
+        metadata = {"vendor": data.get('vendor_name'), "material": data.get('material'),
+                    # Filters match these, so "tata steel" finds quotes stored as "Tata Steel" (as in SQL)
+                    "vendor_key": _filter_key(data.get('vendor_name')),
+                    "material_key": _filter_key(data.get('material'))}
+        return {k: v for k, v in metadata.items() if v is not None}  # Chroma rejects None metadata values
+
+    def store_quote(self, data: dict):
+        with self.db.transaction() as cursor:
+            quote_id = self._insert_quote(cursor, data)
+
         # Also store in vector DB for semantic search
-        self.collection.add(
-            documents=[json.dumps(data)],
-            metadatas=[{"vendor": data.get('vendor_name'), "material": data.get('material')}],
-            ids=[f"quote_{cursor.lastrowid}"]
-        )
-
-    def search_history(self, query: str, limit: int = 5):
-        # Semantic search in ChromaDB
-        results = self.collection.query(query_texts=[query], n_results=limit)
-        return results['documents']
-
-memory_manager = MemoryManager()
+        self._index_quotes([(quote_id, data)])
+        return quote_id
+
+    def store_quotes_bulk(self, quotes: List[dict], file_records: List[dict] = None,
+                          chroma_batch_size: int = 500) -> List[int]:
+        """
+        Insert many quotes in a single transaction, then index them in ChromaDB in large batches.
+        `file_records` (path, size, mtime, status, doc_type, error) are written to the ingest ledger
+        in the same transaction; files whose quote is not yet in ChromaDB stay 'stored' until it is.
+        """
+        stored = []
+        with self.db.transaction() as cursor:
+            for data in quotes:
+                stored.append((self._insert_quote(cursor, data), data))
+            quote_ids = {data.get('file_path'): quote_id for quote_id, data in stored}
+            for rec in (file_records or []):
+                cursor.execute("""
+                    INSERT OR REPLACE INTO ingest_files (path, size, mtime, status, doc_type, quote_id, error, ingested_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                """, (rec['path'], rec.get('size'), rec.get('mtime'),
+                      "stored" if rec['path'] in quote_ids else rec.get('status', 'done'),
+                      rec.get('doc_type'), quote_ids.get(rec['path']), rec.get('error')))
+
+        self._index_quotes(stored, batch_size=chroma_batch_size)
+        self.mark_ingest_indexed([data.get('file_path') for _, data in stored])
+        return [quote_id for quote_id, _ in stored]
+
+    def mark_ingest_indexed(self, paths: List[str]):
+        if not paths:
+            return
+        with self.db.transaction() as cursor:
+            cursor.executemany("UPDATE ingest_files SET status = 'done' WHERE path = ? AND status = 'stored'",
+                               [(p,) for p in paths])
+
+    def get_ingest_ledger(self, root: str) -> Dict[str, Dict[str, Any]]:
+        """Ledger rows for every file under `root` (prefix range scan on the primary key)."""
+        rows = self.db.fetch_all(
+            "SELECT path, size, mtime, status, quote_id FROM ingest_files WHERE path >= ? AND path < ?",
+            (root, root + "\uffff"))
+        return {row["path"]: row for row in rows}
+
+    def reindex_stored_quotes(self, root: str) -> int:
+        """Push quotes that reached SQLite but not ChromaDB (interrupted run) into the vector store."""
+        rows = self.db.fetch_all("""
+            SELECT q.id, q.raw_json, f.path FROM ingest_files f JOIN quotes q ON q.id = f.quote_id
+            WHERE f.status = 'stored' AND f.path >= ? AND f.path < ?
+        """, (root, root + "\uffff"))
+        if rows:
+            self._index_quotes([(row["id"], json.loads(row["raw_json"])) for row in rows])
+            self.mark_ingest_indexed([row["path"] for row in rows])
+        return len(rows)
+
+    def _quote_filters(self, vendor: str = None, material: str = None,
+                       date_from: str = None, date_to: str = None, alias: str = "q"):
+        where, params = [], []
+        if vendor:
+            where.append(f"{alias}.vendor_name = ? COLLATE NOCASE"); params.append(vendor)
+        if material:
+            where.append(f"{alias}.material = ? COLLATE NOCASE"); params.append(material)
+        if date_from:
+            where.append(f"{alias}.date >= ?"); params.append(date_from)
+        if date_to:
+            where.append(f"{alias}.date <= ?"); params.append(date_to)
+        return where, params
+
+    def _lexical_search(self, query: str, limit: int, **filters) -> List[int]:
+        """BM25-ranked quote ids from the FTS5 index, with filters applied in SQL."""
+        terms = [t for t in re.findall(r"\w+", query.lower()) if len(t) > 1]
+        if not self.fts_enabled or not terms:
+            return []
+        where, params = self._quote_filters(**filters)
+        sql = """
+            SELECT q.id FROM quotes_fts JOIN quotes q ON q.id = quotes_fts.rowid
+            WHERE quotes_fts MATCH ?
+        """
+        if where:
+            sql += " AND " + " AND ".join(where)
+        sql += " ORDER BY bm25(quotes_fts) LIMIT ?"
+        # Quote every term so user text can't inject FTS syntax; OR keeps recall high, bm25 ranks
+        match = " OR ".join(f'"{t}"' for t in dict.fromkeys(terms))
+        try:
+            return [row["id"] for row in self.db.fetch_all(sql, (match, *params, limit))]
+        except Exception as e:
+            logger.warning(f"FTS search failed: {e}")
+            return []
+
+    def _vector_search(self, query: str, limit: int, vendor: str = None, material: str = None) -> List[int]:
+        """Semantic neighbours from ChromaDB, with vendor/material pushed into the metadata filter."""
+        conditions = [{k: _filter_key(v)} for k, v in (("vendor_key", vendor), ("material_key", material))
+                      if _filter_key(v)]
+        where = None
+        if len(conditions) == 1:
+            where = conditions[0]
+        elif conditions:
+            where = {"$and": conditions}
+        try:
+            n_results = min(limit, self.collection.count())
+            if not n_results:
+                return []
+            results = self.collection.query(query_texts=[query], n_results=n_results, where=where)
+        except Exception as e:
+            logger.warning(f"Vector search failed: {e}")
+            return []
+        return [int(i.split("_", 1)[1]) for i in results["ids"][0] if i.startswith("quote_")]
+
+    def search_history(self, query: str, limit: int = 5, vendor: str = None, material: str = None,
+                       date_from: str = None, date_to: str = None) -> List[Dict[str, Any]]:
+        """
+        Hybrid search over past quotes: FTS5 (BM25) and vector results merged with reciprocal rank fusion.
+        Structured filters are pushed down into both retrievers.
+        """
+        filters = {"vendor": vendor, "material": material, "date_from": date_from, "date_to": date_to}
+        depth = max(limit * 4, 20)
+        lexical = self._lexical_search(query, depth, **filters)
+        semantic = self._vector_search(query, depth, vendor=vendor, material=material)
+
+        # RRF: rank-based, so BM25 and cosine scores never need to be calibrated against each other
+        k = 60
+        scores: Dict[int, float] = {}
+        for ranking in (lexical, semantic):
+            for rank, quote_id in enumerate(ranking):
+                scores[quote_id] = scores.get(quote_id, 0.0) + 1.0 / (k + rank + 1)
+        if not scores:
+            return []
+
+        # Re-apply filters in SQL (dates aren't in the vector metadata)
+        candidates = sorted(scores, key=scores.get, reverse=True)[:depth]
+        where, params = self._quote_filters(**filters)
+        where.insert(0, f"q.id IN ({','.join('?' * len(candidates))})")
+        columns = ", ".join(f"q.{c}" for c in QUOTE_COLUMNS if c != "raw_json")
+        rows = self.db.fetch_all(f"SELECT {columns} FROM quotes q WHERE {' AND '.join(where)}",
+                                 (*candidates, *params))
+        for row in rows:
+            row["score"] = round(scores[row["id"]], 5)
+        rows.sort(key=lambda r: r["score"], reverse=True)
+        return rows[:limit]
+
+    def infer_filters(self, query: str) -> Dict[str, str]:
+        """Spot known vendor / material names in free text so they can be pushed down as filters."""
+        lower = query.lower()
+        filters = {}
+        for key, names in self._known_filter_names().items():
+            for name in names:
+                if re.search(rf"\b{re.escape(name.lower())}\b", lower):
+                    filters[key] = name
+                    break
+        return filters
+
+    def _known_filter_names(self) -> Dict[str, List[str]]:
+        """
+        Distinct vendor / material names, longest first ("Tata Steel" over "Tata"). Cached until a quote is
+        added: quotes are insert-only, so a new MAX(id) (from any worker process) means the list is stale.
+        """
+        latest = self.db.fetch_one("SELECT MAX(id) FROM quotes")[0]
+        cached = self._filter_names
+        if cached is not None and cached[0] == latest:
+            return cached[1]
+        names = {}
+        for column, key in (("vendor_name", "vendor"), ("material", "material")):
+            rows = self.db.fetch_all(f"SELECT DISTINCT {column} AS name FROM quotes WHERE {column} IS NOT NULL")
+            names[key] = sorted((r["name"] for r in rows if len(r["name"]) >= 3), key=len, reverse=True)
+        self._filter_names = (latest, names)
+        return names
+
+    # ─── ASYNC READS (for endpoints; never block the event loop) ──────
+
+    async def query_quotes_async(self, vendor: str = None, material: str = None, currency: str = None,
+                                 date_from: str = None, date_to: str = None, before_id: int = None,
+                                 limit: int = 50, fields: List[str] = None,
+                                 include_raw: bool = False) -> Dict[str, Any]:
+        """Filtered, keyset-paginated quote listing (newest first)."""
+        columns = [c for c in (fields or QUOTE_COLUMNS) if c in QUOTE_COLUMNS]
+        if not include_raw and "raw_json" in columns:
+            columns.remove("raw_json")
+        if include_raw and "raw_json" not in columns:
+            columns.append("raw_json")
+        if "id" not in columns:
+            columns.insert(0, "id")  # Needed for the cursor
+
+        where, params = [], []
+        if vendor:
+            where.append("vendor_name = ? COLLATE NOCASE"); params.append(vendor)
+        if material:
+            where.append("material = ? COLLATE NOCASE"); params.append(material)
+        if currency:
+            where.append("currency = ? COLLATE NOCASE"); params.append(currency)
+        if date_from:
+            where.append("date >= ?"); params.append(date_from)
+        if date_to:
+            where.append("date <= ?"); params.append(date_to)
+        if before_id:
+            where.append("id < ?"); params.append(before_id)
+
+        limit = max(1, min(limit, 500))
+        sql = f"SELECT {', '.join(columns)} FROM quotes"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY id DESC LIMIT ?"
+        # Fetch one extra row to know whether another page exists
+        rows = await self.db.fetch_all_async(sql, (*params, limit + 1))
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return {
+            "columns": columns,
+            "items": rows,
+            "next_cursor": rows[-1]["id"] if has_more else None,
+        }
+
+    async def quote_lineage_async(self, quote_id: int, depth: int = 20) -> List[Dict[str, Any]]:
+        return self.lineage.format_chain(await self.db.fetch_all_async(CHAIN_SQL, (quote_id, depth)))
+
+    async def list_vendors_async(self) -> List[Dict[str, Any]]:
+        return await self.db.fetch_all_async("""
+            SELECT vendor_name, quote_count, avg_delivery_weeks, price_competitiveness,
+                   avg_delay_days, quality_score, last_interaction
+            FROM vendor_performance ORDER BY quote_count DESC
+        """)
+
+    async def vendor_stats_async(self, vendor: str) -> List[Dict[str, Any]]:
+        """Precomputed per-material statistics for one vendor, with competitiveness against peers."""
+        rows = await self.db.fetch_all_async("""
+            SELECT v.*, m.price_n AS peer_price_n, m.price_sum AS peer_price_sum
+            FROM vendor_material_stats v
+            LEFT JOIN material_stats m ON m.material = v.material AND m.currency = v.currency
+            WHERE v.vendor_name = ?
+        """, (vendor,))
+        return [self.vendor_stats.describe(r, {"price_n": r["peer_price_n"], "price_sum": r["peer_price_sum"]})
+                for r in rows]
+
+    async def material_stats_async(self, material: str, currency: str = None) -> List[Dict[str, Any]]:
+        """Peer-group statistics for a material plus each vendor's standing, cheapest first."""
+        sql, params = "SELECT * FROM material_stats WHERE material = ?", [material]
+        if currency:
+            sql += " AND currency = ?"; params.append(currency)
+        groups = []
+        for peer in await self.db.fetch_all_async(sql, params):
+            vendors = await self.db.fetch_all_async(
+                "SELECT * FROM vendor_material_stats WHERE material = ? AND currency = ?",
+                (peer["material"], peer["currency"]))
+            described = [self.vendor_stats.describe(v, peer) for v in vendors]
+            described.sort(key=lambda v: v["price_mean"] if v["price_mean"] is not None else float("inf"))
+            groups.append({**self.vendor_stats.describe(peer), "vendors": described})
+        return groups
+
+memory_manager = LazySingleton("memory", MemoryManager)
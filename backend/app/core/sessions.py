@@ -0,0 +1,176 @@
+import re
+import json
+import time
+import uuid
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional
+
+from app.core.memory import memory_manager
+
+# Windows-style absolute paths the assistant renders (e.g. **D:/Projects/Quote.pdf**)
+PATH_PATTERN = re.compile(r'[a-zA-Z]:[\\/][^\s*`|<>"\')\]]*')
+
+
+class ChatSession:
+    """Server-side conversation state with an incrementally maintained path context."""
+
+    def __init__(self, session_id: str, max_turns: int = 20, max_recent_files: int = 20):
+        self.session_id = session_id
+        self.history = deque(maxlen=max_turns)
+        self.current_path: Optional[str] = None
+        self.recent_files = deque(maxlen=max_recent_files)
+        self.pending_plan: Optional[Dict] = None  # Organize plan ({plan_id, root}) shown to the user, awaiting confirmation
+        self.last_executed_plan_id: Optional[int] = None  # What "undo" refers to
+        self.last_active = time.time()
+        self.saved_at: Optional[float] = None  # `updated` of the stored row this object matches
+
+    def add_message(self, role: str, content: str, track_paths: bool = True):
+        """Append a turn and update the path context from that turn only."""
+        self.history.append({"role": role, "content": content})
+        self.last_active = time.time()
+        if not track_paths:
+            return
+        paths = [p.rstrip(".,;:") for p in PATH_PATTERN.findall(content or "")]
+        if paths:
+            # The first path mentioned in the newest turn is what "it" refers to
+            self.current_path = paths[0]
+
+    def set_path(self, path: str):
+        """Record a path the tool layer actually operated on."""
+        if path:
+            self.current_path = path
+
+    def add_files(self, paths: List[str]):
+        for p in paths:
+            if p and p not in self.recent_files:
+                self.recent_files.appendleft(p)
+
+    def get_history(self) -> List[Dict[str, str]]:
+        return list(self.history)
+
+    def to_dict(self) -> Dict:
+        return {
+            "session_id": self.session_id,
+            "turns": len(self.history),
+            "current_path": self.current_path,
+            "recent_files": list(self.recent_files),
+            "pending_plan": self.pending_plan,
+            "last_executed_plan_id": self.last_executed_plan_id,
+            "last_active": self.last_active,
+        }
+
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            "history": list(self.history),
+            "current_path": self.current_path,
+            "recent_files": list(self.recent_files),
+            "pending_plan": self.pending_plan,
+            "last_executed_plan_id": self.last_executed_plan_id,
+            "last_active": self.last_active,
+        }
+
+    @classmethod
+    def from_state(cls, session_id: str, state: Dict[str, Any]) -> "ChatSession":
+        session = cls(session_id)
+        session.history.extend(state.get("history", []))
+        session.current_path = state.get("current_path")
+        session.recent_files.extend(state.get("recent_files", []))
+        session.pending_plan = state.get("pending_plan")
+        session.last_executed_plan_id = state.get("last_executed_plan_id")
+        session.last_active = state.get("last_active", session.last_active)
+        return session
+
+
+class SessionStore:
+    """
+    In-memory LRU of chat sessions with idle expiry, written through to SQLite: with several uvicorn
+    workers the turns of one conversation land on different processes, and each reloads a session
+    another worker has saved since (one primary-key read per request).
+    """
+
+    def __init__(self, max_sessions: int = 200, ttl_seconds: int = 6 * 3600, db=None):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = db
+
+    @property
+    def db(self):
+        if self._db is None:
+            db = memory_manager.db
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS chat_sessions (
+                    session_id TEXT PRIMARY KEY,
+                    state TEXT NOT NULL,
+                    updated REAL NOT NULL
+                )
+            """)
+            db.execute("CREATE INDEX IF NOT EXISTS idx_chat_sessions_updated ON chat_sessions(updated)")
+            self._db = db
+        return self._db
+
+    def _fresh(self, session_id: str) -> Optional[ChatSession]:
+        """The cached session, replaced by the stored one if another worker saved it since."""
+        session = self._sessions.get(session_id)
+        row = self.db.fetch_one("SELECT state, updated FROM chat_sessions WHERE session_id = ?", (session_id,))
+        if row is None or row[1] < time.time() - self.ttl_seconds:
+            return session
+        if session is None or session.saved_at != row[1]:
+            session = ChatSession.from_state(session_id, json.loads(row[0]))
+            session.saved_at = row[1]
+            self._remember(session)
+        return session
+
+    def _remember(self, session: ChatSession):
+        self._sessions[session.session_id] = session
+        self._sessions.move_to_end(session.session_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+    def get_or_create(self, session_id: Optional[str] = None,
+                      seed_history: List[Dict[str, str]] = None) -> ChatSession:
+        with self._lock:
+            self._expire()
+            session = self._fresh(session_id) if session_id else None
+            if session is None:
+                session = ChatSession(session_id or uuid.uuid4().hex)
+                # Clients that still send history get it imported once
+                for h in (seed_history or []):
+                    session.add_message(h.get("role", "user"), h.get("content", ""))
+                self._remember(session)
+                self.db.execute("DELETE FROM chat_sessions WHERE updated < ?", (time.time() - self.ttl_seconds,))
+            else:
+                session.last_active = time.time()
+                self._sessions.move_to_end(session.session_id)
+            return session
+
+    def save(self, session: ChatSession):
+        """Persist the session after a turn so the next request sees it on whichever worker serves it."""
+        with self._lock:
+            session.saved_at = time.time()
+            self.db.execute("INSERT OR REPLACE INTO chat_sessions (session_id, state, updated) VALUES (?, ?, ?)",
+                            (session.session_id, json.dumps(session.to_state()), session.saved_at))
+
+    def get(self, session_id: str) -> Optional[ChatSession]:
+        with self._lock:
+            return self._fresh(session_id)
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            cached = self._sessions.pop(session_id, None) is not None
+            stored = self.db.execute("DELETE FROM chat_sessions WHERE session_id = ?", (session_id,)).rowcount > 0
+            return cached or stored
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl_seconds
+        # Oldest sessions sit at the front of the LRU
+        while self._sessions:
+            sid, session = next(iter(self._sessions.items()))
+            if session.last_active >= cutoff:
+                break
+            self._sessions.pop(sid)
+
+
+session_store = SessionStore()
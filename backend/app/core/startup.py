@@ -0,0 +1,82 @@
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+
+class StartupProfile:
+    """Wall-clock timings of import groups and subsystem initialization (startup log and /startup-profile)."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.phases.append({"phase": name, "at": round(t0 - self.started, 3),
+                                    "seconds": round(time.perf_counter() - t0, 3),
+                                    "thread": threading.current_thread().name})
+
+    def mark(self, name: str):
+        """A point in time (e.g. when the API starts answering) rather than a duration."""
+        with self._lock:
+            self.phases.append({"phase": name, "at": round(time.perf_counter() - self.started, 3), "seconds": 0.0,
+                                "thread": threading.current_thread().name})
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            phases = sorted(self.phases, key=lambda p: p["at"])
+        return {"elapsed": round(time.perf_counter() - self.started, 3), "phases": phases}
+
+    def log(self, title: str = "Startup profile"):
+        report = self.report()
+        lines = [f"  {p['at']:7.3f}s  {p['seconds']:6.3f}s  {p['phase']}" for p in report["phases"]]
+        logger.info(f"{title} (t+start, duration, phase):\n" + "\n".join(lines))
+
+
+startup_profile = StartupProfile()
+
+
+class LazySingleton:
+    """
+    Module-level stand-in for a heavy singleton: the real object is built on first attribute access
+    (once, thread-safe, timed in the startup profile), so importing the module that defines it stays cheap.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Any]):
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_instance", None)
+        object.__setattr__(self, "_lock", threading.RLock())
+
+    def _resolve(self):
+        instance = self._instance
+        if instance is None:
+            with self._lock:
+                if self._instance is None:
+                    with startup_profile.phase(f"init {self._name}"):
+                        object.__setattr__(self, "_instance", self._factory())
+                instance = self._instance
+        return instance
+
+    @property
+    def is_initialized(self) -> bool:
+        return self._instance is not None
+
+    def __getattr__(self, item):
+        return getattr(self._resolve(), item)
+
+    def __setattr__(self, key, value):
+        setattr(self._resolve(), key, value)
+
+    def __repr__(self):
+        return f"<lazy {self._name}: {'ready' if self.is_initialized else 'not initialized'}>"
@@ -0,0 +1,246 @@
+import json
+import math
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+
+# Log-scale price histogram: each bucket spans 2%, so percentiles are within ~1% without keeping every price
+BUCKET_RATIO = 1.02
+_LOG_RATIO = math.log(BUCKET_RATIO)
+_EPOCH = date(2000, 1, 1)
+
+STAT_COLUMNS = """
+    n INTEGER DEFAULT 0,
+    price_n INTEGER DEFAULT 0,
+    price_sum REAL DEFAULT 0,
+    price_sq_sum REAL DEFAULT 0,
+    price_min REAL,
+    price_max REAL,
+    histogram TEXT DEFAULT '{}',
+    t_sum REAL DEFAULT 0,
+    tt_sum REAL DEFAULT 0,
+    ty_sum REAL DEFAULT 0,
+    delivery_sum REAL DEFAULT 0,
+    delivery_n INTEGER DEFAULT 0,
+    last_price REAL,
+    last_date TEXT
+"""
+
+
+def unit_price_of(data: Dict[str, Any]) -> Optional[float]:
+    """Per-unit price of a quote, derived from total / qty when only the total is given."""
+    try:
+        if data.get("unit_price") not in (None, ""):
+            return float(data["unit_price"])
+        if data.get("total") not in (None, "") and data.get("qty"):
+            return float(data["total"]) / float(data["qty"])
+    except (TypeError, ValueError, ZeroDivisionError):
+        pass
+    return None
+
+
+def _day_number(value: Optional[str]) -> float:
+    try:
+        d = datetime.strptime(str(value)[:10], "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        d = date.today()
+    return float((d - _EPOCH).days)
+
+
+class VendorStatsEngine:
+    """
+    Incrementally maintained price/delivery statistics per (vendor, material, currency) and per
+    (material, currency) peer group. Every quote updates a fixed number of rows; nothing rescans `quotes`.
+    """
+
+    def create_schema(self, cursor):
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'vendor_material_stats'")
+        is_new = cursor.fetchone() is None
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS vendor_material_stats (
+                vendor_name TEXT COLLATE NOCASE,
+                material TEXT COLLATE NOCASE,
+                currency TEXT COLLATE NOCASE,
+                {STAT_COLUMNS},
+                PRIMARY KEY (vendor_name, material, currency)
+            )
+        """)
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS material_stats (
+                material TEXT COLLATE NOCASE,
+                currency TEXT COLLATE NOCASE,
+                {STAT_COLUMNS},
+                PRIMARY KEY (material, currency)
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_vms_material ON vendor_material_stats(material, currency)")
+
+        cursor.execute("PRAGMA table_info(vendor_performance)")
+        columns = {row[1] for row in cursor.fetchall()}
+        for column, decl in (("quote_count", "INTEGER DEFAULT 0"), ("avg_delivery_weeks", "REAL"),
+                             ("delivery_sum", "REAL DEFAULT 0"), ("delivery_n", "INTEGER DEFAULT 0")):
+            if column not in columns:
+                cursor.execute(f"ALTER TABLE vendor_performance ADD COLUMN {column} {decl}")
+
+        if is_new:
+            # One-time seed for quotes stored before the engine existed; afterwards updates are incremental
+            cursor.execute("SELECT raw_json FROM quotes ORDER BY id")
+            for (raw,) in cursor.fetchall():
+                try:
+                    self.record_quote(cursor, json.loads(raw))
+                except (TypeError, ValueError):
+                    continue
+
+    # ─── INCREMENTAL UPDATE ────────────────────────────────────────────
+
+    def _update_row(self, cursor, table: str, key_cols: List[str], key: tuple,
+                    price: Optional[float], t: float, delivery: Optional[float], qdate: Optional[str]):
+        where = " AND ".join(f"{c} = ?" for c in key_cols)
+        cursor.execute(f"SELECT histogram FROM {table} WHERE {where}", key)
+        row = cursor.fetchone()
+        if row is None:
+            cursor.execute(f"INSERT INTO {table} ({', '.join(key_cols)}) VALUES ({', '.join('?' * len(key_cols))})", key)
+            histogram = {}
+        else:
+            histogram = json.loads(row[0] or "{}")
+
+        has_price = price is not None and price > 0
+        if has_price:
+            bucket = str(math.floor(math.log(price) / _LOG_RATIO))
+            histogram[bucket] = histogram.get(bucket, 0) + 1
+
+        cursor.execute(f"""
+            UPDATE {table} SET
+                n = n + 1,
+                price_n = price_n + ?,
+                price_sum = price_sum + ?,
+                price_sq_sum = price_sq_sum + ?,
+                price_min = CASE WHEN ? THEN MIN(COALESCE(price_min, ?), ?) ELSE price_min END,
+                price_max = CASE WHEN ? THEN MAX(COALESCE(price_max, ?), ?) ELSE price_max END,
+                histogram = ?,
+                t_sum = t_sum + ?,
+                tt_sum = tt_sum + ?,
+                ty_sum = ty_sum + ?,
+                delivery_sum = delivery_sum + ?,
+                delivery_n = delivery_n + ?,
+                last_price = CASE WHEN ? AND (last_date IS NULL OR ? >= last_date) THEN ? ELSE last_price END,
+                last_date = CASE WHEN last_date IS NULL OR ? >= last_date THEN ? ELSE last_date END
+            WHERE {where}
+        """, (
+            int(has_price), price if has_price else 0.0, price * price if has_price else 0.0,
+            has_price, price, price, has_price, price, price,
+            json.dumps(histogram),
+            t if has_price else 0.0, t * t if has_price else 0.0, t * price if has_price else 0.0,
+            delivery or 0.0, int(delivery is not None),
+            has_price, qdate, price, qdate, qdate,
+            *key,
+        ))
+
+    def record_quote(self, cursor, data: Dict[str, Any]):
+        """Fold one quote into the aggregates. Runs inside the caller's transaction."""
+        vendor = data.get("vendor_name")
+        if not vendor:
+            return
+        material = data.get("material") or ""
+        currency = data.get("currency") or ""
+        price = unit_price_of(data)
+        qdate = str(data.get("date") or date.today().isoformat())[:10]
+        t = _day_number(qdate)
+        try:
+            delivery = float(data["delivery_weeks"]) if data.get("delivery_weeks") not in (None, "") else None
+        except (TypeError, ValueError):
+            delivery = None
+
+        self._update_row(cursor, "vendor_material_stats", ["vendor_name", "material", "currency"],
+                         (vendor, material, currency), price, t, delivery, qdate)
+        self._update_row(cursor, "material_stats", ["material", "currency"],
+                         (material, currency), price, t, delivery, qdate)
+
+        cursor.execute("""
+            INSERT INTO vendor_performance (vendor_name, quote_count, delivery_sum, delivery_n, last_interaction)
+            VALUES (?, 0, 0, 0, ?) ON CONFLICT(vendor_name) DO NOTHING
+        """, (vendor, qdate))
+        cursor.execute("""
+            UPDATE vendor_performance SET
+                quote_count = COALESCE(quote_count, 0) + 1,
+                delivery_sum = COALESCE(delivery_sum, 0) + ?,
+                delivery_n = COALESCE(delivery_n, 0) + ?,
+                avg_delivery_weeks = (COALESCE(delivery_sum, 0) + ?) / NULLIF(COALESCE(delivery_n, 0) + ?, 0),
+                last_interaction = MAX(COALESCE(last_interaction, ''), ?)
+            WHERE vendor_name = ?
+        """, (delivery or 0.0, int(delivery is not None), delivery or 0.0, int(delivery is not None), qdate, vendor))
+
+        # Peer means moved for everyone quoting this material, so refresh that group only
+        cursor.execute("SELECT vendor_name FROM vendor_material_stats WHERE material = ? AND currency = ?",
+                       (material, currency))
+        for (peer_vendor,) in cursor.fetchall():
+            self._refresh_competitiveness(cursor, peer_vendor)
+
+    def _refresh_competitiveness(self, cursor, vendor: str):
+        """Peer mean / own mean across the vendor's materials, weighted by quotes (>1 = cheaper than peers)."""
+        cursor.execute("""
+            SELECT v.price_n, v.price_sum, m.price_n, m.price_sum
+            FROM vendor_material_stats v JOIN material_stats m ON m.material = v.material AND m.currency = v.currency
+            WHERE v.vendor_name = ? AND v.price_n > 0
+        """, (vendor,))
+        ratios, weights = 0.0, 0
+        for vn, vsum, mn, msum in cursor.fetchall():
+            if mn > vn and vsum > 0:
+                peer_mean = (msum - vsum) / (mn - vn)
+                ratios += vn * peer_mean / (vsum / vn)
+                weights += vn
+        cursor.execute("UPDATE vendor_performance SET price_competitiveness = ? WHERE vendor_name = ?",
+                       (round(ratios / weights, 4) if weights else None, vendor))
+
+    # ─── DERIVED VIEWS (constant work per row) ─────────────────────────
+
+    @staticmethod
+    def percentile(histogram: Dict[str, int], q: float, lo: float = None, hi: float = None) -> Optional[float]:
+        total = sum(histogram.values())
+        if not total:
+            return None
+        target = q * total
+        seen = 0
+        for bucket in sorted(histogram, key=int):
+            seen += histogram[bucket]
+            if seen >= target:
+                value = BUCKET_RATIO ** (int(bucket) + 0.5)
+                if lo is not None: value = max(value, lo)
+                if hi is not None: value = min(value, hi)
+                return round(value, 4)
+        return None
+
+    @classmethod
+    def describe(cls, row: Dict[str, Any], peer: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Turn a stored aggregate row into dashboard-ready statistics."""
+        n = row.get("price_n") or 0
+        histogram = json.loads(row.get("histogram") or "{}")
+        mean = row["price_sum"] / n if n else None
+        std = math.sqrt(max(row["price_sq_sum"] / n - mean * mean, 0.0)) if n else None
+        denom = n * row["tt_sum"] - row["t_sum"] ** 2
+        slope = (n * row["ty_sum"] - row["t_sum"] * row["price_sum"]) / denom if n > 1 and denom > 1e-9 else None
+
+        out = {k: row.get(k) for k in ("vendor_name", "material", "currency") if k in row}
+        out.update({
+            "quote_count": row.get("n", 0),
+            "priced_quotes": n,
+            "price_mean": round(mean, 4) if mean is not None else None,
+            "price_std": round(std, 4) if std is not None else None,
+            "price_min": row.get("price_min"),
+            "price_max": row.get("price_max"),
+            "price_p25": cls.percentile(histogram, 0.25, row.get("price_min"), row.get("price_max")),
+            "price_p50": cls.percentile(histogram, 0.50, row.get("price_min"), row.get("price_max")),
+            "price_p75": cls.percentile(histogram, 0.75, row.get("price_min"), row.get("price_max")),
+            "price_p90": cls.percentile(histogram, 0.90, row.get("price_min"), row.get("price_max")),
+            "trend_per_30d": round(slope * 30, 4) if slope is not None else None,
+            "trend_pct_per_30d": round(slope * 30 / mean * 100, 2) if slope is not None and mean else None,
+            "avg_delivery_weeks": round(row["delivery_sum"] / row["delivery_n"], 2) if row.get("delivery_n") else None,
+            "last_price": row.get("last_price"),
+            "last_date": row.get("last_date"),
+        })
+        if peer is not None and n:
+            peer_n = (peer.get("price_n") or 0) - n
+            if peer_n > 0:
+                peer_mean = (peer["price_sum"] - row["price_sum"]) / peer_n
+                out["peer_price_mean"] = round(peer_mean, 4)
+                out["competitiveness"] = round(peer_mean / mean, 4) if mean else None
+        return out
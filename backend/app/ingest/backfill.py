@@ -0,0 +1,146 @@
+"""
+Bulk backfill of historical quotes into SQLite + ChromaDB.
+
+Usage (from backend/):
+    python -m app.ingest.backfill [ROOT] [--concurrency 4] [--batch-size 100]
+
+ROOT defaults to ARCHIVE_DIR. Progress is recorded in the `ingest_files` ledger,
+so re-running after an interruption only processes files that are new or changed.
+"""
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+from typing import Callable, Dict, List, Optional, Any
+
+from app.core.config import settings
+from app.core.memory import memory_manager
+from app.agents.procurement_agent import procurement_agent
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = {".pdf", ".docx", ".xlsx", ".xls", ".csv", ".txt", ".jpg", ".jpeg", ".png"}
+
+
+class BackfillRunner:
+    """Walks a directory tree, extracts quotes with bounded concurrency and stores them in batches."""
+
+    def __init__(self, root: str, concurrency: int = 4, batch_size: int = 100,
+                 retry_failed: bool = True, progress: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.root = os.path.abspath(root)
+        self.concurrency = max(1, concurrency)
+        self.batch_size = max(1, batch_size)
+        self.retry_failed = retry_failed
+        self.progress = progress
+        self._buffer: List[Dict[str, Any]] = []
+        self._flush_lock = asyncio.Lock()
+        self.stats = {"total": 0, "processed": 0, "quotes": 0, "skipped": 0, "failed": 0,
+                      "already_done": 0, "reindexed": 0, "started": time.time()}
+
+    def discover(self) -> List[Dict[str, Any]]:
+        """List supported files under root that the ledger doesn't already have (unchanged) as done."""
+        ledger = memory_manager.get_ingest_ledger(self.root)
+        pending = []
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+            for name in filenames:
+                if os.path.splitext(name)[1].lower() not in SUPPORTED_EXTENSIONS:
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                seen = ledger.get(path)
+                if seen and seen["size"] == st.st_size and seen["mtime"] == st.st_mtime:
+                    if seen["status"] in ("done", "stored", "skipped") or (seen["status"] == "failed" and not self.retry_failed):
+                        self.stats["already_done"] += 1
+                        continue
+                pending.append({"path": path, "size": st.st_size, "mtime": st.st_mtime})
+        return pending
+
+    async def _process(self, record: Dict[str, Any], semaphore: asyncio.Semaphore):
+        async with semaphore:
+            try:
+                # Reading + LLM extraction are blocking; keep them off the event loop
+                result = await asyncio.to_thread(procurement_agent.extract_quote, record["path"])
+            except Exception as e:
+                result = {"type": "Error", "error": str(e)}
+
+        record["doc_type"] = result.get("type")
+        if result.get("data"):
+            record["data"] = result["data"]
+            self.stats["quotes"] += 1
+        elif result.get("error"):
+            record["status"], record["error"] = "failed", result["error"]
+            self.stats["failed"] += 1
+        else:
+            record["status"] = "skipped"
+            self.stats["skipped"] += 1
+        self.stats["processed"] += 1
+
+        self._buffer.append(record)
+        if len(self._buffer) >= self.batch_size:
+            await self._flush()
+
+    async def _flush(self):
+        async with self._flush_lock:
+            batch, self._buffer = self._buffer, []
+            if not batch:
+                return
+            quotes = [r.pop("data") for r in batch if "data" in r]
+            await asyncio.to_thread(memory_manager.store_quotes_bulk, quotes, batch)
+            self._report()
+
+    def _report(self):
+        elapsed = max(time.time() - self.stats["started"], 1e-6)
+        self.stats["rate_per_min"] = round(self.stats["processed"] / elapsed * 60, 1)
+        if self.progress:
+            self.progress(dict(self.stats))
+        else:
+            logger.info(f"Backfill progress: {self.stats['processed']}/{self.stats['total']} files, "
+                        f"{self.stats['quotes']} quotes, {self.stats['failed']} failed")
+
+    async def run(self) -> Dict[str, Any]:
+        if not os.path.isdir(self.root):
+            return {"status": "error", "message": f"Not a directory: {self.root}"}
+
+        # Finish indexing anything an interrupted run left in SQLite only
+        self.stats["reindexed"] = await asyncio.to_thread(memory_manager.reindex_stored_quotes, self.root)
+
+        pending = await asyncio.to_thread(self.discover)
+        self.stats["total"] = len(pending)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        await asyncio.gather(*(self._process(r, semaphore) for r in pending))
+        await self._flush()
+        self.stats["duration"] = round(time.time() - self.stats["started"], 2)
+        return {"status": "success", **self.stats}
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Bulk-import historical quotes into memory.")
+    parser.add_argument("root", nargs="?", default=settings.ARCHIVE_DIR, help="Directory tree to ingest (default: ARCHIVE_DIR)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Documents extracted in parallel")
+    parser.add_argument("--batch-size", type=int, default=100, help="Files per SQLite transaction / Chroma batch")
+    parser.add_argument("--no-retry-failed", action="store_true", help="Skip files that failed in a previous run")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    def progress(stats):
+        print(f"\r{stats['processed']}/{stats['total']} files | {stats['quotes']} quotes | "
+              f"{stats['skipped']} skipped | {stats['failed']} failed | {stats.get('rate_per_min', 0)}/min",
+              end="", flush=True)
+
+    runner = BackfillRunner(args.root, concurrency=args.concurrency, batch_size=args.batch_size,
+                            retry_failed=not args.no_retry_failed, progress=progress)
+    result = asyncio.run(runner.run())
+    print()
+    print(result)
+    return 0 if result.get("status") == "success" else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
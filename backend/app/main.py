@@ -1,6 +1,10 @@
-from fastapi import FastAPI, UploadFile, File, Form
-from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from app.core.startup import startup_profile  # First, so the profile covers every import below
+
+with startup_profile.phase("import fastapi"):
+    from fastapi import FastAPI, UploadFile, File, Form
+    from fastapi.middleware.cors import CORSMiddleware
+    from fastapi.responses import StreamingResponse
+    from pydantic import BaseModel
 from typing import Optional, List, Dict
 import os
 import json
@@ -9,13 +13,22 @@ import asyncio
 import re
 import time
 
-from app.core.config import settings
-from app.core.memory import memory_manager
-from app.core.llm import llm_engine
-from app.agents.procurement_agent import procurement_agent
-from app.tools.email_service import email_service
-from app.tools.computer_search import computer_tools
-from app.watcher.folder_watcher import start_watcher
+# Heavy subsystems (ChromaDB, pandas, OpenAI client) are not loaded here; they build on first use
+with startup_profile.phase("import app.core"):
+    from app.core.config import settings
+    from app.core.memory import memory_manager
+    from app.core.llm import llm_engine
+    from app.core.sessions import session_store, ChatSession
+    from app.core.leader import leader_election
+with startup_profile.phase("import app.tools"):
+    from app.tools.email_service import email_service
+    from app.tools.content_index import content_index
+    from app.tools.computer_search import computer_tools
+    from app.tools.organizer import folder_organizer
+    from app.tools.transfers import transfer_manager
+    from app.tools.known_locations import known_locations
+with startup_profile.phase("import app.watcher"):
+    from app.watcher.folder_watcher import start_watcher, ingestion_queue, watcher_metrics
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -42,8 +55,31 @@ app.add_middleware(
 # ─── Startup ─────────────────────────────────────────────────────────
 @app.on_event("startup")
 async def startup_event():
+    # Before serving: rows this worker marks 'running' must show it alive to the other workers
+    leader_election.register()
+    startup_profile.mark("accepting requests")
+    asyncio.create_task(_start_background_services())
+
+async def _start_background_services():
+    # Memory (SQLite + ChromaDB) loads in a worker thread so the API answers while it does
+    await asyncio.to_thread(lambda: memory_manager.db)
+    startup_profile.mark("memory ready")
+    startup_profile.log()
+    # With several uvicorn workers only the elected one watches folders; the others wait to take over
+    await leader_election.campaign(_start_leader_services)
+
+async def _start_leader_services():
     logger.info("Starting folder watcher...")
     asyncio.create_task(start_watcher())
+    asyncio.create_task(email_service.run_outbox())
+    asyncio.create_task(content_index.run())
+    startup_profile.mark("background services started")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    leader_election.resign()
+    if memory_manager.is_initialized:
+        await memory_manager.db.close_async()
 
 # ─── Health ──────────────────────────────────────────────────────────
 @app.get("/")
@@ -65,7 +101,8 @@ async def upload_file(file: UploadFile = File(...)):
     logger.info(f"File uploaded: {file_path}")
     
     try:
-        result = await procurement_agent.process_new_document(file_path)
+        # Recorded as an ingestion job, so the watcher does not pick the same file up again
+        result = await ingestion_queue.run_now(file_path, source="upload")
         return {"status": "success", "file": file.filename, "analysis": result}
     except Exception as e:
         logger.error(f"Analysis error: {e}")
@@ -113,7 +150,8 @@ async def open_file(body: Dict[str, str]):
 
 class ChatRequest(BaseModel):
     query: str
-    history: List[Dict[str, str]] = []
+    session_id: Optional[str] = None
+    history: List[Dict[str, str]] = []  # Legacy: only used to seed a new session
 
 SYSTEM_PROMPT = """You are **OmniMind**, a powerful, highly-versatile autonomous AI assistant with full, deep access to the user's computer.
 
@@ -169,14 +207,15 @@ async def chat_with_assistant(body: ChatRequest):
     start_time = time.time()
     
     user_query = body.query
-    history = body.history or []
     
     if not user_query:
         return {"reply": "Please provide a query.", "duration": 0}
     
+    session = session_store.get_or_create(body.session_id, seed_history=body.history)
+    path_before = session.current_path
+    
     # Fetch personal knowledge to make the agent "evolve"
-    learned_knowledge = memory_manager.get_learned_facts()
-    knowledge_text = "\n".join([f"- {fact}" for fact in learned_knowledge]) if learned_knowledge else "No specialized patterns learned yet. I will evolve as we interact."
+    knowledge_text = memory_manager.knowledge.prompt_block() or "No specialized patterns learned yet. I will evolve as we interact."
     
     dynamic_system_prompt = SYSTEM_PROMPT.format(learned_facts=knowledge_text)
     
@@ -185,8 +224,35 @@ async def chat_with_assistant(body: ChatRequest):
     
     # ─── TOOL EXECUTION LAYER ────────────────────────────────────────
     
-    # 1. FILE SEARCH
-    if any(k in lower_q for k in ["find", "search", "look for", "locate", "where is", "check"]):
+    # 1. DUPLICATE FILES
+    wants_duplicates = any(k in lower_q for k in ["duplicate", "same file", "copies of"])
+    if wants_duplicates:
+        path = _extract_path(user_query, session)
+        if path:
+            session.set_path(path)
+            result = await asyncio.to_thread(computer_tools.find_duplicates, [path], 1, 10)
+            if "error" in result:
+                context_parts.append(f"[TOOL: find_duplicates] Failed to scan {path}: {result['error']}")
+            else:
+                context_parts.append(f"[TOOL: find_duplicates] Scan of {path}: {json.dumps(result['stats'])}\n"
+                                     f"Largest duplicate groups (oldest copy first):\n{json.dumps(result['groups'], indent=1)}")
+                context_parts.append("[INSTRUCTION: Summarize the duplicates and how much space they waste, and suggest which copies could be archived. Never delete files.]")
+
+    # 2. DISK USAGE
+    wants_usage = any(k in lower_q for k in ["disk usage", "disk space", "filling up", "taking up", "using space",
+                                             "space used", "largest files", "biggest files", "largest folders", "biggest folders"])
+    if wants_usage:
+        path = _extract_path(user_query, session)
+        if path:
+            session.set_path(path)
+            usage = await asyncio.to_thread(computer_tools.analyze_disk_usage, path, 10)
+            if "error" in usage:
+                context_parts.append(f"[TOOL: disk_usage] Failed to analyze {path}: {usage['error']}")
+            else:
+                context_parts.append(f"[TOOL: disk_usage] Space used under {path} (sizes in bytes; show them in MB/GB):\n{json.dumps(usage, indent=1)}")
+
+    # 3. FILE SEARCH
+    if not (wants_duplicates or wants_usage) and any(k in lower_q for k in ["find", "search", "look for", "locate", "where is", "check"]):
         search_terms = _extract_search_terms(lower_q)
         search_root = None # Default to all drives
         
@@ -195,69 +261,104 @@ async def chat_with_assistant(body: ChatRequest):
         elif "documents" in lower_q: search_root = _get_common_path("documents")
         elif "d:" in lower_q or "d drive" in lower_q: search_root = "D:\\"
         
-        if search_terms:
+        content_query = _extract_content_query(user_query)
+        if content_query:
+            hits = content_index.search(content_query, limit=10, path_prefix=search_root)["results"]
+            if hits:
+                session.add_files([h["path"] for h in hits])
+                context_parts.append(f"[TOOL: content_search] {len(hits)} documents contain '{content_query}' (matches in **bold**):\n{json.dumps(hits, indent=1)}")
+            else:
+                context_parts.append(f"[TOOL: content_search] Status: No indexed documents contain '{content_query}'.")
+        elif search_terms:
             results = computer_tools.search_files(f"*{search_terms}*", search_root)
             if results and (isinstance(results[0], dict) and "path" in results[0]):
+                session.add_files([r["path"] for r in results[:10]])
                 context_parts.append(f"[TOOL: file_search] Found {len(results)} files matching '{search_terms}':\n{json.dumps(results[:10], indent=1)}")
             else:
                 context_parts.append(f"[TOOL: file_search] Status: No files found matching '{search_terms}' on the computer.")
     
-    # 2. FOLDER LISTING
+    # 4. FOLDER LISTING
     if any(k in lower_q for k in ["list", "show folder", "what's in", "contents of", "show me"]):
-        path = _extract_path(user_query, history)
+        path = _extract_path(user_query, session)
         if path:
+            session.set_path(path)
             listing = computer_tools.list_directory(path)
             context_parts.append(f"[TOOL: list_directory] Contents of {path}:\n{json.dumps(listing, indent=2)}")
 
-    # 3. FOLDER ORGANIZATION (Preview vs Execution)
-    if any(k in lower_q for k in ["organize", "sort", "arrange", "clean up", "tidy", "yes", "proceed", "do it"]):
-        path = _extract_path(user_query, history)
-        if path:
-            # Check if this is a confirmation to proceed
-            if any(k in lower_q for k in ["yes", "proceed", "do it", "confirm", "ok", "go ahead"]):
-                result = computer_tools.organize_folder(path)
-                if result.get("status") == "success":
-                    context_parts.append(f"[TOOL: organize_execute] Successfully organized {path}.\nMoved: {json.dumps(result.get('organized', {}), indent=2)}")
-                else:
-                    context_parts.append(f"[TOOL: organize_execute] Failed to organize {path}: {result.get('message')}")
+    # 5. FOLDER ORGANIZATION (Plan -> Confirm -> Execute exactly that plan; Undo via the journal)
+    wants_organize = bool(ORGANIZE.search(lower_q))
+    is_confirmation = _is_confirmation(lower_q)
+    pending = session.pending_plan
+    if not is_confirmation:
+        session.pending_plan = None  # A preview is only confirmed by the very next reply
+    if "undo" in lower_q and session.last_executed_plan_id:
+        result = await asyncio.to_thread(computer_tools.undo_organize, session.last_executed_plan_id)
+        session.last_executed_plan_id = None
+        context_parts.append(f"[TOOL: organize_undo] Restored files to their original places:\n{json.dumps(result, indent=1)}")
+    elif wants_organize or is_confirmation:
+        # A bare "yes" confirms the plan that was previewed, whatever the session's current path is now
+        if is_confirmation and pending:
+            session.pending_plan = None
+            root = pending["root"]
+            result = await asyncio.to_thread(computer_tools.execute_organize, pending["plan_id"])
+            if result.get("status") in ("done", "partial"):
+                session.set_path(root)
+                session.last_executed_plan_id = pending["plan_id"]
+                context_parts.append(f"[TOOL: organize_execute] Organized {root} as previewed.\n{json.dumps(result, indent=1)}")
+                context_parts.append("[INSTRUCTION: Report what moved, anything skipped or failed, and that saying 'undo' puts everything back.]")
+            else:
+                context_parts.append(f"[TOOL: organize_execute] Failed to organize {root}: {result.get('message')}")
+        elif is_confirmation:
+            context_parts.append("[TOOL: organize_execute] No organize plan is awaiting confirmation, so no files were moved.")
+            context_parts.append("[INSTRUCTION: If the user is confirming a folder organization, say that nothing is pending and nothing was moved; offer to preview a plan. Never claim files were organized.]")
+        elif not (_named_path(lower_q) or session.current_path):
+            context_parts.append("[TOOL: organize_preview] No folder was named and none is being discussed, so nothing was planned.")
+            context_parts.append("[INSTRUCTION: Ask the user which folder to organize. Never claim a plan was made.]")
+        else:
+            path = _named_path(lower_q) or session.current_path
+            session.set_path(path)
+            plan = await asyncio.to_thread(computer_tools.plan_organize, path)
+            if "plan_id" in plan:
+                session.pending_plan = {"plan_id": plan["plan_id"], "root": path}
+                plan["moves"] = plan["moves"][:50]  # by_folder / renamed already summarize the rest
+                context_parts.append(f"[TOOL: organize_preview] Planned moves for {path}:\n{json.dumps(plan, indent=1)}")
+                context_parts.append("[INSTRUCTION: Show the user exactly these planned moves (by folder, plus any renames for name clashes) and ask for confirmation ('Yes/No') before executing.]")
             else:
-                # Provide a preview first
-                listing = computer_tools.list_directory(path)
-                context_parts.append(f"[TOOL: organize_preview] Folder contents to organize in {path}:\n{json.dumps(listing, indent=2)}")
-                context_parts.append("[INSTRUCTION: Show the user what you WOULD organize and ask for confirmation ('Yes/No') before executing.]")
+                context_parts.append(f"[TOOL: organize_preview] Cannot organize {path}: {plan.get('message')}")
 
-    # 4. FILE READING
+    # 6. FILE READING
     if any(k in lower_q for k in ["read", "open", "analyze", "extract", "summarize"]):
         search_terms = _extract_search_terms(lower_q)
         if search_terms:
             found = computer_tools.find_by_name(search_terms)
             if found:
-                content = computer_tools.read_file_content(found[0])
-                context_parts.append(f"[TOOL: read_file] Read '{found[0]}':\n{content}")
+                session.add_files(found[:1])
+                content = await asyncio.to_thread(computer_tools.relevant_content, found[0], user_query)
+                context_parts.append(f"[TOOL: read_file] Read '{found[0]}' (cite the [section] labels when quoting):\n{content}")
             else:
                 context_parts.append(f"[TOOL: read_file] Status: File '{search_terms}' NOT FOUND on computer.")
 
-    # 5. MEMORY SEARCH
+    # 7. MEMORY SEARCH
     if any(k in lower_q for k in ["history", "previous", "last time", "remember", "past"]):
         try:
-            memory_results = memory_manager.search_history(user_query)
-            if memory_results and memory_results[0]:
+            memory_results = memory_manager.search_history(user_query, **memory_manager.infer_filters(user_query))
+            if memory_results:
                 context_parts.append(f"[TOOL: memory_search] Historical data found:\n{json.dumps(memory_results, indent=2)}")
             else:
                 context_parts.append("[TOOL: memory_search] Status: No matching historical records found in memory.")
         except:
             context_parts.append("[TOOL: memory_search] Status: Error searching memory database.")
 
-    # 6. MOVE / COPY FILES
+    # 8. MOVE / COPY FILES
     if any(k in lower_q for k in ["move", "copy", "transfer"]):
         context_parts.append("[INSTRUCTION: The user wants to move/copy files. Ask them to confirm source and destination paths before executing.]")
 
     # ─── BUILD FINAL PROMPT ──────────────────────────────────────────
     tool_context = "\n\n".join(context_parts) if context_parts else ""
     
-    # Keep the last 20 turns of history to prevent conversation "collapse"
+    # The session keeps the last 20 turns to prevent conversation "collapse"
     messages = [{"role": "system", "content": dynamic_system_prompt}]
-    for h in history[-20:]:
+    for h in session.get_history():
         messages.append({"role": h["role"], "content": h["content"]})
     
     messages.append({"role": "user", "content": f"{user_query}\n\n{tool_context}" if tool_context else user_query})
@@ -266,6 +367,11 @@ async def chat_with_assistant(body: ChatRequest):
         response = llm_engine.chat(messages)
         duration = round(time.time() - start_time, 2)
         
+        # A path the tools acted on this turn outranks paths merely mentioned in the reply
+        acted_on = session.current_path if session.current_path != path_before else None
+        session.add_message("user", user_query)
+        session.add_message("assistant", response, track_paths=acted_on is None)
+        
         # ─── SELF-LEARNING ENGINE (Background-ish) ───────────────────
         # Try to extract learned facts from this interaction
         if len(user_query) > 10:
@@ -277,12 +383,29 @@ async def chat_with_assistant(body: ChatRequest):
             """
             fact = llm_engine.chat([{"role": "user", "content": learning_prompt}])
             if fact and fact.strip().upper() != "NONE" and len(fact) < 150:
-                memory_manager.store_learned_fact("general", fact.strip())
+                # Duplicate check may embed the fact; keep it off the event loop
+                await asyncio.to_thread(memory_manager.store_learned_fact, "general", fact.strip())
         
-        return {"reply": response, "duration": duration}
+        return {"reply": response, "duration": duration, "session_id": session.session_id}
     except Exception as e:
         logger.error(f"Chat error: {e}")
-        return {"reply": f"I encountered an error: {str(e)}. Please try again.", "duration": 0}
+        return {"reply": f"I encountered an error: {str(e)}. Please try again.", "duration": 0, "session_id": session.session_id}
+    finally:
+        # The next turn may be served by another worker process
+        session_store.save(session)
+
+@app.get("/sessions/{session_id}")
+async def get_session(session_id: str):
+    """Inspect a chat session's tracked context."""
+    session = session_store.get(session_id)
+    if not session:
+        return {"status": "error", "message": "Session not found"}
+    return session.to_dict()
+
+@app.delete("/sessions/{session_id}")
+async def delete_session(session_id: str):
+    """Forget a chat session (e.g. when the user starts a new chat)."""
+    return {"status": "success" if session_store.delete(session_id) else "not_found"}
 
 # ─── TOOL: Organize Folder (Confirmed Action) ───────────────────────
 @app.post("/organize")
@@ -291,6 +414,30 @@ async def organize_folder(path: str):
     result = computer_tools.organize_folder(path)
     return result
 
+@app.post("/organize/plan")
+async def plan_organize(path: str, dest_root: Optional[str] = None):
+    """Preview: the exact moves `POST /organize/{plan_id}/execute` would make."""
+    return await asyncio.to_thread(computer_tools.plan_organize, path, None, dest_root)
+
+@app.get("/organize/plans")
+async def list_organize_plans(limit: int = 20):
+    return folder_organizer.list_plans(limit)
+
+@app.get("/organize/{plan_id}")
+async def get_organize_plan(plan_id: int):
+    plan = folder_organizer.get(plan_id)
+    if not plan:
+        return {"status": "error", "message": "Plan not found"}
+    return plan
+
+@app.post("/organize/{plan_id}/execute")
+async def execute_organize_plan(plan_id: int):
+    return await asyncio.to_thread(computer_tools.execute_organize, plan_id)
+
+@app.post("/organize/{plan_id}/undo")
+async def undo_organize_plan(plan_id: int):
+    return await asyncio.to_thread(computer_tools.undo_organize, plan_id)
+
 # ─── TOOL: Move File (Confirmed Action) ─────────────────────────────
 @app.post("/move-file")
 async def move_file(src: str, dest: str):
@@ -298,81 +445,292 @@ async def move_file(src: str, dest: str):
     result = computer_tools.move_file(src, dest)
     return result
 
+# ─── TOOL: Bulk Copy / Move (Confirmed Action) ──────────────────────
+class TransferRequest(BaseModel):
+    sources: List[str]  # Files and/or folders; a folder is transferred with its structure
+    dest: str
+    op: str = "copy"  # "copy" or "move"
+    verify: bool = False  # Compare checksums before a copied file is put in place
+
+@app.post("/transfers")
+async def start_transfer(req: TransferRequest):
+    """Start a bulk copy/move job; follow it at /transfers/{job_id}/events."""
+    job = await asyncio.to_thread(transfer_manager.create, req.sources, req.dest, req.op, req.verify)
+    if "job_id" in job:
+        job.update(transfer_manager.start(job["job_id"]))
+    return job
+
+@app.get("/transfers")
+async def list_transfers(limit: int = 20):
+    return transfer_manager.list_jobs(limit)
+
+@app.get("/transfers/{job_id}")
+async def get_transfer(job_id: int):
+    job = transfer_manager.status(job_id)
+    if not job:
+        return {"status": "error", "message": "Job not found"}
+    job["failures"] = transfer_manager.failures(job_id)
+    return job
+
+@app.get("/transfers/{job_id}/events")
+async def stream_transfer(job_id: int):
+    """Progress as server-sent events until the job stops."""
+    return StreamingResponse(transfer_manager.events(job_id), media_type="text/event-stream")
+
+@app.post("/transfers/{job_id}/resume")
+async def resume_transfer(job_id: int):
+    """Continue an interrupted, cancelled or partly failed job; finished files are not copied again."""
+    return transfer_manager.start(job_id)
+
+@app.post("/transfers/{job_id}/cancel")
+async def cancel_transfer(job_id: int):
+    return transfer_manager.cancel(job_id)
+
 # ─── Data Endpoints ──────────────────────────────────────────────────
+
 @app.get("/quotes")
-async def get_quotes():
+async def get_quotes(vendor: Optional[str] = None, material: Optional[str] = None,
+                     currency: Optional[str] = None, date_from: Optional[str] = None,
+                     date_to: Optional[str] = None, cursor: Optional[int] = None,
+                     limit: int = 50, fields: Optional[str] = None,
+                     include_raw: bool = False, format: str = "objects"):
+    """
+    List stored quotes, newest first. Pass `next_cursor` back as `cursor` for the next page.
+    `fields` is a comma-separated projection; `format=compact` returns column names plus row arrays.
+    """
     try:
-        cursor = memory_manager.sqlite_conn.cursor()
-        cursor.execute("SELECT * FROM quotes ORDER BY id DESC")
-        desc = cursor.description
-        if desc is None:
-            return []
-        columns = [col[0] for col in desc]
-        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        page = await memory_manager.query_quotes_async(
+            vendor=vendor, material=material, currency=currency,
+            date_from=date_from, date_to=date_to, before_id=cursor, limit=limit,
+            fields=[f.strip() for f in fields.split(",")] if fields else None,
+            include_raw=include_raw,
+        )
+        if format == "compact":
+            cols = page["columns"]
+            return {"columns": cols, "rows": [[r[c] for c in cols] for r in page["items"]], "next_cursor": page["next_cursor"]}
+        return {"items": page["items"], "next_cursor": page["next_cursor"]}
     except Exception as e:
         logger.error(f"Quotes error: {e}")
-        return []
+        return {"items": [], "next_cursor": None}
+
+@app.get("/quotes/{quote_id}/lineage")
+async def get_quote_lineage(quote_id: int, depth: int = 20):
+    """Earlier versions of a quote from the same vendor for the same material, newest first, with diffs."""
+    try:
+        return {"quote_id": quote_id, "versions": await memory_manager.quote_lineage_async(quote_id, depth)}
+    except Exception as e:
+        logger.error(f"Lineage error: {e}")
+        return {"quote_id": quote_id, "versions": []}
 
 @app.get("/vendors")
 async def get_vendors():
     try:
-        cursor = memory_manager.sqlite_conn.cursor()
-        cursor.execute("SELECT * FROM vendor_performance")
-        desc = cursor.description
-        if desc is None:
-            return []
-        columns = [col[0] for col in desc]
-        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        return await memory_manager.list_vendors_async()
     except:
         return []
 
+# ─── Bulk Backfill ───────────────────────────────────────────────────
+_backfill = {"runner": None, "task": None}
+
+@app.post("/backfill")
+async def start_backfill(root: Optional[str] = None, concurrency: int = 4, batch_size: int = 100):
+    """Start a resumable bulk import of historical quotes (defaults to ARCHIVE_DIR)."""
+    from app.ingest.backfill import BackfillRunner
+    if _backfill["task"] and not _backfill["task"].done():
+        return {"status": "running", **_backfill["runner"].stats}
+    runner = BackfillRunner(root or settings.ARCHIVE_DIR, concurrency=concurrency, batch_size=batch_size,
+                            progress=lambda stats: None)
+    _backfill.update(runner=runner, task=asyncio.create_task(runner.run()))
+    return {"status": "started", "root": runner.root}
+
+@app.get("/backfill")
+async def backfill_status():
+    runner, task = _backfill["runner"], _backfill["task"]
+    if not runner:
+        return {"status": "idle"}
+    if task.done():
+        return task.result() if not task.exception() else {"status": "error", "message": str(task.exception())}
+    return {"status": "running", **runner.stats}
+
+@app.get("/ingest/metrics")
+async def ingest_metrics():
+    """Folder-watcher queue depth, in-flight work, throughput and polling watcher state (of this worker)."""
+    return {**watcher_metrics(), "election": leader_election.status()}
+
+@app.get("/workers")
+async def get_workers():
+    """This worker's role in multi-worker mode and which worker runs the watcher and ingestion."""
+    return await asyncio.to_thread(leader_election.status)
+
+@app.get("/ingest/jobs")
+async def list_ingest_jobs(status: Optional[str] = None, cursor: Optional[int] = None, limit: int = 50):
+    """Watched-folder ingestion jobs, newest first, with per-status counts."""
+    return memory_manager.jobs.list(status=status, cursor=cursor, limit=limit)
+
+@app.get("/ingest/jobs/{job_id}")
+async def get_ingest_job(job_id: int):
+    """One ingestion job including the stored pipeline result."""
+    job = memory_manager.jobs.get(job_id)
+    if job is None:
+        return {"status": "error", "message": f"No ingestion job {job_id}"}
+    return job
+
+@app.get("/locations")
+async def get_locations():
+    """Well-known folders, user-confirmed locations and drive roots."""
+    return known_locations.snapshot()
+
+@app.post("/locations")
+async def confirm_location(body: Dict[str, str]):
+    """Remember a user-confirmed location, e.g. {"name": "desktop", "path": "D:/Desktop"}."""
+    name, path = body.get("name"), body.get("path")
+    if not name or not path:
+        return {"status": "error", "message": "Both name and path are required"}
+    return known_locations.confirm(name, path)
+
+@app.get("/vendors/{vendor_name}/stats")
+async def get_vendor_stats(vendor_name: str):
+    try:
+        return await memory_manager.vendor_stats_async(vendor_name)
+    except Exception as e:
+        logger.error(f"Vendor stats error: {e}")
+        return []
+
+@app.get("/materials/{material}/stats")
+async def get_material_stats(material: str, currency: Optional[str] = None):
+    try:
+        return await memory_manager.material_stats_async(material, currency)
+    except Exception as e:
+        logger.error(f"Material stats error: {e}")
+        return []
+
+# ─── Quote Comparison ────────────────────────────────────────────────
+class CompareRequest(BaseModel):
+    quote_ids: List[int] = []
+    quotes: List[Dict] = []
+    weights: Optional[Dict[str, float]] = None
+    narrate: bool = True
+
+@app.post("/compare")
+async def compare_quotes(body: CompareRequest):
+    """Rank quotes (stored ids and/or inline quote dicts) with normalized price, delivery and payment scoring."""
+    quotes = list(body.quotes)
+    if body.quote_ids:
+        rows = await memory_manager.db.fetch_all_async(
+            f"SELECT raw_json FROM quotes WHERE id IN ({','.join('?' * len(body.quote_ids))})", body.quote_ids)
+        quotes.extend(json.loads(r["raw_json"]) for r in rows)
+    from app.tools.comparison_engine import comparison_engine
+    return await asyncio.to_thread(comparison_engine.compare_quotations, quotes, body.weights, body.narrate)
+
+# ─── Analytics (columnar snapshot of quote history) ──────────────────
+@app.post("/analytics/snapshot")
+async def refresh_analytics_snapshot():
+    """Append quotes newer than the last export to the Parquet snapshot."""
+    from app.tools.price_analytics import price_analytics
+    return await asyncio.to_thread(price_analytics.refresh_snapshot)
+
+@app.get("/analytics/price-trend")
+async def price_trend(material: Optional[str] = None, vendor: Optional[str] = None,
+                      currency: Optional[str] = None, freq: str = "M", window: int = 3):
+    """Average unit price per period with moving average and YoY change (computed server-side)."""
+    from app.tools.price_analytics import price_analytics
+    return await asyncio.to_thread(price_analytics.price_trend, material, vendor, currency, freq, window)
+
+@app.get("/analytics/summary")
+async def analytics_summary(group_by: str = "material", material: Optional[str] = None,
+                            vendor: Optional[str] = None, currency: Optional[str] = None):
+    """Per-material or per-vendor price aggregates with trailing-12-month YoY change."""
+    from app.tools.price_analytics import price_analytics
+    return await asyncio.to_thread(price_analytics.summary, group_by, material, vendor, currency)
+
 @app.post("/send-email")
 async def send_email(to: str, subject: str, body: str):
+    """Queue an approved email; it is delivered in the background (see /outbox)."""
     return email_service.send_email(to, subject, body)
 
+class OutboxRequest(BaseModel):
+    messages: List[Dict[str, str]]  # [{"to": ..., "subject": ..., "body": ...}]
+
+@app.post("/outbox")
+async def queue_emails(req: OutboxRequest):
+    """Queue a batch of approved emails; they go out over a shared SMTP connection."""
+    return email_service.queue_emails(req.messages)
+
+@app.get("/outbox")
+async def list_outbox(status: Optional[str] = None, limit: int = 100):
+    return email_service.list_outbox(status, limit)
+
+@app.get("/outbox/{message_id}")
+async def get_outbox_message(message_id: int):
+    message = email_service.outbox_status(message_id)
+    if message is None:
+        return {"status": "error", "message": f"No outbox message {message_id}"}
+    return message
+
+@app.post("/outbox/{message_id}/retry")
+async def retry_outbox_message(message_id: int):
+    return email_service.retry(message_id)
+
+@app.get("/content-search")
+async def content_search(q: str, limit: int = 20, path: Optional[str] = None):
+    """Find documents whose text contains the query, with highlighted snippets."""
+    return content_index.search(q, limit=limit, path_prefix=path)
+
+@app.get("/archive")
+async def list_archive(path: str):
+    """Files inside a ZIP archive, without extracting it."""
+    return await asyncio.to_thread(computer_tools.list_archive, path)
+
+@app.get("/content-index")
+async def content_index_stats():
+    return content_index.stats()
+
+@app.post("/content-index/refresh")
+async def refresh_content_index():
+    """Rescan now instead of waiting for the next interval (re-stats every file, so in-place edits are seen)."""
+    return await content_index.refresh(full=True)
+
+@app.get("/duplicates")
+async def find_duplicates(path: Optional[str] = None, min_size: int = 1, limit: int = 100):
+    """Identical files under `path` (';'-separated for several roots; default all drives)."""
+    roots = [p.strip() for p in path.split(";") if p.strip()] if path else None
+    return await asyncio.to_thread(computer_tools.find_duplicates, roots, min_size, limit)
+
+@app.get("/disk-usage")
+async def get_disk_usage(path: str, top: int = 20, deep: bool = False):
+    """Largest folders and files under `path` plus a per-extension breakdown. `deep` re-lists every folder."""
+    return await asyncio.to_thread(computer_tools.analyze_disk_usage, path, top, deep)
+
+@app.get("/startup-profile")
+async def get_startup_profile():
+    """Import and initialization timings since the app module started loading."""
+    return startup_profile.report()
+
+@app.get("/embeddings/stats")
+async def embedding_stats():
+    """Embedding throughput and cache hit rate for the vector store."""
+    return memory_manager.embedding_function.get_stats()
+
 @app.get("/search")
-async def search_memory(q: str):
+async def search_memory(q: str, vendor: Optional[str] = None, material: Optional[str] = None,
+                        date_from: Optional[str] = None, date_to: Optional[str] = None, limit: int = 5):
     try:
-        return memory_manager.search_history(q)
+        return memory_manager.search_history(q, limit=limit, vendor=vendor, material=material,
+                                             date_from=date_from, date_to=date_to)
     except:
         return []
 
 # ─── Helper Functions ────────────────────────────────────────────────
+# A reply that is nothing but a confirmation ("yes", "ok, go ahead!"); "ok, now show the Tata quote" is not one
+CONFIRMATION = re.compile(r"(?:(?:yes|yeah|yep|sure|please|proceed|do it|confirm(?:ed)?|ok|okay|go ahead)[\s,.!]*)+")
+ORGANIZE = re.compile(r"\b(?:organi[sz]e|sort|arrange|clean up|tidy)\b")
+
+def _is_confirmation(lower: str) -> bool:
+    return CONFIRMATION.fullmatch(lower.strip()) is not None
+
 def _get_common_path(name: str) -> str:
-    """Dynamically find common folders like Desktop, Downloads across all drives."""
-    name = name.lower()
-    
-    # Standard user profile path
-    user_home = os.path.expanduser("~")
-    # Quick Check standard paths
-    if name == "desktop":
-        for p in [os.path.join(user_home, "Desktop"), os.path.join(user_home, "OneDrive", "Desktop")]:
-            if os.path.exists(p): return p
-    if name == "downloads":
-        p = os.path.join(user_home, "Downloads")
-        if os.path.exists(p): return p
-    if name == "documents":
-        for p in [os.path.join(user_home, "Documents"), os.path.join(user_home, "OneDrive", "Documents")]:
-            if os.path.exists(p): return p
-    
-    # Check for any folder starting with OneDrive (e.g. OneDrive - Company)
-    if name in ["desktop", "documents"]:
-        for d in os.listdir(user_home):
-            if d.startswith("OneDrive"):
-                od_path = os.path.join(user_home, d, name.capitalize())
-                if os.path.exists(od_path):
-                    return od_path
-
-    # Fallback: Search all drives for a folder exactly matching this name (Search is drive-agnostic)
-    found = computer_tools.find_by_name(name)
-    dirs = [f for f in found if os.path.isdir(f)]
-    if dirs:
-        # Prefer paths that look like standard user folders or roots
-        for d in dirs:
-            if "Users" in d or len(d) < 10: return d
-        return dirs[0]
-        
-    return user_home # Ultimate fallback
+    """Resolve common folders like Desktop, Downloads via the known-locations registry (no disk crawl)."""
+    return known_locations.resolve(name) or os.path.expanduser("~")
 
 def _extract_search_terms(query: str) -> str:
     """Extract the most likely search term from a natural language query."""
@@ -387,43 +745,45 @@ def _extract_search_terms(query: str) -> str:
     meaningful = [w for w in words if w.lower() not in stop_words and len(w) > 2]
     return " ".join(meaningful[:3]) if meaningful else ""
 
-def _extract_path(query: str, history: List[Dict[str, str]] = None) -> str:
-    """Try to extract a file path from a natural language query or history context."""
-    lower = query.lower()
-    
-    # 0. Check for "it", "this", "that", "the folder"
-    is_referential = any(k in lower for k in ["it", "this", "that", "the folder", "the directory"])
-    
-    # 1. Check for well-known folders in CURRENT query
+def _extract_content_query(query: str) -> str:
+    """Text the user wants to find *inside* documents, e.g. 'the quote that mentions 12mm SS304 plates'."""
+    match = re.search(r"\b(?:contain(?:s|ing)?|mention(?:s|ing)?|says|saying|with the (?:text|words?)|referring to)\s+(.+)",
+                      query, flags=re.IGNORECASE)
+    if not match:
+        return ""
+    return match.group(1).strip(" ?.!'\"")
+
+def _named_path(lower: str) -> Optional[str]:
+    """The folder a (lowercased) query names explicitly, or None."""
+    # 1. Well-known folders
     for folder in ["desktop", "downloads", "documents"]:
         if folder in lower:
             return _get_common_path(folder)
     
-    # 2. Direct check in current query
+    # 2. Workspace folders and drives
     if "rfq" in lower: return settings.RFQ_DIR
     if "inbox" in lower: return settings.INBOX_DIR
     if "orders" in lower: return settings.ORDERS_DIR
     if "workspace" in lower: return settings.WORKSPACE_ROOT
     if "d:" in lower or "d drive" in lower: return "D:\\"
     if "c:" in lower or "c drive" in lower: return "C:\\"
+    return None
+
+def _extract_path(query: str, session: Optional[ChatSession] = None) -> str:
+    """Try to extract a file path from a natural language query or the session context."""
+    lower = query.lower()
     
-    # 3. If referential or confirmation, look deep into history
-    if is_referential or (history and any(k in lower for k in ["yes", "proceed", "do it", "confirm", "ok", "go ahead"])):
-        # Search backwards through history for the last mentioned path
-        for msg in reversed(history):
-            h_content = msg["content"].lower()
-            # Look for explicit paths in history content
-            import re
-            # Match Windows-style paths D:\... or /host_...
-            paths = re.findall(r'[a-zA-Z]:\\[^ \n\r\t]+', h_content)
-            if paths: return paths[0]
-            
-            # Look for folder names
-            for folder in ["desktop", "downloads", "documents"]:
-                if folder in h_content:
-                    return _get_common_path(folder)
-            
-            if "d drive" in h_content or "d:" in h_content: return "D:\\"
-            if "workspace" in h_content: return settings.WORKSPACE_ROOT
+    # 0. Check for "it", "this", "that", "the folder"
+    is_referential = any(k in lower for k in ["it", "this", "that", "the folder", "the directory"])
+    
+    # 1-2. A folder named in the CURRENT query
+    named = _named_path(lower)
+    if named:
+        return named
+    
+    # 3. If referential or confirmation, use the session's tracked path (kept up to date per turn)
+    if session and session.current_path:
+        if is_referential or _is_confirmation(lower):
+            return session.current_path
             
     return os.path.expanduser("~") # Default to User Home
@@ -0,0 +1,43 @@
+import io
+import os
+import zipfile
+from typing import Any, Dict, Iterator, List, Tuple
+
+ARCHIVE_EXTENSIONS = {".zip"}
+READABLE_MEMBER_EXTENSIONS = {".pdf", ".docx", ".xlsx", ".xls", ".csv", ".txt"}
+MEMBER_MAX_BYTES = 25 * 1024 * 1024  # Largest member decompressed into memory; bigger ones are listed only
+
+
+def is_archive(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() in ARCHIVE_EXTENSIONS
+
+
+def list_members(path: str) -> List[Dict[str, Any]]:
+    """Files inside a ZIP, from its central directory (nothing is decompressed)."""
+    with zipfile.ZipFile(path) as zf:
+        return [{
+            "name": info.filename,
+            "size": info.file_size,
+            "compressed": info.compress_size,
+            "modified": "%04d-%02d-%02d %02d:%02d" % info.date_time[:5],
+            "encrypted": bool(info.flag_bits & 0x1),
+        } for info in zf.infolist() if not info.is_dir()]
+
+
+def iter_readable_members(path: str, max_bytes: int = MEMBER_MAX_BYTES) -> Iterator[Tuple[str, str, io.BytesIO]]:
+    """
+    (member name, extension, in-memory file) for each document member, one at a time, so memory is
+    bounded by the largest member rather than the archive. Encrypted, oversized and nested archives are skipped.
+    """
+    with zipfile.ZipFile(path) as zf:
+        for info in zf.infolist():
+            ext = os.path.splitext(info.filename)[1].lower()
+            if info.is_dir() or ext not in READABLE_MEMBER_EXTENSIONS or info.flag_bits & 0x1:
+                continue
+            if info.file_size > max_bytes:
+                continue
+            with zf.open(info) as member:
+                data = member.read(max_bytes + 1)
+            if len(data) > max_bytes:
+                continue  # Header understated the size (e.g. a zip bomb)
+            yield info.filename, ext, io.BytesIO(data)
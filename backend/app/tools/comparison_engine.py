@@ -1,51 +1,162 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from app.core.llm import llm_engine
+from app.core.config import settings
+from app.core.lineage import diff_quotes
+import json
+import logging
+import numpy as np
 import pandas as pd
 
+logger = logging.getLogger(__name__)
+
+# Units of INR per unit of currency; override with memory/fx_rates.json ({"USD": 83.1, ...})
+DEFAULT_FX_RATES = {"INR": 1.0, "USD": 83.0, "EUR": 90.0, "GBP": 105.0, "JPY": 0.56, "CNY": 11.5, "AED": 22.6, "SGD": 62.0}
+CURRENCY_ALIASES = {"RS": "INR", "RS.": "INR", "₹": "INR", "RUPEES": "INR", "$": "USD", "US$": "USD",
+                    "€": "EUR", "£": "GBP", "¥": "JPY", "RMB": "CNY"}
+DEFAULT_WEIGHTS = {"price": 0.6, "delivery": 0.25, "payment": 0.15}
+
+
+class FxRates:
+    """Configurable conversion table: rates are expressed against a common pivot, output in BASE_CURRENCY."""
+
+    def __init__(self, path: str = None, base: str = None):
+        self.path = path or settings.FX_RATES_PATH
+        self.base = (base or settings.BASE_CURRENCY).upper()
+        self.rates = dict(DEFAULT_FX_RATES)
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.rates.update({k.upper(): float(v) for k, v in json.load(f).items()})
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable FX rate table {self.path}: {e}")
+
+    @staticmethod
+    def normalize_code(series: pd.Series) -> pd.Series:
+        codes = series.fillna("").astype(str).str.strip().str.upper()
+        return codes.replace(CURRENCY_ALIASES)
+
+    def factors(self, codes: pd.Series) -> pd.Series:
+        """Multiplier converting each currency to the base currency (NaN when the rate is unknown)."""
+        base_rate = self.rates.get(self.base, 1.0)
+        # Unlabelled quotes are assumed to be in the base currency
+        codes = codes.replace("", self.base)
+        return codes.map(self.rates).astype(float) / base_rate
+
+
 class ComparisonEngine:
     @staticmethod
-    def compare_quotations(quotes: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def score_quotations(quotes: List[Dict[str, Any]], weights: Dict[str, float] = None,
+                         fx: FxRates = None) -> pd.DataFrame:
+        """
+        Deterministic, vectorized scoring: normalize currency and unit price, then weight
+        price, delivery and payment terms. Returns the table sorted best-first.
+        """
+        weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        fx = fx or FxRates()
+        df = pd.DataFrame(quotes)
+        for col in ["vendor_name", "material", "currency", "payment_terms", "unit_price", "qty", "total", "delivery_weeks"]:
+            if col not in df.columns:
+                df[col] = None
+
+        unit = pd.to_numeric(df["unit_price"], errors="coerce")
+        qty = pd.to_numeric(df["qty"], errors="coerce").replace(0, np.nan)
+        total = pd.to_numeric(df["total"], errors="coerce")
+        df["unit_price_calc"] = unit.fillna(total / qty)
+        df["currency_code"] = FxRates.normalize_code(df["currency"])
+        df["fx_factor"] = fx.factors(df["currency_code"])
+        df["unit_price_base"] = df["unit_price_calc"] * df["fx_factor"]
+        df["total_base"] = total.fillna(df["unit_price_calc"] * qty) * df["fx_factor"]
+
+        # Payment terms -> credit days (longer credit is better for the buyer; advance is worst)
+        terms = df["payment_terms"].fillna("").astype(str).str.lower()
+        days = pd.to_numeric(terms.str.extract(r"(\d+)\s*(?:days?|d\b)")[0], errors="coerce")
+        # Word-bounded, so "commercial invoice" is not "cia" and "code" is not "cod"
+        days = days.mask(terms.str.contains(r"\badvance\b|\bcia\b|\bprepa(?:y|id)"), 0)
+        days = days.mask(days.isna() & terms.str.contains(r"\blc\b|letter of credit"), 60)
+        days = days.mask(days.isna() & terms.str.contains(r"\bimmediate|\bon delivery\b|\bcod\b"), 0)
+        df["credit_days"] = days
+
+        weeks = pd.to_numeric(df["delivery_weeks"], errors="coerce")
+        price = df["unit_price_base"]
+        df["price_score"] = (price.min() / price).where(price > 0, 0.0).fillna(0.0)
+        df["delivery_score"] = (weeks.min() / weeks).where(weeks > 0, 1.0).where(weeks.notna(), 0.0)
+        max_days = days.max()
+        df["payment_score"] = (days / max_days).fillna(0.0) if max_days and max_days > 0 else days.notna().astype(float)
+
+        total_weight = sum(weights.values()) or 1.0
+        df["score"] = (weights["price"] * df["price_score"]
+                       + weights["delivery"] * df["delivery_score"]
+                       + weights["payment"] * df["payment_score"]) / total_weight
+        df["comparable"] = price.notna()
+        flags = {"no price": price.isna(),
+                 "unknown currency": df["fx_factor"].isna() & df["unit_price_calc"].notna(),
+                 "no delivery": weeks.isna(),
+                 "unclear payment terms": days.isna()}
+        issues = pd.Series("", index=df.index, dtype=object)
+        for label, mask in flags.items():
+            issues = issues + mask.map({True: label + "; ", False: ""})
+        df["issues"] = issues.str.rstrip("; ")
+        df["score"] = df["score"].round(4)
+
+        # Stable tie-breaks (cheaper, then vendor name) keep the ranking deterministic
+        df = df.sort_values(["comparable", "score", "unit_price_base", "vendor_name"],
+                            ascending=[False, False, True, True], na_position="last", kind="mergesort")
+        df["rank"] = np.arange(1, len(df) + 1)
+        return df.reset_index(drop=True)
+
+    @staticmethod
+    def compare_quotations(quotes: List[Dict[str, Any]], weights: Dict[str, float] = None,
+                           narrate: bool = True) -> Dict[str, Any]:
         """
         Takes a list of structured quote data and produces a comparison table and recommendation.
+        Scoring is computed locally; the LLM only writes the narrative.
         """
         if not quotes:
             return {"error": "No quotes provided for comparison"}
-        
-        # Convert to DataFrame for tabular representation
-        df = pd.DataFrame(quotes)
-        
-        # Use LLM for qualitative analysis and recommendation
-        prompt = f"""
-        Compare these vendor quotations for procurement. 
-        Highlight:
-        1. Best price (normalized)
-        2. Delivery time differences
-        3. Payment term risks
-        4. Technical deviations / missing info
-        
-        Data:
-        {df.to_json(orient='records')}
-        
-        Return a structured comparison summary with a 'recommendation'.
+
+        fx = FxRates()
+        df = ComparisonEngine.score_quotations(quotes, weights, fx)
+        comparable = df[df["comparable"]]
+        best = comparable.iloc[0] if not comparable.empty else None
+
+        columns = ["rank", "vendor_name", "material", "currency_code", "unit_price_calc", "unit_price_base",
+                   "total_base", "delivery_weeks", "credit_days", "payment_terms", "score", "issues"]
+        table = df[columns].replace({np.nan: None}).to_dict(orient='records')
+
+        analysis = None
+        if narrate:
+            # Send the computed ranking (not raw quote JSON) so the prompt stays small
+            prompt = f"""
+        Write a short procurement comparison for these vendor quotations. The ranking and scores are
+        already computed (prices normalized to {fx.base} per unit); do NOT recompute or re-rank them.
+        Explain the recommendation, delivery and payment term trade-offs, and flag the listed issues.
+
+        Ranked data:
+        {df[columns].head(15).to_json(orient='records')}
         """
-        
-        analysis = llm_engine.chat([{"role": "user", "content": prompt}])
-        
+            analysis = llm_engine.chat([{"role": "user", "content": prompt}])
+
         return {
-            "table": df.to_dict(orient='records'),
+            "table": table,
             "analysis": analysis,
-            "best_bid": df.loc[df['total'].idxmin()].get('vendor_name') if 'total' in df.columns else "Unknown"
+            "best_bid": best["vendor_name"] if best is not None else "Unknown",
+            "base_currency": fx.base,
+            "weights": {**DEFAULT_WEIGHTS, **(weights or {})},
         }
 
     @staticmethod
-    def detect_revisions(old_quote: Dict[str, Any], new_quote: Dict[str, Any]) -> str:
-        prompt = f"""
-        Compare these two versions of a quotation from {old_quote.get('vendor_name')}.
-        Identify ONLY what has changed (price, delivery, terms).
-        
-        Old: {old_quote}
-        New: {new_quote}
+    def detect_revisions(old_quote: Dict[str, Any], new_quote: Dict[str, Any], narrate: bool = False) -> Dict[str, Any]:
+        """Field-level diff between two versions of a quotation; the LLM only narrates it when asked."""
+        diff = diff_quotes(old_quote, new_quote)
+        if narrate and diff["changed"]:
+            prompt = f"""
+        Explain in 2-3 sentences what changed in this revised quotation from {new_quote.get('vendor_name')}
+        and whether it is better or worse for the buyer. The changes are already computed; do not invent others.
+
+        Changes: {json.dumps(diff['fields'])}
         """
-        return llm_engine.chat([{"role": "user", "content": prompt}])
+            diff["narrative"] = llm_engine.chat([{"role": "user", "content": prompt}])
+        return diff
 
 comparison_engine = ComparisonEngine()
@@ -5,6 +5,7 @@ import json
 import logging
 from typing import List, Dict, Any, Optional
 from datetime import datetime
+from app.tools.archives import is_archive
 
 logger = logging.getLogger(__name__)
 
@@ -14,42 +15,14 @@ class ComputerTools:
     @staticmethod
     def get_all_drives() -> List[str]:
         """Detect all available drives on Windows or return root on Linux."""
-        import platform
-        if platform.system() == "Windows":
-            import string
-            from ctypes import windll
-            drives = []
-            bitmask = windll.kernel32.GetLogicalDrives()
-            for letter in string.ascii_uppercase:
-                if bitmask & 1:
-                    drives.append(f"{letter}:\\")
-                bitmask >>= 1
-            return drives
-        return ["/"]
+        from app.tools.known_locations import KnownLocations
+        return KnownLocations.get_all_drives()
 
     @staticmethod
-    def get_universal_roots() -> List[str]:
-        """Get standard root directories like User folders and all drives."""
-        roots = []
-        # 1. User profile folders
-        user_profile = os.path.expanduser("~")
-        roots.append(user_profile)
-        
-        # 2. All logical drives
-        try:
-            roots.extend(ComputerTools.get_all_drives())
-        except:
-            pass
-        
-        # 3. Specific workspace if present
-        if os.path.exists("/workspace"): roots.append("/workspace")
-        
-        # Clean and return unique existing directories
-        valid_roots = []
-        for r in set(roots):
-            if os.path.isdir(r):
-                valid_roots.append(r)
-        return valid_roots
+    def get_universal_roots(refresh: bool = False) -> List[str]:
+        """Get standard root directories like User folders and all drives (cached, revalidated on mount changes)."""
+        from app.tools.known_locations import known_locations
+        return known_locations.get_roots(refresh=refresh)
 
     # ─── SEARCH & DISCOVER ─────────────────────────────────────────────
 
@@ -86,7 +59,7 @@ class ComputerTools:
 
     @staticmethod
     def search_files(pattern: str, root_dir: str = None, max_results: int = 25) -> List[Dict[str, str]]:
-        """Search for files matching a pattern using os.walk for better control."""
+        """Search for files matching a pattern using os.walk for better control. Looks inside ZIP archives too."""
         if root_dir is None:
             # Default to scanning all drives if no root is provided
             roots = ComputerTools.get_universal_roots()
@@ -127,11 +100,44 @@ class ComputerTools:
                         
                         if len(results) >= max_results:
                             return results
+
+                    if is_archive(name):
+                        for member in ComputerTools._archive_matches(os.path.join(root, name), pattern_lower):
+                            results.append(member)
+                            if len(results) >= max_results:
+                                return results
             return results
         except Exception as e:
             logger.error(f"Search error in {root_dir}: {e}")
             return [{"error": str(e)}]
 
+    @staticmethod
+    def _archive_matches(archive_path: str, pattern_lower: str) -> List[Dict[str, Any]]:
+        """Members of a ZIP whose file name matches (listing cached in the content index, misses cached in the background)."""
+        from app.tools.content_index import content_index
+        try:
+            members = content_index.archive_members(archive_path, background=True)
+        except Exception:
+            return []  # Corrupt, encrypted-directory or locked archive
+        return [{
+            "path": archive_path.replace("\\", "/"),
+            "member": m["name"],
+            "name": os.path.basename(m["name"]),
+            "size_kb": round(m["size"] / 1024, 1),
+            "modified": m["modified"],
+        } for m in members if pattern_lower in os.path.basename(m["name"]).lower()]
+
+    @staticmethod
+    def list_archive(path: str) -> Dict[str, Any]:
+        """Files inside a ZIP archive, without extracting it."""
+        from app.tools.content_index import content_index
+        try:
+            members = content_index.archive_members(os.path.expanduser(path))
+            return {"path": path, "total_files": len(members),
+                    "total_size_kb": round(sum(m["size"] for m in members) / 1024, 1), "members": members}
+        except Exception as e:
+            return {"error": str(e)}
+
     @staticmethod
     def find_by_name(name_fragment: str, root_dirs: List[str] = None) -> List[str]:
         """Find files or folders containing a name fragment across multiple root directories."""
@@ -162,6 +168,28 @@ class ComputerTools:
                 continue
         return found
 
+    @staticmethod
+    def find_duplicates(root_dirs: List[str] = None, min_size: int = 1, limit: int = 100) -> Dict[str, Any]:
+        """Groups of identical files (by content) across the given roots, largest wasted space first."""
+        from app.tools.duplicates import duplicate_finder
+        if root_dirs is None:
+            root_dirs = ComputerTools.get_universal_roots()
+        try:
+            return duplicate_finder.find(root_dirs, min_size=min_size, limit=limit)
+        except Exception as e:
+            logger.error(f"Duplicate scan error in {root_dirs}: {e}")
+            return {"error": str(e)}
+
+    @staticmethod
+    def analyze_disk_usage(path: str, top_n: int = 20, deep: bool = False) -> Dict[str, Any]:
+        """What is taking up space under a folder or drive: largest folders/files and totals per extension."""
+        from app.tools.disk_usage import disk_usage
+        try:
+            return disk_usage.analyze(path, top_n=top_n, deep=deep)
+        except Exception as e:
+            logger.error(f"Disk usage error in {path}: {e}")
+            return {"error": str(e)}
+
     # ─── FILE OPERATIONS (with safety) ──────────────────────────────────
 
     @staticmethod
@@ -176,6 +204,52 @@ class ComputerTools:
         except Exception as e:
             return f"Error reading file: {str(e)}"
 
+    @staticmethod
+    def index_document(file_path: str) -> Optional[Dict[str, Any]]:
+        """
+        Chunk and embed a file into the document store unless its current version already is (blocking).
+        Returns its index info, or None for formats without structured extraction (e.g. images needing OCR).
+        """
+        from app.core.memory import memory_manager
+        from app.tools.file_processor import file_processor
+        docs = memory_manager.documents
+        try:
+            st = os.stat(file_path)
+            if not docs.is_current(file_path, st.st_size, st.st_mtime):
+                docs.index_document(file_path, file_processor.extract_sections(file_path), st.st_size, st.st_mtime)
+            return docs.info(file_path)
+        except Exception as e:
+            logger.info(f"Chunked retrieval unavailable for {file_path}: {e}")
+            return None
+
+    @staticmethod
+    def relevant_content(file_path: str, question: str, k: int = 5, max_chars: int = 5000) -> str:
+        """
+        Content to put in a prompt for a question about a file: the whole text when it is short,
+        otherwise the top-k chunks from the document store (ingested documents are indexed by the
+        pipeline; any other file on first use / after edits).
+        """
+        from app.core.memory import memory_manager
+        docs = memory_manager.documents
+        info = ComputerTools.index_document(file_path)
+        if info is None:
+            return ComputerTools.read_file_content(file_path, max_chars)
+
+        if info["char_count"] <= max_chars:
+            return ComputerTools.read_file_content(file_path, max_chars)
+        chunks = docs.retrieve(question, [file_path], k=k)
+        if not chunks:
+            return ComputerTools.read_file_content(file_path, max_chars)
+        kept, used = [], 0
+        for chunk in chunks:  # Most relevant first, within the same budget as a plain read
+            if kept and used + len(chunk["text"]) > max_chars:
+                break
+            kept.append(chunk)
+            used += len(chunk["text"])
+        chunks = kept
+        return (f"[{len(chunks)} most relevant of {info['chunk_count']} sections; full file is {info['char_count']} chars]\n\n"
+                + docs.format_context(chunks))
+
     @staticmethod
     def move_file(src: str, dest_dir: str) -> Dict[str, str]:
         """Move a file to a destination directory."""
@@ -246,37 +320,48 @@ class ComputerTools:
     # ─── ORGANIZE FILES ─────────────────────────────────────────────────
 
     @staticmethod
-    def organize_folder(path: str, rules: Dict[str, List[str]] = None) -> Dict[str, Any]:
+    def plan_organize(path: str, rules: Dict[str, List[str]] = None, dest_root: str = None) -> Dict[str, Any]:
         """
-        Organize files in a folder by type into subfolders.
-        Default rules sort by common procurement file types.
+        Work out (without touching anything) where each file in a folder would go by type.
+        The returned plan_id is what `execute_organize` carries out, so the preview is the result.
         """
-        if rules is None:
-            rules = {
-                "Quotations": [".pdf", ".docx"],
-                "Spreadsheets": [".xlsx", ".xls", ".csv"],
-                "Images": [".jpg", ".jpeg", ".png", ".bmp", ".tiff", ".webp", ".svg"],
-                "Documents": [".doc", ".txt", ".rtf", ".pdf", ".docx", ".xlsx", ".pptx"], # Catch-all docs
-                "Archives": [".zip", ".rar", ".7z", ".tar", ".gz"],
-                "Shortcuts": [".lnk", ".url"],
-                "Scripts": [".py", ".bat", ".sh", ".js"],
-            }
-        
-        moved = {}
+        from app.tools.organizer import folder_organizer
         try:
-            for entry in os.scandir(path):
-                if entry.is_file():
-                    ext = os.path.splitext(entry.name)[1].lower()
-                    for folder_name, extensions in rules.items():
-                        if ext in extensions:
-                            dest_dir = os.path.join(path, folder_name)
-                            os.makedirs(dest_dir, exist_ok=True)
-                            dest = os.path.join(dest_dir, entry.name)
-                            shutil.move(entry.path, dest)
-                            moved.setdefault(folder_name, []).append(entry.name)
-                            break
-            return {"status": "success", "organized": moved, "total_moved": sum(len(v) for v in moved.values())}
+            return folder_organizer.plan(path, rules, dest_root)
         except Exception as e:
             return {"status": "error", "message": str(e)}
 
+    @staticmethod
+    def execute_organize(plan_id: int) -> Dict[str, Any]:
+        """Carry out a confirmed organize plan."""
+        from app.tools.organizer import folder_organizer
+        try:
+            return folder_organizer.execute(plan_id)
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
+    @staticmethod
+    def undo_organize(plan_id: int) -> Dict[str, Any]:
+        """Put the files of an executed organize plan back where they were."""
+        from app.tools.organizer import folder_organizer
+        try:
+            return folder_organizer.undo(plan_id)
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
+    @staticmethod
+    def organize_folder(path: str, rules: Dict[str, List[str]] = None) -> Dict[str, Any]:
+        """
+        Organize files in a folder by type into subfolders (plan and execute in one go).
+        Default rules sort by common procurement file types.
+        """
+        plan = ComputerTools.plan_organize(path, rules)
+        if "plan_id" not in plan:
+            return plan
+        result = ComputerTools.execute_organize(plan["plan_id"])
+        if result.get("status") == "error":
+            return result
+        return {"status": "success", "plan_id": plan["plan_id"], "organized": result["by_folder"],
+                "total_moved": result["moved"], "skipped": result["skipped"], "failed": result["failed"]}
+
 computer_tools = ComputerTools()
@@ -0,0 +1,286 @@
+import os
+import re
+import json
+import time
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.database import Database
+from app.core.startup import LazySingleton
+from app.tools.file_processor import file_processor
+from app.tools.archives import is_archive, list_members
+
+logger = logging.getLogger(__name__)
+
+INDEXED_EXTENSIONS = {".pdf", ".docx", ".xlsx", ".xls", ".csv", ".txt", ".zip"}
+SKIP_DIRS = {'node_modules', '__pycache__', '.git', 'AppData', '$Recycle.Bin', 'Windows',
+             'Program Files', 'Program Files (x86)', 'System Volume Information'}
+MAX_TEXT_CHARS = 2_000_000  # Cap per document so one huge export can't bloat the index
+
+
+class ContentIndex:
+    """
+    Inverted (SQLite FTS5) index of document text under the configured roots. A scan only extracts
+    files whose size/mtime changed since the last scan and drops files that disappeared, so refreshes
+    are incremental; queries are answered from the index with highlighted snippets. Between full scans
+    (every CONTENT_INDEX_FULL_HOURS) the walk reuses the listing of any directory whose mtime has not
+    moved, so files added, renamed or deleted are picked up without re-stat'ing the whole tree; files
+    edited in place are caught by the next full scan (or a manual refresh).
+    """
+
+    def __init__(self, path: str = None, roots: List[str] = None):
+        path = path or settings.CONTENT_INDEX_PATH
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = Database(path)
+        self._roots = roots
+        self._scan_lock = asyncio.Lock()
+        self._cache_writer = ThreadPoolExecutor(max_workers=1)  # Archive listings found during name searches
+        self.last_scan: Dict[str, Any] = {}
+        # dir -> [mtime_ns, {path: (size, mtime)} of indexable files, [subdirectory paths]]
+        self._dirs: Dict[str, list] = {}
+        self._last_full: Optional[float] = None
+        with self.db.transaction() as cursor:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS documents (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    path TEXT UNIQUE NOT NULL,
+                    size INTEGER,
+                    mtime REAL,
+                    status TEXT,
+                    error TEXT,
+                    indexed_at TEXT DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            # name + text are both searchable; rowid = documents.id
+            cursor.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+                    name, content, tokenize = 'unicode61 remove_diacritics 2'
+                )
+            """)
+            # ZIP member listings, so name searches can look inside archives without reopening them
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS archive_members (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER,
+                    mtime REAL,
+                    members TEXT
+                )
+            """)
+
+    @property
+    def roots(self) -> List[str]:
+        if self._roots is not None:
+            return self._roots
+        configured = [p.strip() for p in settings.CONTENT_INDEX_ROOTS.split(";") if p.strip()]
+        return configured or [settings.INBOX_DIR, settings.RFQ_DIR, settings.ORDERS_DIR,
+                              settings.ARCHIVE_DIR, *settings.WATCH_PATH_LIST]
+
+    # ─── INDEXING ──────────────────────────────────────────────────────
+
+    @staticmethod
+    def _list_dir(path: str) -> tuple:
+        files, subdirs = {}, []
+        max_bytes = settings.CONTENT_INDEX_MAX_MB * 1024 * 1024
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not entry.name.startswith('.') and entry.name not in SKIP_DIRS:
+                            subdirs.append(entry.path)
+                        continue
+                    if os.path.splitext(entry.name)[1].lower() not in INDEXED_EXTENSIONS or entry.name.startswith("~$"):
+                        continue
+                    st = entry.stat()
+                except OSError:
+                    continue
+                if st.st_size <= max_bytes:
+                    files[entry.path] = (st.st_size, st.st_mtime)
+        return files, subdirs
+
+    def _walk(self, full: bool = True) -> Dict[str, tuple]:
+        found, dirs = {}, {}
+        stack = list(self.roots)
+        while stack:
+            path = stack.pop()
+            try:
+                mtime_ns = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+            old = self._dirs.get(path)
+            if full or old is None or old[0] != mtime_ns:
+                try:
+                    files, subdirs = self._list_dir(path)
+                except OSError:
+                    continue
+                old = [mtime_ns, files, subdirs]
+            dirs[path] = old
+            found.update(old[1])
+            stack.extend(old[2])  # Subdirectories carry their own mtimes
+        self._dirs = dirs
+        return found
+
+    def _extract(self, path: str) -> tuple:
+        try:
+            if is_archive(path):
+                self.archive_members(path)  # Warm the member-name index while we are here
+            return path, file_processor.extract_text(path)[:MAX_TEXT_CHARS], None
+        except Exception as e:
+            return path, None, str(e)[:500]
+
+    def scan(self, workers: int = 4, batch_size: int = 50, full: bool = None) -> Dict[str, Any]:
+        """Bring the index up to date with the roots (blocking). `full` re-stats every file (default: when due)."""
+        started = time.monotonic()
+        if full is None:
+            full = self._last_full is None or started - self._last_full >= settings.CONTENT_INDEX_FULL_HOURS * 3600
+        found = self._walk(full)
+        if full:
+            self._last_full = started
+        known = {r["path"]: (r["id"], r["size"], r["mtime"])
+                 for r in self.db.fetch_all("SELECT id, path, size, mtime FROM documents")}
+        changed = [p for p, sig in found.items() if p not in known or known[p][1:] != sig]
+        removed = [known[p][0] for p in known if p not in found]
+
+        if removed:
+            with self.db.transaction() as cursor:
+                for i in range(0, len(removed), 500):
+                    chunk = removed[i:i + 500]
+                    marks = ', '.join('?' * len(chunk))
+                    cursor.execute(f"DELETE FROM documents_fts WHERE rowid IN ({marks})", chunk)
+                    cursor.execute(f"DELETE FROM documents WHERE id IN ({marks})", chunk)
+
+        indexed = failed = 0
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(self._extract, changed)
+            batch = []
+            for item in results:
+                batch.append(item)
+                if len(batch) >= batch_size:
+                    i, f = self._write(batch, found); indexed += i; failed += f
+                    batch = []
+            if batch:
+                i, f = self._write(batch, found); indexed += i; failed += f
+
+        self.last_scan = {"full": full, "files": len(found), "indexed": indexed, "failed": failed, "removed": len(removed),
+                          "unchanged": len(found) - len(changed), "seconds": round(time.monotonic() - started, 2),
+                          "finished_at": time.strftime("%Y-%m-%d %H:%M:%S")}
+        if changed or removed:
+            logger.info(f"Content index scan: {self.last_scan}")
+        return self.last_scan
+
+    def _write(self, batch: List[tuple], found: Dict[str, tuple]) -> tuple:
+        indexed = failed = 0
+        with self.db.transaction() as cursor:
+            for path, text, error in batch:
+                size, mtime = found[path]
+                cursor.execute("""
+                    INSERT INTO documents (path, size, mtime, status, error, indexed_at)
+                    VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                    ON CONFLICT(path) DO UPDATE SET size = excluded.size, mtime = excluded.mtime,
+                        status = excluded.status, error = excluded.error, indexed_at = excluded.indexed_at
+                """, (path, size, mtime, "failed" if error else "indexed", error))
+                cursor.execute("SELECT id FROM documents WHERE path = ?", (path,))
+                doc_id = cursor.fetchone()[0]
+                cursor.execute("DELETE FROM documents_fts WHERE rowid = ?", (doc_id,))
+                if error:
+                    failed += 1
+                    continue
+                cursor.execute("INSERT INTO documents_fts (rowid, name, content) VALUES (?, ?, ?)",
+                               (doc_id, os.path.basename(path), text))
+                indexed += 1
+        return indexed, failed
+
+    async def run(self, interval: float = None):
+        """Background refresh loop."""
+        interval = interval or settings.CONTENT_INDEX_INTERVAL
+        while True:
+            await self.refresh()
+            await asyncio.sleep(interval)
+
+    async def refresh(self, full: bool = None) -> Dict[str, Any]:
+        if self._scan_lock.locked():
+            return {"status": "running"}
+        async with self._scan_lock:
+            try:
+                return await asyncio.to_thread(self.scan, full=full)
+            except Exception as e:
+                logger.error(f"Content index scan failed: {e}")
+                return {"status": "error", "message": str(e)}
+
+    def archive_members(self, path: str, background: bool = False) -> List[Dict[str, Any]]:
+        """
+        Member list of a ZIP, cached by size/mtime; raises if the archive cannot be read. With
+        `background`, a cache miss is written by a writer thread so the caller never waits on SQLite.
+        """
+        st = os.stat(path)
+        row = self.db.fetch_one("SELECT size, mtime, members FROM archive_members WHERE path = ?", (path,))
+        if row and (row[0], row[1]) == (st.st_size, st.st_mtime):
+            return json.loads(row[2])
+        members = list_members(path)
+        if background:
+            self._cache_writer.submit(self._store_members, path, st.st_size, st.st_mtime, members)
+        else:
+            self._store_members(path, st.st_size, st.st_mtime, members)
+        return members
+
+    def _store_members(self, path: str, size: int, mtime: float, members: List[Dict[str, Any]]):
+        try:
+            self.db.execute("INSERT OR REPLACE INTO archive_members (path, size, mtime, members) VALUES (?, ?, ?, ?)",
+                            (path, size, mtime, json.dumps(members)))
+        except Exception as e:
+            logger.info(f"Could not cache the member list of {path}: {e}")
+
+    # ─── QUERIES ───────────────────────────────────────────────────────
+
+    @staticmethod
+    def to_match_query(text: str) -> Optional[str]:
+        """Free text -> FTS5 query: every word must appear (prefix match on the last one); quotes keep phrases."""
+        terms = []  # (fts term, is_bare_word)
+        for phrase, word in re.findall(r'"([^"]+)"|(\S+)', text):
+            # Split "SS-304" / "12.5mm" the same way the tokenizer does, keeping the pieces adjacent
+            tokens = re.findall(r"\w+", phrase or word)
+            if tokens:
+                terms.append(('"' + " ".join(tokens) + '"', not phrase))
+        if not terms:
+            return None
+        last, bare = terms[-1]
+        if bare:
+            terms[-1] = (last + "*", bare)  # The user may still be typing the last word
+        return " ".join(t for t, _ in terms)
+
+    def search(self, text: str, limit: int = 20, path_prefix: str = None,
+               highlight: tuple = ("**", "**")) -> Dict[str, Any]:
+        started = time.perf_counter()
+        match = self.to_match_query(text)
+        if not match:
+            return {"query": text, "results": [], "took_ms": 0.0}
+        sql = """
+            SELECT d.path, d.size, d.mtime, bm25(documents_fts, 5.0, 1.0) AS rank,
+                   snippet(documents_fts, 1, ?, ?, ' … ', 16) AS snippet
+            FROM documents_fts JOIN documents d ON d.id = documents_fts.rowid
+            WHERE documents_fts MATCH ?
+        """
+        params = [highlight[0], highlight[1], match]
+        if path_prefix:
+            sql += " AND d.path LIKE ? ESCAPE '\\'"
+            params.append(path_prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+        try:
+            rows = self.db.fetch_all(sql + " ORDER BY rank LIMIT ?", (*params, limit))
+        except Exception as e:
+            logger.warning(f"Content search failed for {match!r}: {e}")
+            rows = []
+        for row in rows:
+            row["path"] = row["path"].replace("\\", "/")
+            row["rank"] = round(row["rank"], 4)
+        return {"query": text, "match": match, "results": rows,
+                "took_ms": round((time.perf_counter() - started) * 1000, 2)}
+
+    def stats(self) -> Dict[str, Any]:
+        counts = {r["status"]: r["n"] for r in
+                  self.db.fetch_all("SELECT status, COUNT(*) AS n FROM documents GROUP BY status")}
+        return {"roots": self.roots, "documents": counts, "last_scan": self.last_scan}
+
+
+content_index = LazySingleton("content index", ContentIndex)
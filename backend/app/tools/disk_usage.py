@@ -0,0 +1,176 @@
+import os
+import json
+import time
+import heapq
+import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from app.core.database import Database
+from app.core.startup import LazySingleton
+from app.tools.content_index import content_index
+
+logger = logging.getLogger(__name__)
+
+FILES_PER_DIR = 50  # Largest files remembered per directory; also the cap on top-N files
+
+
+class DiskUsageAnalyzer:
+    """
+    Subtree sizes from a parallel scandir walk. Each directory's own listing (file bytes, extension
+    totals, largest files, subdirectories) is cached keyed by the directory's mtime, so a re-analysis
+    only lists directories whose entries changed and sums the rest from the cache.
+    A file growing in place does not touch its directory's mtime; `deep=True` re-lists everything.
+    """
+
+    def __init__(self, db: Database):
+        self.db = db
+        with self.db.transaction() as cursor:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS dir_usage (
+                    path TEXT PRIMARY KEY,
+                    mtime REAL,
+                    file_bytes INTEGER,
+                    file_count INTEGER,
+                    subdirs TEXT,
+                    extensions TEXT,
+                    largest TEXT
+                )
+            """)
+
+    @staticmethod
+    def _list(path: str, mtime: float) -> Dict[str, Any]:
+        """One directory's own contents (not recursive)."""
+        entry = {"path": path, "mtime": mtime, "file_bytes": 0, "file_count": 0,
+                 "subdirs": [], "extensions": defaultdict(lambda: [0, 0]), "largest": []}
+        try:
+            with os.scandir(path) as it:
+                items = list(it)
+        except OSError:
+            items = []
+        for item in items:
+            try:
+                if item.is_symlink() or getattr(item, "is_junction", lambda: False)():
+                    continue  # Counted where it points to, if that is under the root at all
+                if item.is_dir(follow_symlinks=False):
+                    entry["subdirs"].append(item.name)
+                    continue
+                size = item.stat(follow_symlinks=False).st_size
+            except OSError:
+                continue
+            entry["file_bytes"] += size
+            entry["file_count"] += 1
+            ext = entry["extensions"][os.path.splitext(item.name)[1].lower() or "(none)"]
+            ext[0] += size
+            ext[1] += 1
+            if len(entry["largest"]) < FILES_PER_DIR:
+                heapq.heappush(entry["largest"], (size, item.name))
+            elif size > entry["largest"][0][0]:
+                heapq.heapreplace(entry["largest"], (size, item.name))
+        entry["extensions"] = dict(entry["extensions"])
+        entry["largest"] = sorted(entry["largest"], reverse=True)
+        return entry
+
+    def _cached(self, root: str) -> Dict[str, Dict[str, Any]]:
+        prefix = root.rstrip("/\\") + os.sep  # "/data/a" must not match "/data/ab"
+        like = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        rows = self.db.fetch_all("SELECT * FROM dir_usage WHERE path = ? OR path LIKE ? ESCAPE '\\'", (root, like))
+        cached = {}
+        for row in rows:
+            row["subdirs"] = json.loads(row["subdirs"])
+            row["extensions"] = json.loads(row["extensions"])
+            row["largest"] = [tuple(x) for x in json.loads(row["largest"])]
+            cached[row["path"]] = row
+        return cached
+
+    def _visit(self, path: str, cached: Dict[str, Dict[str, Any]], deep: bool) -> Optional[tuple]:
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            return None
+        hit = cached.get(path)
+        if hit and not deep and hit["mtime"] == mtime:
+            return hit, False
+        return self._list(path, mtime), True
+
+    def analyze(self, root: str, top_n: int = 20, deep: bool = False, workers: int = 8) -> Dict[str, Any]:
+        """Largest folders/files and an extension breakdown under `root` (blocking)."""
+        started = time.monotonic()
+        root = os.path.abspath(os.path.expanduser(root))
+        if not os.path.isdir(root):
+            return {"error": f"Not a directory: {root}"}
+        top_n = min(top_n, FILES_PER_DIR)
+        cached = self._cached(root)
+
+        # Level-by-level walk: every directory of a level is stat'ed (and listed if changed) in parallel
+        entries, parents, rescanned = {}, {}, []
+        level = [root]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while level:
+                next_level = []
+                for path, visited in zip(level, pool.map(lambda p: self._visit(p, cached, deep), level)):
+                    if visited is None:
+                        continue
+                    entry, changed = visited
+                    entries[path] = entry
+                    if changed:
+                        rescanned.append(entry)
+                    for name in entry["subdirs"]:
+                        child = os.path.join(path, name)
+                        parents[child] = path
+                        next_level.append(child)
+                level = next_level
+
+        # Bottom-up subtree totals (children are always deeper than their parent)
+        totals = {p: [e["file_bytes"], e["file_count"]] for p, e in entries.items()}
+        for path in sorted(entries, key=lambda p: p.count(os.sep), reverse=True):
+            parent = parents.get(path)
+            if parent in totals:
+                totals[parent][0] += totals[path][0]
+                totals[parent][1] += totals[path][1]
+
+        extensions = defaultdict(lambda: [0, 0])
+        largest_files = []
+        for path, entry in entries.items():
+            for ext, (size, count) in entry["extensions"].items():
+                extensions[ext][0] += size
+                extensions[ext][1] += count
+            for size, name in entry["largest"]:
+                largest_files.append((size, os.path.join(path, name)))
+
+        self._store(rescanned, set(entries), cached)
+
+        def folder(path):
+            return {"path": path.replace("\\", "/"), "bytes": totals[path][0], "files": totals[path][1]}
+
+        return {
+            "root": root.replace("\\", "/"),
+            "total_bytes": totals[root][0],
+            "total_files": totals[root][1],
+            "folders": len(entries),
+            "children": sorted((folder(os.path.join(root, n)) for n in entries[root]["subdirs"]
+                                if os.path.join(root, n) in totals), key=lambda f: f["bytes"], reverse=True)[:top_n],
+            "top_folders": [folder(p) for p in heapq.nlargest(top_n, (p for p in entries if p != root),
+                                                              key=lambda p: totals[p][0])],
+            "top_files": [{"path": p.replace("\\", "/"), "bytes": s} for s, p in heapq.nlargest(top_n, largest_files)],
+            "by_extension": [{"extension": ext, "bytes": b, "files": c} for ext, (b, c) in
+                             sorted(extensions.items(), key=lambda kv: kv[1][0], reverse=True)[:top_n]],
+            "rescanned_folders": len(rescanned),
+            "seconds": round(time.monotonic() - started, 2),
+        }
+
+    def _store(self, rescanned: List[Dict[str, Any]], visited: set, cached: Dict[str, Dict[str, Any]]):
+        gone = [p for p in cached if p not in visited]
+        with self.db.transaction() as cursor:
+            cursor.executemany("""
+                INSERT OR REPLACE INTO dir_usage (path, mtime, file_bytes, file_count, subdirs, extensions, largest)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, [(e["path"], e["mtime"], e["file_bytes"], e["file_count"], json.dumps(e["subdirs"]),
+                   json.dumps(e["extensions"]), json.dumps(e["largest"])) for e in rescanned])
+            for i in range(0, len(gone), 500):
+                chunk = gone[i:i + 500]
+                cursor.execute(f"DELETE FROM dir_usage WHERE path IN ({', '.join('?' * len(chunk))})", chunk)
+
+
+disk_usage = LazySingleton("disk usage", lambda: DiskUsageAnalyzer(content_index.db))
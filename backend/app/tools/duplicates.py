@@ -0,0 +1,204 @@
+import os
+import time
+import hashlib
+import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from app.core.database import Database
+from app.core.startup import LazySingleton
+from app.tools.content_index import content_index, SKIP_DIRS
+
+logger = logging.getLogger(__name__)
+
+PARTIAL_BYTES = 64 * 1024  # Read from each end of the file for the partial hash
+READ_BLOCK = 1024 * 1024
+
+
+def _partial_hash(path: str, size: int) -> str:
+    """Hash of the first and last PARTIAL_BYTES; for small files this covers the whole file."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        h.update(f.read(PARTIAL_BYTES))
+        if size > 2 * PARTIAL_BYTES:
+            f.seek(size - PARTIAL_BYTES)
+            h.update(f.read(PARTIAL_BYTES))
+        elif size > PARTIAL_BYTES:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def _full_hash(path: str) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(READ_BLOCK), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class DuplicateFinder:
+    """
+    Finds identical files in stages so most files are never read: group by size, then by a hash of
+    the leading/trailing blocks, and only files that still collide get a full hash. Hashing runs on
+    a thread pool (hashlib releases the GIL) and hashes are cached by path/size/mtime alongside the
+    content index, so repeat scans only read files that changed.
+    """
+
+    def __init__(self, db: Database):
+        self.db = db
+        with self.db.transaction() as cursor:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS file_hashes (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER,
+                    mtime REAL,
+                    partial TEXT,
+                    full TEXT
+                )
+            """)
+
+    # ─── SCAN ──────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _walk(roots: List[str], min_size: int) -> Dict[str, tuple]:
+        """path -> (size, mtime) for regular files; hard links and overlapping roots are counted once."""
+        found, seen = {}, set()
+        stack = [os.path.expanduser(r) for r in roots]
+        while stack:
+            current = stack.pop()
+            try:
+                with os.scandir(current) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not entry.name.startswith('.') and entry.name not in SKIP_DIRS:
+                            stack.append(entry.path)
+                        continue
+                    if not entry.is_file(follow_symlinks=False) or entry.name.startswith("~$"):
+                        continue
+                    st = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                if st.st_size < min_size:
+                    continue
+                key = (st.st_dev, st.st_ino) if st.st_ino else os.path.normcase(os.path.abspath(entry.path))
+                if key in seen:
+                    continue
+                seen.add(key)
+                found[entry.path] = (st.st_size, st.st_mtime)
+        return found
+
+    def _cached(self, paths: List[str], found: Dict[str, tuple]) -> Dict[str, Dict[str, Any]]:
+        """Cached hashes for paths whose size/mtime still match."""
+        cached = {}
+        for i in range(0, len(paths), 500):
+            chunk = paths[i:i + 500]
+            rows = self.db.fetch_all(
+                f"SELECT path, size, mtime, partial, full FROM file_hashes WHERE path IN ({', '.join('?' * len(chunk))})",
+                chunk)
+            for row in rows:
+                if (row["size"], row["mtime"]) == found[row["path"]]:
+                    cached[row["path"]] = row
+        return cached
+
+    @staticmethod
+    def _hash_all(func, paths: List[str], workers: int) -> Dict[str, Optional[str]]:
+        def safe(path):
+            try:
+                return path, func(path)
+            except OSError as e:
+                logger.debug(f"Cannot hash {path}: {e}")  # Locked, vanished or permission denied
+                return path, None
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return dict(pool.map(safe, paths))
+
+    def find(self, roots: List[str], min_size: int = 1, workers: int = 8, limit: int = 100) -> Dict[str, Any]:
+        """Duplicate groups under `roots` (blocking), largest reclaimable space first."""
+        started = time.monotonic()
+        found = self._walk(roots, min_size)
+
+        by_size = defaultdict(list)
+        for path, (size, _) in found.items():
+            by_size[size].append(path)
+        candidates = [p for group in by_size.values() if len(group) > 1 for p in group]
+        cached = self._cached(candidates, found)
+        stats = {"files_scanned": len(found), "size_candidates": len(candidates),
+                 "cache_hits": 0, "partial_hashed": 0, "full_hashed": 0}
+
+        # Stage 2: partial hash
+        partial = {p: cached[p]["partial"] for p in candidates if p in cached and cached[p]["partial"]}
+        stats["cache_hits"] = len(partial)
+        todo = [p for p in candidates if p not in partial]
+        partial.update(self._hash_all(lambda p: _partial_hash(p, found[p][0]), todo, workers))
+        stats["partial_hashed"] = len(todo)
+
+        by_partial = defaultdict(list)
+        for path, digest in partial.items():
+            if digest:
+                by_partial[(found[path][0], digest)].append(path)
+
+        # Stage 3: full hash, only where the partial hash did not already cover the whole file
+        full = {}
+        needs_full = []
+        for (size, digest), group in by_partial.items():
+            if len(group) < 2:
+                continue
+            for path in group:
+                if size <= 2 * PARTIAL_BYTES:
+                    full[path] = digest
+                elif path in cached and cached[path]["full"]:
+                    full[path] = cached[path]["full"]
+                else:
+                    needs_full.append(path)
+        full.update(self._hash_all(_full_hash, needs_full, workers))
+        stats["full_hashed"] = len(needs_full)
+
+        self._store(found, partial, full, cached)
+
+        by_full = defaultdict(list)
+        for path, digest in full.items():
+            if digest:
+                by_full[(found[path][0], digest)].append(path)
+        groups = []
+        for (size, digest), paths in by_full.items():
+            if len(paths) < 2:
+                continue
+            paths.sort(key=lambda p: found[p][1])  # Oldest copy first
+            groups.append({"hash": digest, "size": size, "count": len(paths),
+                           "wasted_bytes": size * (len(paths) - 1),
+                           "files": [p.replace("\\", "/") for p in paths]})
+        groups.sort(key=lambda g: g["wasted_bytes"], reverse=True)
+
+        stats.update({"groups": len(groups), "duplicate_files": sum(g["count"] - 1 for g in groups),
+                      "wasted_bytes": sum(g["wasted_bytes"] for g in groups),
+                      "seconds": round(time.monotonic() - started, 2)})
+        logger.info(f"Duplicate scan of {roots}: {stats}")
+        return {"roots": roots, "stats": stats, "groups": groups[:limit]}
+
+    def _store(self, found, partial, full, cached):
+        rows = []
+        for path, digest in partial.items():
+            if not digest:
+                continue
+            old = cached.get(path)
+            full_digest = full.get(path) or (old["full"] if old else None)
+            if old and old["partial"] == digest and old["full"] == full_digest:
+                continue
+            size, mtime = found[path]
+            rows.append((path, size, mtime, digest, full_digest))
+        if not rows:
+            return
+        with self.db.transaction() as cursor:
+            cursor.executemany("""
+                INSERT INTO file_hashes (path, size, mtime, partial, full) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(path) DO UPDATE SET size = excluded.size, mtime = excluded.mtime,
+                    partial = excluded.partial, full = excluded.full
+            """, rows)
+
+
+# Shares the content index database, so it is only opened when one of them is first used
+duplicate_finder = LazySingleton("duplicate finder", lambda: DuplicateFinder(content_index.db))
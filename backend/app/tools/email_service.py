@@ -1,10 +1,56 @@
+import time
+import asyncio
+import logging
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from email.utils import make_msgid
 from app.core.config import settings
-from typing import Optional
+from app.core.leader import leader_election
+from app.core.memory import memory_manager
+from app.core.startup import LazySingleton
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+RETRY_BASE_SECONDS = 30  # Backoff doubles per attempt: 30s, 60s, 120s, ...
+
 
 class EmailService:
+    """
+    Drafts emails and sends them through a persistent outbox: messages are queued in SQLite,
+    delivered in the background over one reused SMTP connection per batch, and retried with backoff.
+    """
+
+    def __init__(self, db=None):
+        self.db = db or memory_manager.db
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._create_schema()
+
+    def _create_schema(self):
+        with self.db.transaction() as cursor:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS email_outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    to_addr TEXT NOT NULL,
+                    subject TEXT,
+                    body TEXT,
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    attempts INTEGER DEFAULT 0,
+                    last_error TEXT,
+                    message_id TEXT,
+                    next_attempt_at REAL DEFAULT 0,
+                    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                    sent_at TEXT,
+                    claimed_by TEXT
+                )
+            """)
+            cursor.execute("PRAGMA table_info(email_outbox)")
+            if "claimed_by" not in {row[1] for row in cursor.fetchall()}:
+                cursor.execute("ALTER TABLE email_outbox ADD COLUMN claimed_by TEXT")  # Worker sending the message
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_outbox_due ON email_outbox(status, next_attempt_at)")
+
     @staticmethod
     def draft_email(to: str, subject: str, body: str, tone: str = "polite"):
         """
@@ -18,23 +64,166 @@ class EmailService:
             "status": "pending_approval"
         }
 
+    # ─── OUTBOX ────────────────────────────────────────────────────────
+
     @staticmethod
-    def send_email(to: str, subject: str, body: str):
-        if not settings.GMAIL_USER or not settings.GMAIL_APP_PASSWORD:
+    def is_configured() -> bool:
+        # A local SMTP stand-in (SMTP_SECURITY=none) does not need credentials
+        return bool(settings.GMAIL_USER and settings.GMAIL_APP_PASSWORD) or settings.SMTP_SECURITY.lower() == "none"
+
+    def queue_emails(self, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        """Queue approved messages ({to, subject, body}) for background delivery."""
+        if not self.is_configured():
             return {"error": "Email credentials not configured."}
-        
+        ids = []
+        with self.db.transaction() as cursor:
+            for m in messages:
+                cursor.execute("INSERT INTO email_outbox (to_addr, subject, body, message_id) VALUES (?, ?, ?, ?)",
+                               (m["to"], m.get("subject", ""), m.get("body", ""), make_msgid()))
+                ids.append(cursor.lastrowid)
+        self._wake()
+        return {"status": "queued", "ids": ids}
+
+    def send_email(self, to: str, subject: str, body: str):
+        """Queue a single message; delivery happens in the background (see `outbox_status`)."""
+        result = self.queue_emails([{"to": to, "subject": subject, "body": body}])
+        if "error" in result:
+            return result
+        return {"status": "queued", "id": result["ids"][0]}
+
+    def list_outbox(self, status: str = None, limit: int = 100) -> List[Dict[str, Any]]:
+        sql = "SELECT id, to_addr, subject, status, attempts, last_error, created_at, sent_at FROM email_outbox"
+        params = []
+        if status:
+            sql += " WHERE status = ?"; params.append(status)
+        return self.db.fetch_all(sql + " ORDER BY id DESC LIMIT ?", (*params, limit))
+
+    def outbox_status(self, message_id: int) -> Optional[Dict[str, Any]]:
+        rows = self.db.fetch_all("SELECT * FROM email_outbox WHERE id = ?", (message_id,))
+        return rows[0] if rows else None
+
+    def retry(self, message_id: int) -> Dict[str, Any]:
+        """Re-queue a failed message."""
+        cursor = self.db.execute("""
+            UPDATE email_outbox SET status = 'queued', attempts = 0, next_attempt_at = 0
+            WHERE id = ? AND status = 'failed'
+        """, (message_id,))
+        self._wake()
+        return {"status": "queued" if cursor.rowcount else "unchanged", "id": message_id}
+
+    # ─── DELIVERY ──────────────────────────────────────────────────────
+
+    def _wake(self):
+        if self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    @staticmethod
+    def _connect() -> smtplib.SMTP:
+        security = settings.SMTP_SECURITY.lower()
+        if security == "ssl":
+            server = smtplib.SMTP_SSL(settings.SMTP_HOST, settings.SMTP_PORT, timeout=30)
+        else:
+            server = smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT, timeout=30)
+            if security == "starttls":
+                server.starttls()
+        if settings.GMAIL_USER and settings.GMAIL_APP_PASSWORD:
+            server.login(settings.GMAIL_USER, settings.GMAIL_APP_PASSWORD)
+        return server
+
+    @staticmethod
+    def _build(row: Dict[str, Any]) -> MIMEMultipart:
+        msg = MIMEMultipart()
+        msg['From'] = settings.SMTP_FROM or settings.GMAIL_USER or "omnimind@localhost"
+        msg['To'] = row["to_addr"]
+        msg['Subject'] = row["subject"] or ""
+        msg['Message-ID'] = row["message_id"] or make_msgid()
+        msg.attach(MIMEText(row["body"] or "", 'plain'))
+        return msg
+
+    def _mark(self, row: Dict[str, Any], error: Exception = None, permanent: bool = False):
+        if error is None:
+            self.db.execute("UPDATE email_outbox SET status = 'sent', attempts = attempts + 1, last_error = NULL, "
+                            "sent_at = CURRENT_TIMESTAMP WHERE id = ?", (row["id"],))
+            return
+        attempts = row["attempts"] + 1
+        give_up = permanent or attempts >= settings.EMAIL_MAX_ATTEMPTS
+        self.db.execute("""
+            UPDATE email_outbox SET status = ?, attempts = ?, last_error = ?, next_attempt_at = ?
+            WHERE id = ?
+        """, ("failed" if give_up else "queued", attempts, str(error),
+              time.time() + RETRY_BASE_SECONDS * 2 ** (attempts - 1), row["id"]))
+
+    def deliver_due(self, batch_size: int = None) -> Dict[str, int]:
+        """Send every due message over one SMTP session (blocking; runs in a worker thread)."""
+        counts = {"sent": 0, "retrying": 0, "failed": 0}
+        worker = leader_election.claim_id()
+        # Claim in one statement, so two processes can never both pick up (and send) the same message
+        claimed = self.db.execute("""
+            UPDATE email_outbox SET status = 'sending', claimed_by = ?
+            WHERE status = 'queued' AND id IN (
+                SELECT id FROM email_outbox WHERE status = 'queued' AND next_attempt_at <= ? ORDER BY id LIMIT ?)
+        """, (worker, time.time(), batch_size or settings.EMAIL_BATCH_SIZE)).rowcount
+        if not claimed:
+            return counts
+        rows = self.db.fetch_all("SELECT * FROM email_outbox WHERE status = 'sending' AND claimed_by = ? ORDER BY id",
+                                 (worker,))
+
+        server = None
         try:
-            msg = MIMEMultipart()
-            msg['From'] = settings.GMAIL_USER
-            msg['To'] = to
-            msg['Subject'] = subject
-            msg.attach(MIMEText(body, 'plain'))
-            
-            with smtplib.SMTP_SSL('smtp.gmail.com', 465) as server:
-                server.login(settings.GMAIL_USER, settings.GMAIL_APP_PASSWORD)
-                server.send_message(msg)
-            return {"status": "sent"}
-        except Exception as e:
-            return {"error": str(e)}
-
-email_service = EmailService()
+            for i, row in enumerate(rows):
+                if server is None:
+                    try:
+                        server = self._connect()
+                    except (smtplib.SMTPException, OSError) as e:
+                        # Server down or login rejected: the whole remaining batch backs off together
+                        for rest in rows[i:]:
+                            self._mark(rest, e)
+                        counts["retrying"] += len(rows) - i
+                        break
+                try:
+                    server.send_message(self._build(row))
+                    self._mark(row)
+                    counts["sent"] += 1
+                except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused) as e:
+                    self._mark(row, e, permanent=True)  # Retrying a refused address won't help
+                    counts["failed"] += 1
+                except (smtplib.SMTPException, OSError) as e:
+                    self._mark(row, e)
+                    counts["retrying"] += 1
+                    server = None  # Connection is suspect; reconnect for the next message
+                except Exception as e:
+                    self._mark(row, e, permanent=True)  # Malformed message; would fail the same way again
+                    counts["failed"] += 1
+        finally:
+            if server is not None:
+                try:
+                    server.quit()
+                except (smtplib.SMTPException, OSError):
+                    pass
+        logger.info(f"Outbox batch: {counts}")
+        return counts
+
+    def recover_interrupted(self) -> int:
+        """Messages left 'sending' by a worker that crashed or exited are retried (not those a live worker is sending)."""
+        return leader_election.recover_dead_claims(self.db, "email_outbox", "status = 'sending'", "status = 'queued'",
+                                                   worker_col="claimed_by")
+
+    async def run_outbox(self, idle_seconds: float = 15.0):
+        """Background sender: drains due messages, then sleeps until woken by a new message or retry time."""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self.recover_interrupted()
+        while True:
+            self._wakeup.clear()
+            try:
+                counts = await asyncio.to_thread(self.deliver_due)
+                if counts["sent"] or counts["retrying"] or counts["failed"]:
+                    continue  # There may be more due messages than one batch
+            except Exception as e:
+                logger.error(f"Outbox delivery error: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=idle_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+email_service = LazySingleton("email outbox", EmailService)
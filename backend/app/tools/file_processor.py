@@ -1,13 +1,17 @@
 import os
-import pandas as pd
-from PyPDF2 import PdfReader
-from docx import Document
+import logging
 from app.tools.ocr import ocr_tool
-from typing import Optional, Dict, Any
+from app.tools.archives import is_archive, list_members, iter_readable_members
+from typing import Optional, Dict, Any, Iterator, List, Tuple, Union, IO
+
+logger = logging.getLogger(__name__)
+
+# Document libraries (pandas in particular) are imported on first use to keep startup fast
 
 class FileProcessor:
     @staticmethod
     def read_pdf(file_path: str) -> str:
+        from PyPDF2 import PdfReader
         text = ""
         try:
             reader = PdfReader(file_path)
@@ -23,6 +27,7 @@ class FileProcessor:
 
     @staticmethod
     def read_docx(file_path: str) -> str:
+        from docx import Document
         try:
             doc = Document(file_path)
             return "\n".join([para.text for para in doc.paragraphs])
@@ -31,6 +36,7 @@ class FileProcessor:
 
     @staticmethod
     def read_excel(file_path: str) -> str:
+        import pandas as pd
         try:
             df = pd.read_excel(file_path)
             # Convert to markdown for LLM to understand structure easily
@@ -45,11 +51,79 @@ class FileProcessor:
         if ext in ['.xlsx', '.xls']: return FileProcessor.read_excel(file_path)
         if ext == '.docx': return FileProcessor.read_docx(file_path)
         if ext in ['.jpg', '.jpeg', '.png']: return ocr_tool.extract_text(file_path)
+        if is_archive(file_path): return FileProcessor.read_archive(file_path)
         if ext in ['.txt', '.csv']:
             with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
                 return f.read()
         return "Unsupported file format."
 
+    @staticmethod
+    def read_archive(file_path: str, max_chars: int = 20000) -> str:
+        """Member listing plus the text of readable members, read in memory (nothing is extracted to disk)."""
+        try:
+            members = list_members(file_path)
+        except Exception as e:
+            return f"Error reading archive: {str(e)}"
+        lines = [f"Archive with {len(members)} files:"]
+        lines += [f"- {m['name']} ({round(m['size'] / 1024, 1)} KB){' [encrypted]' if m['encrypted'] else ''}" for m in members]
+        text = "\n".join(lines)
+        # Members are parsed one at a time and only until the text is long enough
+        for label, section in FileProcessor.iter_sections(file_path):
+            if len(text) >= max_chars:
+                break
+            text += f"\n\n=== {label} ===\n{section}"
+        return text[:max_chars]
+
+    @staticmethod
+    def _sections(source: Union[str, IO[bytes]], ext: str) -> List[Tuple[str, str]]:
+        """Sections of one document given as a path or an in-memory file."""
+        if ext == '.pdf':
+            from PyPDF2 import PdfReader
+            return [(f"page {i}", page.extract_text() or "") for i, page in enumerate(PdfReader(source).pages, 1)]
+        if ext == '.docx':
+            from docx import Document
+            doc = Document(source)
+            cells = [cell.text for table in doc.tables for row in table.rows for cell in row.cells]
+            return [("document", "\n".join([para.text for para in doc.paragraphs] + cells))]
+        if ext in ['.xlsx', '.xls']:
+            import pandas as pd
+            sheets = pd.read_excel(source, sheet_name=None, header=None)
+            return [(f"sheet {name}", df.to_csv(sep=" ", index=False, header=False)) for name, df in sheets.items()]
+        if ext in ['.txt', '.csv']:
+            if not isinstance(source, str):
+                return [("document", source.read().decode('utf-8', errors='ignore'))]
+            with open(source, 'r', encoding='utf-8', errors='ignore') as f:
+                return [("document", f.read())]
+        raise ValueError(f"Unsupported file format: {ext}")
+
+    @staticmethod
+    def iter_sections(file_path: str) -> Iterator[Tuple[str, str]]:
+        """`extract_sections` lazily: a ZIP member is only decompressed and parsed when the caller gets to it."""
+        if not is_archive(file_path):
+            yield from FileProcessor._sections(file_path, os.path.splitext(file_path)[1].lower())
+            return
+        for name, ext, data in iter_readable_members(file_path):
+            try:
+                sections = FileProcessor._sections(data, ext)
+            except Exception as e:
+                logger.info(f"Skipping unreadable archive member {name} in {file_path}: {e}")
+                continue
+            for label, text in sections:
+                yield f"{name}, {label}", text
+
+    @staticmethod
+    def extract_sections(file_path: str) -> List[Tuple[str, str]]:
+        """
+        (label, text) per page / sheet / document, for indexing and citations. Unlike `read_file`,
+        raises on unreadable files instead of returning a message. ZIP members are labelled with their name.
+        """
+        return list(FileProcessor.iter_sections(file_path))
+
+    @staticmethod
+    def extract_text(file_path: str) -> str:
+        """Plain text for indexing; raises on unreadable files."""
+        return "\n".join(text for _, text in FileProcessor.extract_sections(file_path))
+
     @staticmethod
     def detect_document_type(content: str) -> str:
         # Keywords based detection
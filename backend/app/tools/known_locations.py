@@ -0,0 +1,210 @@
+import os
+import json
+import time
+import string
+import logging
+import platform
+import threading
+from typing import List, Dict, Optional
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+WELL_KNOWN_FOLDERS = ["desktop", "downloads", "documents", "onedrive"]
+
+
+class KnownLocations:
+    """Persistent registry of well-known folders and drive roots, resolved once and revalidated cheaply."""
+
+    REVALIDATE_SECONDS = 30
+
+    def __init__(self, store_path: str = None):
+        self.store_path = store_path or settings.KNOWN_LOCATIONS_PATH
+        self._lock = threading.Lock()
+        self._folders: Dict[str, str] = {}
+        self._confirmed: Dict[str, str] = {}
+        self._roots: List[str] = []
+        self._drive_signature: Optional[str] = None
+        self._last_check = 0.0
+        self._loaded_mtime: Optional[int] = None
+        self._load()
+
+    # ─── PERSISTENCE ───────────────────────────────────────────────────
+
+    def _load(self):
+        try:
+            with open(self.store_path, "r", encoding="utf-8") as f:
+                self._loaded_mtime = os.fstat(f.fileno()).st_mtime_ns
+                data = json.load(f)
+            self._folders = data.get("folders", {})
+            self._confirmed = data.get("confirmed", {})
+            self._roots = data.get("roots", [])
+            self._drive_signature = data.get("drive_signature")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable known-locations file: {e}")
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.store_path), exist_ok=True)
+            tmp = f"{self.store_path}.{os.getpid()}.tmp"  # Other worker processes may be saving too
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({
+                    "folders": self._folders,
+                    "confirmed": self._confirmed,
+                    "roots": self._roots,
+                    "drive_signature": self._drive_signature,
+                }, f, indent=2)
+            os.replace(tmp, self.store_path)
+            self._loaded_mtime = os.stat(self.store_path).st_mtime_ns
+        except Exception as e:
+            logger.warning(f"Could not persist known locations: {e}")
+
+    def _reload_if_changed(self):
+        """Pick up locations another worker process confirmed since this one last read or wrote the file."""
+        try:
+            mtime = os.stat(self.store_path).st_mtime_ns
+        except OSError:
+            return
+        if mtime != self._loaded_mtime:
+            self._load()
+
+    # ─── DRIVES & ROOTS ────────────────────────────────────────────────
+
+    @staticmethod
+    def get_all_drives() -> List[str]:
+        """Detect all available drives on Windows or return root on Linux."""
+        if platform.system() == "Windows":
+            from ctypes import windll
+            drives = []
+            bitmask = windll.kernel32.GetLogicalDrives()
+            for letter in string.ascii_uppercase:
+                if bitmask & 1:
+                    drives.append(f"{letter}:\\")
+                bitmask >>= 1
+            return drives
+        return ["/"]
+
+    @staticmethod
+    def _drive_signature_now() -> str:
+        """Cheap fingerprint of the mounted drives, used to notice newly mounted ones."""
+        if platform.system() == "Windows":
+            from ctypes import windll
+            return str(windll.kernel32.GetLogicalDrives())
+        try:
+            return str(os.stat("/proc/mounts").st_mtime_ns) if os.path.exists("/proc/mounts") else "/"
+        except OSError:
+            return "/"
+
+    def _scan_roots(self) -> List[str]:
+        roots = [os.path.expanduser("~")]
+        try:
+            roots.extend(self.get_all_drives())
+        except Exception:
+            pass
+        if os.path.exists("/workspace"): roots.append("/workspace")
+        # Keep order stable so searches are deterministic
+        return [r for r in dict.fromkeys(roots) if os.path.isdir(r)]
+
+    def _revalidate(self, force: bool = False):
+        """Drop cached entries whose targets vanished and rescan roots when the drive set changes."""
+        now = time.time()
+        if not force and now - self._last_check < self.REVALIDATE_SECONDS:
+            return
+        self._last_check = now
+        changed = False
+
+        signature = self._drive_signature_now()
+        if force or signature != self._drive_signature or not self._roots or not all(os.path.isdir(r) for r in self._roots):
+            self._roots = self._scan_roots()
+            self._drive_signature = signature
+            changed = True
+
+        for cache in (self._folders, self._confirmed):
+            for name, path in list(cache.items()):
+                if not os.path.isdir(path):
+                    del cache[name]
+                    changed = True
+        if changed:
+            self._save()
+
+    def get_roots(self, refresh: bool = False) -> List[str]:
+        with self._lock:
+            self._reload_if_changed()
+            self._revalidate(force=refresh)
+            return list(self._roots)
+
+    # ─── WELL-KNOWN FOLDERS ────────────────────────────────────────────
+
+    @staticmethod
+    def _candidates(name: str) -> List[str]:
+        """Standard locations for a well-known folder. Only direct children of the profile are probed."""
+        home = os.path.expanduser("~")
+        if name == "onedrive":
+            candidates = [os.path.join(home, "OneDrive")]
+            try:
+                candidates += [os.path.join(home, d) for d in sorted(os.listdir(home)) if d.startswith("OneDrive")]
+            except OSError:
+                pass
+            return candidates
+
+        candidates = [os.path.join(home, name.capitalize())]
+        if name in ["desktop", "documents"]:
+            candidates.append(os.path.join(home, "OneDrive", name.capitalize()))
+            # OneDrive folders can carry an org suffix (e.g. "OneDrive - Company")
+            try:
+                for d in sorted(os.listdir(home)):
+                    if d.startswith("OneDrive"):
+                        candidates.append(os.path.join(home, d, name.capitalize()))
+            except OSError:
+                pass
+        return candidates
+
+    def resolve(self, name: str) -> Optional[str]:
+        """Resolve a well-known folder name to a path. Never crawls the disk."""
+        name = name.lower()
+        with self._lock:
+            self._reload_if_changed()
+            self._revalidate()
+            for cache in (self._confirmed, self._folders):
+                path = cache.get(name)
+                if path and os.path.isdir(path):
+                    return path
+
+            for p in self._candidates(name):
+                if os.path.isdir(p):
+                    self._folders[name] = p
+                    self._save()
+                    return p
+        return None
+
+    def confirm(self, name: str, path: str) -> Dict[str, str]:
+        """Remember a location the user has confirmed (takes precedence over probing)."""
+        if not os.path.isdir(path):
+            return {"status": "error", "message": f"Not a directory: {path}"}
+        with self._lock:
+            self._reload_if_changed()
+            self._confirmed[name.lower()] = path
+            self._save()
+        return {"status": "success", "name": name.lower(), "path": path}
+
+    def forget(self, name: str):
+        with self._lock:
+            self._reload_if_changed()
+            self._confirmed.pop(name.lower(), None)
+            self._folders.pop(name.lower(), None)
+            self._save()
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            self._reload_if_changed()
+            self._revalidate()
+            return {
+                "folders": dict(self._folders),
+                "confirmed": dict(self._confirmed),
+                "roots": list(self._roots),
+            }
+
+
+known_locations = KnownLocations()
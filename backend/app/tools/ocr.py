@@ -1,5 +1,3 @@
-import pytesseract
-from PIL import Image
 import os
 
 class OCRTool:
@@ -9,6 +7,8 @@ class OCRTool:
 
     def extract_text(self, image_path: str) -> str:
         try:
+            import pytesseract
+            from PIL import Image
             image = Image.open(image_path)
             text = pytesseract.image_to_string(image)
             return text
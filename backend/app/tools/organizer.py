@@ -0,0 +1,301 @@
+import os
+import json
+import shutil
+import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from app.core.leader import leader_election
+from app.core.memory import memory_manager
+from app.core.startup import LazySingleton
+
+logger = logging.getLogger(__name__)
+
+# Each extension belongs to exactly one folder (the old rules listed .pdf/.docx/.xlsx twice)
+DEFAULT_RULES = {
+    "Quotations": [".pdf", ".docx"],
+    "Spreadsheets": [".xlsx", ".xls", ".csv"],
+    "Images": [".jpg", ".jpeg", ".png", ".bmp", ".tiff", ".webp", ".svg"],
+    "Documents": [".doc", ".txt", ".rtf", ".pptx", ".ppt", ".odt"],
+    "Archives": [".zip", ".rar", ".7z", ".tar", ".gz"],
+    "Shortcuts": [".lnk", ".url"],
+    "Scripts": [".py", ".bat", ".sh", ".js"],
+}
+
+
+def _unique_dest(dest: str, taken: set) -> str:
+    """`dest`, or `name (1).ext`, `name (2).ext`, ... if that exists on disk or is already planned."""
+    stem, ext = os.path.splitext(dest)
+    candidate, n = dest, 1
+    while os.path.normcase(candidate) in taken or os.path.lexists(candidate):
+        candidate = f"{stem} ({n}){ext}"
+        n += 1
+    return candidate
+
+
+class FolderOrganizer:
+    """
+    Organizes a folder in two steps: `plan` computes every move once (target folder, collision-free
+    destination name) and stores it for confirmation; `execute` carries out exactly that plan in batches.
+    Same-device moves are renames; cross-device moves are copied in parallel. Every move is written to
+    a journal before it happens, so `undo` can put files back even after an interrupted run.
+    """
+
+    def __init__(self, db=None):
+        self.db = db or memory_manager.db
+        self._create_schema()
+        self.recover_interrupted()
+
+    def _create_schema(self):
+        with self.db.transaction() as cursor:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS organize_plans (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    root TEXT NOT NULL,
+                    dest_root TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'planned',
+                    moves TEXT NOT NULL,
+                    summary TEXT,
+                    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                    executed_at TEXT,
+                    worker TEXT
+                )
+            """)
+            cursor.execute("PRAGMA table_info(organize_plans)")
+            if "worker" not in {row[1] for row in cursor.fetchall()}:
+                cursor.execute("ALTER TABLE organize_plans ADD COLUMN worker TEXT")  # Process executing the plan
+            # One row per move (or created folder), written before the move: pending -> done/failed -> undone
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS organize_journal (
+                    plan_id INTEGER NOT NULL,
+                    seq INTEGER NOT NULL,
+                    action TEXT NOT NULL,
+                    src TEXT,
+                    dest TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    error TEXT,
+                    PRIMARY KEY (plan_id, seq)
+                )
+            """)
+
+    # ─── PLAN ──────────────────────────────────────────────────────────
+
+    def plan(self, path: str, rules: Dict[str, List[str]] = None, dest_root: str = None) -> Dict[str, Any]:
+        """Compute and store the move plan for the files directly inside `path`."""
+        path = os.path.expanduser(path)
+        if not os.path.isdir(path):
+            return {"status": "error", "message": f"Not a directory: {path}"}
+        dest_root = os.path.expanduser(dest_root) if dest_root else path
+
+        folder_for = {}
+        for folder_name, extensions in (rules or DEFAULT_RULES).items():
+            for ext in extensions:
+                folder_for.setdefault(ext.lower(), folder_name)  # First rule wins, as before
+
+        moves, skipped, taken = [], 0, set()
+        for entry in sorted(os.scandir(path), key=lambda e: e.name.lower()):
+            if not entry.is_file(follow_symlinks=False):
+                continue
+            folder_name = folder_for.get(os.path.splitext(entry.name)[1].lower())
+            if folder_name is None:
+                skipped += 1
+                continue
+            st = entry.stat(follow_symlinks=False)
+            dest = _unique_dest(os.path.join(dest_root, folder_name, entry.name), taken)
+            taken.add(os.path.normcase(dest))
+            moves.append({"src": entry.path, "dest": dest, "folder": folder_name,
+                          "size": st.st_size, "mtime": st.st_mtime})
+
+        cursor = self.db.execute("INSERT INTO organize_plans (root, dest_root, moves) VALUES (?, ?, ?)",
+                                 (path, dest_root, json.dumps(moves)))
+        return self._describe(cursor.lastrowid, path, dest_root, "planned", moves, skipped=skipped)
+
+    @staticmethod
+    def _describe(plan_id, root, dest_root, status, moves, **extra) -> Dict[str, Any]:
+        return {
+            "plan_id": plan_id, "root": root, "dest_root": dest_root, "status": status,
+            "total_moves": len(moves),
+            "by_folder": dict(Counter(m["folder"] for m in moves)),
+            "renamed": [{"from": os.path.basename(m["src"]), "to": os.path.basename(m["dest"]), "folder": m["folder"]}
+                        for m in moves if os.path.basename(m["src"]) != os.path.basename(m["dest"])],
+            "moves": [{"name": os.path.basename(m["src"]), "folder": m["folder"],
+                       "dest": m["dest"].replace("\\", "/")} for m in moves],
+            **extra,
+        }
+
+    def get(self, plan_id: int) -> Optional[Dict[str, Any]]:
+        rows = self.db.fetch_all("SELECT * FROM organize_plans WHERE id = ?", (plan_id,))
+        if not rows:
+            return None
+        row = rows[0]
+        summary = json.loads(row["summary"]) if row["summary"] else {}
+        return self._describe(row["id"], row["root"], row["dest_root"], row["status"], json.loads(row["moves"]),
+                              created_at=row["created_at"], executed_at=row["executed_at"], result=summary)
+
+    def list_plans(self, limit: int = 20) -> List[Dict[str, Any]]:
+        return self.db.fetch_all("""
+            SELECT id, root, dest_root, status, summary, created_at, executed_at
+            FROM organize_plans ORDER BY id DESC LIMIT ?
+        """, (limit,))
+
+    # ─── EXECUTE ───────────────────────────────────────────────────────
+
+    @staticmethod
+    def _same_device(src: str, dest_dir: str) -> bool:
+        try:
+            return os.stat(src).st_dev == os.stat(dest_dir).st_dev
+        except OSError:
+            return False
+
+    @staticmethod
+    def _copy_then_remove(src: str, dest: str):
+        try:
+            shutil.copy2(src, dest)
+            if os.path.getsize(dest) != os.path.getsize(src):
+                raise OSError(f"Size mismatch after copying {src}")
+        except OSError:
+            if os.path.exists(dest):
+                os.remove(dest)  # Never leave a partial copy behind; the source is untouched
+            raise
+        os.remove(src)
+
+    def _journal(self, plan_id: int, rows: List[tuple]):
+        with self.db.transaction() as cursor:
+            cursor.executemany("""
+                INSERT OR REPLACE INTO organize_journal (plan_id, seq, action, src, dest, status)
+                VALUES (?, ?, ?, ?, ?, 'pending')
+            """, [(plan_id, *r) for r in rows])
+
+    def _settle(self, plan_id: int, outcomes: List[tuple]):
+        with self.db.transaction() as cursor:
+            cursor.executemany("UPDATE organize_journal SET status = ?, error = ? WHERE plan_id = ? AND seq = ?",
+                               [(status, error, plan_id, seq) for seq, status, error in outcomes])
+
+    def execute(self, plan_id: int, batch_size: int = 200, workers: int = 4) -> Dict[str, Any]:
+        """Carry out a stored plan. Files changed or gone since planning are skipped, not guessed at."""
+        claimed = self.db.execute("UPDATE organize_plans SET status = 'executing', worker = ? WHERE id = ? AND status = 'planned'",
+                                  (leader_election.claim_id(), plan_id))
+        if not claimed.rowcount:
+            plan = self.get(plan_id)
+            return {"status": "error", "message": f"Plan {plan_id} is {plan['status']}" if plan else f"No plan {plan_id}"}
+        row = self.db.fetch_all("SELECT dest_root, moves FROM organize_plans WHERE id = ?", (plan_id,))[0]
+        moves = json.loads(row["moves"])
+
+        seq = 0
+        # Target folders first, journaled so undo can remove the ones this run created
+        for folder in sorted({os.path.dirname(m["dest"]) for m in moves}):
+            if not os.path.isdir(folder):
+                os.makedirs(folder, exist_ok=True)
+                self._journal(plan_id, [(seq, "mkdir", None, folder)])
+                self._settle(plan_id, [(seq, "done", None)])
+                seq += 1
+
+        folder_dev = {}
+        for folder in {os.path.dirname(m["dest"]) for m in moves}:
+            try:
+                folder_dev[folder] = os.stat(folder).st_dev
+            except OSError:
+                folder_dev[folder] = None
+
+        moved, skipped, failed = Counter(), [], []
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for start in range(0, len(moves), batch_size):
+                batch, entries = [], []
+                for m in moves[start:start + batch_size]:
+                    try:
+                        st = os.stat(m["src"])
+                    except OSError:
+                        skipped.append({"name": os.path.basename(m["src"]), "reason": "missing"})
+                        continue
+                    if st.st_size != m["size"] or st.st_mtime != m["mtime"]:
+                        skipped.append({"name": os.path.basename(m["src"]), "reason": "changed since plan"})
+                        continue
+                    if os.path.lexists(m["dest"]):
+                        skipped.append({"name": os.path.basename(m["src"]), "reason": "destination now exists"})
+                        continue
+                    batch.append((seq, m, st.st_dev == folder_dev[os.path.dirname(m["dest"])]))
+                    entries.append((seq, "move", m["src"], m["dest"]))
+                    seq += 1
+                if not batch:
+                    continue
+                self._journal(plan_id, entries)
+
+                outcomes, copies = [], []
+                for s, m, same_device in batch:
+                    if same_device:
+                        try:
+                            os.rename(m["src"], m["dest"])
+                            outcomes.append((s, "done", None))
+                            moved[m["folder"]] += 1
+                        except OSError as e:
+                            outcomes.append((s, "failed", str(e)))
+                            failed.append({"name": os.path.basename(m["src"]), "error": str(e)})
+                    else:
+                        copies.append((s, m, pool.submit(self._copy_then_remove, m["src"], m["dest"])))
+                for s, m, future in copies:
+                    try:
+                        future.result()
+                        outcomes.append((s, "done", None))
+                        moved[m["folder"]] += 1
+                    except OSError as e:
+                        outcomes.append((s, "failed", str(e)))
+                        failed.append({"name": os.path.basename(m["src"]), "error": str(e)})
+                self._settle(plan_id, outcomes)
+
+        summary = {"moved": sum(moved.values()), "by_folder": dict(moved), "skipped": skipped, "failed": failed}
+        status = "done" if not failed else "partial"
+        self.db.execute("UPDATE organize_plans SET status = ?, summary = ?, executed_at = CURRENT_TIMESTAMP WHERE id = ?",
+                        (status, json.dumps(summary), plan_id))
+        logger.info(f"Organize plan {plan_id} executed: {summary['moved']} moved, {len(skipped)} skipped, {len(failed)} failed")
+        return {"status": status, "plan_id": plan_id, **summary}
+
+    # ─── UNDO ──────────────────────────────────────────────────────────
+
+    def undo(self, plan_id: int) -> Dict[str, Any]:
+        """Move every journaled file back (newest first) and remove folders the run created, if empty."""
+        entries = self.db.fetch_all("""
+            SELECT seq, action, src, dest, status FROM organize_journal
+            WHERE plan_id = ? AND status IN ('done', 'pending') ORDER BY seq DESC
+        """, (plan_id,))
+        if not entries:
+            return {"status": "error", "message": f"Nothing to undo for plan {plan_id}"}
+
+        restored, problems, outcomes = 0, [], []
+        for e in entries:
+            if e["action"] == "mkdir":
+                try:
+                    os.rmdir(e["dest"])  # Only succeeds if the folder is empty again
+                except OSError:
+                    pass
+                outcomes.append((e["seq"], "undone", None))
+                continue
+            # A 'pending' row may or may not have moved before an interruption; the disk decides
+            if not os.path.lexists(e["dest"]) or os.path.lexists(e["src"]):
+                if e["status"] == "pending":
+                    outcomes.append((e["seq"], "undone", None))  # Never actually moved
+                else:
+                    problems.append({"name": os.path.basename(e["src"]), "reason": "moved or replaced since"})
+                    outcomes.append((e["seq"], "failed", "cannot restore"))
+                continue
+            try:
+                if self._same_device(e["dest"], os.path.dirname(e["src"])):
+                    os.rename(e["dest"], e["src"])
+                else:
+                    self._copy_then_remove(e["dest"], e["src"])
+                restored += 1
+                outcomes.append((e["seq"], "undone", None))
+            except OSError as ex:
+                problems.append({"name": os.path.basename(e["src"]), "reason": str(ex)})
+                outcomes.append((e["seq"], "failed", str(ex)))
+        self._settle(plan_id, outcomes)
+        self.db.execute("UPDATE organize_plans SET status = 'undone' WHERE id = ?", (plan_id,))
+        return {"status": "success" if not problems else "partial", "plan_id": plan_id,
+                "restored": restored, "problems": problems}
+
+    def recover_interrupted(self):
+        """Runs whose worker process has gone (restart or crash) are marked partial; their journal still allows undo."""
+        leader_election.recover_dead_claims(self.db, "organize_plans", "status = 'executing'", "status = 'partial'")
+
+
+folder_organizer = LazySingleton("organizer", FolderOrganizer)
@@ -0,0 +1,195 @@
+import os
+import glob
+import json
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.core.config import settings
+from app.core.leader import FileLock
+from app.core.memory import memory_manager
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_COLUMNS = ["id", "vendor_name", "material", "currency", "unit_price", "qty", "total",
+                    "delivery_weeks", "date"]
+# Periods per year for each supported frequency (used for YoY shifts)
+PERIODS_PER_YEAR = {"W": 52, "M": 12, "Q": 4}
+
+
+class PriceAnalytics:
+    """
+    Columnar (Parquet) snapshot of the quotes table, appended incrementally by id watermark,
+    with vectorized trend and aggregate queries on top. Writers and readers of the part files hold
+    a lock file as well as a thread lock, since every uvicorn worker process refreshes the same snapshot.
+    """
+
+    MAX_PARTS = 20  # Compact into one file beyond this many appended parts
+
+    def __init__(self, root: str = None):
+        self.root = root or settings.ANALYTICS_DIR
+        self.parts_dir = os.path.join(self.root, "quotes")
+        self.state_path = os.path.join(self.root, "state.json")
+        self._lock = threading.Lock()
+        self._file_lock = FileLock(os.path.join(self.root, "snapshot.lock"))
+        self._frame: Optional[pd.DataFrame] = None
+        self._frame_watermark = -1
+
+    # ─── SNAPSHOT ──────────────────────────────────────────────────────
+
+    def _read_state(self) -> Dict[str, Any]:
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {"watermark": 0}
+
+    def _write_state(self, state: Dict[str, Any]):
+        tmp = f"{self.state_path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp, self.state_path)
+
+    @staticmethod
+    def _prepare(rows: List[Dict[str, Any]]) -> pd.DataFrame:
+        df = pd.DataFrame(rows, columns=SNAPSHOT_COLUMNS)
+        for col in ["unit_price", "qty", "total", "delivery_weeks"]:
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+        df["date"] = pd.to_datetime(df["date"], errors="coerce")
+        # Effective per-unit price: stated unit price, else total / qty
+        derived = df["total"] / df["qty"].replace(0, np.nan)
+        df["price"] = df["unit_price"].fillna(derived)
+        for col in ["vendor_name", "material", "currency"]:
+            df[col] = df[col].fillna("").astype(str)
+        return df
+
+    def refresh_snapshot(self) -> Dict[str, Any]:
+        """Append quotes newer than the watermark as a new Parquet part."""
+        os.makedirs(self.parts_dir, exist_ok=True)
+        with self._lock, self._file_lock:
+            state = self._read_state()
+            watermark = state.get("watermark", 0)
+            rows = memory_manager.db.fetch_all(
+                f"SELECT {', '.join(SNAPSHOT_COLUMNS)} FROM quotes WHERE id > ? ORDER BY id", (watermark,))
+            if rows:
+                df = self._prepare(rows)
+                first, last = int(df["id"].iloc[0]), int(df["id"].iloc[-1])
+                df.to_parquet(os.path.join(self.parts_dir, f"part-{first:010d}-{last:010d}.parquet"), index=False)
+                state["watermark"] = last
+                self._write_state(state)
+                if self._frame is not None and self._frame_watermark == watermark:
+                    # Extend the in-memory frame instead of re-reading every part
+                    self._frame = pd.concat([self._frame, df], ignore_index=True)
+                    self._frame_watermark = last
+                if len(self._parts()) > self.MAX_PARTS:
+                    self._compact()
+            return {"watermark": state["watermark"], "appended": len(rows), "parts": len(self._parts())}
+
+    def _parts(self, include_covered: bool = False) -> List[str]:
+        """
+        Snapshot part files by id range. A part whose range lies inside another part's range was already
+        compacted into it (left behind by a crash before its removal) and is skipped unless `include_covered`.
+        """
+        parts = sorted(glob.glob(os.path.join(self.parts_dir, "part-*.parquet")))
+        if include_covered:
+            return parts
+        ranges = {}
+        for p in parts:
+            _, first, last = os.path.basename(p)[:-len(".parquet")].split("-")
+            ranges[p] = (int(first), int(last))
+        return [p for p in parts
+                if not any(q != p and ranges[q][0] <= ranges[p][0] and ranges[p][1] <= ranges[q][1] for q in parts)]
+
+    def _compact(self):
+        parts = self._parts()
+        df = pd.concat([pd.read_parquet(p) for p in parts], ignore_index=True)
+        first, last = int(df["id"].min()), int(df["id"].max())
+        target = os.path.join(self.parts_dir, f"part-{first:010d}-{last:010d}.parquet")
+        tmp = f"{target}.{os.getpid()}.tmp"
+        df.to_parquet(tmp, index=False)
+        # The compacted file is in place before anything is deleted; a crash in between leaves
+        # covered parts that readers skip and the next compaction removes
+        os.replace(tmp, target)
+        for p in self._parts(include_covered=True):
+            if p != target:
+                os.remove(p)
+        logger.info(f"Compacted {len(parts)} analytics parts into {os.path.basename(target)}")
+
+    def frame(self) -> pd.DataFrame:
+        """Current snapshot as a DataFrame (refreshed incrementally, cached between calls)."""
+        self.refresh_snapshot()
+        with self._lock, self._file_lock:
+            watermark = self._read_state().get("watermark", 0)
+            if self._frame is None or self._frame_watermark != watermark:
+                parts = self._parts()
+                self._frame = (pd.concat([pd.read_parquet(p) for p in parts], ignore_index=True)
+                               if parts else self._prepare([]))
+                self._frame_watermark = watermark
+            return self._frame
+
+    # ─── QUERIES ───────────────────────────────────────────────────────
+
+    @staticmethod
+    def _filter(df: pd.DataFrame, material: str = None, vendor: str = None, currency: str = None) -> pd.DataFrame:
+        mask = pd.Series(True, index=df.index)
+        if material:
+            mask &= df["material"].str.lower() == material.lower()
+        if vendor:
+            mask &= df["vendor_name"].str.lower() == vendor.lower()
+        if currency:
+            mask &= df["currency"].str.lower() == currency.lower()
+        return df[mask & df["price"].notna() & df["date"].notna()]
+
+    def price_trend(self, material: str = None, vendor: str = None, currency: str = None,
+                    freq: str = "M", window: int = 3) -> Dict[str, Any]:
+        """Per-period average unit price with a moving average and year-over-year change."""
+        freq = freq.upper() if freq.upper() in PERIODS_PER_YEAR else "M"
+        df = self._filter(self.frame(), material, vendor, currency)
+        if df.empty:
+            return {"series": [], "currencies": []}
+
+        currencies = sorted(df["currency"].unique().tolist())
+        series = []
+        for cur, group in df.groupby("currency"):
+            periods = group["date"].dt.to_period(freq)
+            agg = group.groupby(periods)["price"].agg(["mean", "min", "max", "count"])
+            # Continuous period index so rolling windows and YoY shifts line up with the calendar
+            agg = agg.reindex(pd.period_range(agg.index.min(), agg.index.max(), freq=freq))
+            agg["moving_avg"] = agg["mean"].rolling(window, min_periods=1).mean()
+            agg["yoy_pct"] = agg["mean"].pct_change(PERIODS_PER_YEAR[freq], fill_method=None) * 100
+            agg = agg.round(4).replace({np.nan: None})
+            series.append({
+                "currency": cur,
+                "points": [{"period": str(p), "avg_price": r["mean"], "min": r["min"], "max": r["max"],
+                            "quotes": int(r["count"] or 0), "moving_avg": r["moving_avg"], "yoy_pct": r["yoy_pct"]}
+                           for p, r in agg.iterrows()],
+            })
+        return {"material": material, "vendor": vendor, "freq": freq, "window": window,
+                "currencies": currencies, "series": series}
+
+    def summary(self, group_by: str = "material", material: str = None, vendor: str = None,
+                currency: str = None) -> List[Dict[str, Any]]:
+        """Aggregates per material or vendor (and currency), with trailing-12-month YoY change."""
+        key = "vendor_name" if group_by == "vendor" else "material"
+        df = self._filter(self.frame(), material, vendor, currency)
+        if df.empty:
+            return []
+
+        latest = df["date"].max()
+        last_year = df["date"] > latest - pd.DateOffset(years=1)
+        prior_year = (df["date"] <= latest - pd.DateOffset(years=1)) & (df["date"] > latest - pd.DateOffset(years=2))
+        grouped = df.groupby([key, "currency"])
+        out = grouped["price"].agg(quotes="count", avg_price="mean", min_price="min", max_price="max")
+        out["avg_delivery_weeks"] = grouped["delivery_weeks"].mean()
+        out["last_date"] = grouped["date"].max().dt.strftime("%Y-%m-%d")
+        out["last_12m_avg"] = df[last_year].groupby([key, "currency"])["price"].mean()
+        out["prior_12m_avg"] = df[prior_year].groupby([key, "currency"])["price"].mean()
+        out["yoy_pct"] = (out["last_12m_avg"] / out["prior_12m_avg"] - 1) * 100
+        out = out.reset_index().rename(columns={key: group_by}).sort_values("quotes", ascending=False)
+        return out.round(4).replace({np.nan: None}).to_dict(orient="records")
+
+
+price_analytics = PriceAnalytics()
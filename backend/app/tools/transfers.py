@@ -0,0 +1,382 @@
+import os
+import sys
+import json
+import time
+import errno
+import shutil
+import asyncio
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.leader import leader_election
+from app.core.memory import memory_manager
+from app.core.startup import LazySingleton
+
+logger = logging.getLogger(__name__)
+
+COPY_CHUNK = 64 * 1024 * 1024  # Bytes per kernel copy call; also the progress granularity for big files
+READ_BLOCK = 1024 * 1024
+PART_SUFFIX = ".part"
+
+
+class TransferConflict(Exception):
+    """The destination looks like the source but was not proven identical; the source is left in place."""
+
+
+def _digest(path: str) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(READ_BLOCK), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _copy_range(src: str, dest: str, offset: int, size: int, progress) -> None:
+    """
+    Copy src[offset:size] into dest at the same offset, using the fastest path the OS offers:
+    copy_file_range (in-kernel, reflinks on CoW filesystems), then sendfile, then a buffered loop.
+    """
+    with open(src, "rb") as fin, open(dest, "r+b" if offset else "wb") as fout:
+        pos = offset
+        if hasattr(os, "copy_file_range"):
+            try:
+                while pos < size:
+                    n = os.copy_file_range(fin.fileno(), fout.fileno(), min(COPY_CHUNK, size - pos), pos, pos)
+                    if n == 0:
+                        break
+                    pos += n
+                    progress(n)
+            except OSError as e:
+                # Cross-filesystem on older kernels, or unsupported by the filesystem: fall back
+                if e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EPERM):
+                    raise
+        if pos < size and hasattr(os, "sendfile") and sys.platform.startswith("linux"):
+            fout.seek(pos)
+            try:
+                while pos < size:
+                    n = os.sendfile(fout.fileno(), fin.fileno(), pos, min(COPY_CHUNK, size - pos))
+                    if n == 0:
+                        break
+                    pos += n
+                    progress(n)
+            except OSError as e:
+                if e.errno not in (errno.EINVAL, errno.ENOSYS):
+                    raise
+        if pos < size:
+            fin.seek(pos)
+            fout.seek(pos)
+            buf = bytearray(READ_BLOCK)
+            view = memoryview(buf)
+            while True:
+                n = fin.readinto(buf)
+                if not n:
+                    break
+                fout.write(view[:n])
+                pos += n
+                progress(n)
+        fout.truncate(pos)
+
+
+class TransferManager:
+    """
+    Bulk copy/move jobs. Sources are expanded to per-file items stored in SQLite, so a job can be
+    inspected, streamed and resumed after a restart. Files are copied by a bounded thread pool into
+    `<dest>.part` and renamed into place when complete (optionally after a checksum comparison);
+    an interrupted file continues from its `.part` size. Moves within one device are plain renames.
+    """
+
+    def __init__(self, db=None):
+        self.db = db or memory_manager.db
+        self._live: Dict[int, Dict[str, Any]] = {}  # job_id -> {"bytes", "base_bytes", "cancel"} while running
+        self._lock = threading.Lock()
+        self._create_schema()
+        self.recover_interrupted()
+
+    def _create_schema(self):
+        with self.db.transaction() as cursor:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS transfer_jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    op TEXT NOT NULL,
+                    sources TEXT NOT NULL,
+                    dest TEXT NOT NULL,
+                    verify INTEGER DEFAULT 0,
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    total_files INTEGER DEFAULT 0,
+                    total_bytes INTEGER DEFAULT 0,
+                    error TEXT,
+                    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                    started_at REAL,
+                    finished_at REAL,
+                    worker TEXT,
+                    cancel_requested INTEGER DEFAULT 0
+                )
+            """)
+            cursor.execute("PRAGMA table_info(transfer_jobs)")
+            columns = {row[1] for row in cursor.fetchall()}
+            for column, decl in (("worker", "TEXT"), ("cancel_requested", "INTEGER DEFAULT 0")):
+                if column not in columns:
+                    cursor.execute(f"ALTER TABLE transfer_jobs ADD COLUMN {column} {decl}")
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS transfer_items (
+                    job_id INTEGER NOT NULL,
+                    seq INTEGER NOT NULL,
+                    src TEXT NOT NULL,
+                    dest TEXT NOT NULL,
+                    size INTEGER,
+                    mtime REAL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    error TEXT,
+                    PRIMARY KEY (job_id, seq)
+                )
+            """)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_transfer_items_status ON transfer_items(job_id, status)")
+
+    def recover_interrupted(self):
+        """Jobs whose worker process has gone (restart or crash) keep their per-file progress and can be resumed."""
+        leader_election.recover_dead_claims(self.db, "transfer_jobs", "status IN ('running', 'queued')",
+                                            "status = 'interrupted'")
+
+    # ─── JOBS ──────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _expand(sources: List[str], dest: str) -> List[tuple]:
+        """(src, dest, size, mtime) per file; a folder source lands as dest/<folder name>/..."""
+        items = []
+        for source in sources:
+            source = os.path.abspath(os.path.expanduser(source))
+            if os.path.isfile(source):
+                st = os.stat(source)
+                items.append((source, os.path.join(dest, os.path.basename(source)), st.st_size, st.st_mtime))
+                continue
+            base = os.path.join(dest, os.path.basename(source.rstrip("/\\")))
+            for dirpath, dirnames, filenames in os.walk(source):
+                dirnames.sort()
+                for name in sorted(filenames):
+                    path = os.path.join(dirpath, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    items.append((path, os.path.join(base, os.path.relpath(path, source)), st.st_size, st.st_mtime))
+        return items
+
+    def create(self, sources: List[str], dest: str, op: str = "copy", verify: bool = False) -> Dict[str, Any]:
+        """Record a job and its file list (blocking); `start` runs it."""
+        if op not in ("copy", "move"):
+            return {"status": "error", "message": f"Unknown operation: {op}"}
+        missing = [s for s in sources if not os.path.exists(os.path.expanduser(s))]
+        if missing:
+            return {"status": "error", "message": f"Sources not found: {missing}"}
+        dest = os.path.abspath(os.path.expanduser(dest))
+        for s in sources:
+            s = os.path.abspath(os.path.expanduser(s))
+            if os.path.isdir(s) and (dest + os.sep).startswith(s.rstrip("/\\") + os.sep):
+                return {"status": "error", "message": f"Destination is inside source folder {s}"}
+        items = self._expand(sources, dest)
+        with self.db.transaction() as cursor:
+            cursor.execute("""
+                INSERT INTO transfer_jobs (op, sources, dest, verify, total_files, total_bytes, worker)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (op, json.dumps(sources), dest, int(verify), len(items), sum(i[2] for i in items), leader_election.claim_id()))
+            job_id = cursor.lastrowid
+            cursor.executemany("INSERT INTO transfer_items (job_id, seq, src, dest, size, mtime) VALUES (?, ?, ?, ?, ?, ?)",
+                               [(job_id, seq, *item) for seq, item in enumerate(items)])
+        return {"status": "queued", "job_id": job_id, "total_files": len(items), "total_bytes": sum(i[2] for i in items)}
+
+    def start(self, job_id: int) -> Dict[str, Any]:
+        """Run (or resume) a job in the background; finished files are not copied again."""
+        claimed = self.db.execute("""
+            UPDATE transfer_jobs SET status = 'running', error = NULL, started_at = ?, finished_at = NULL,
+                   worker = ?, cancel_requested = 0
+            WHERE id = ? AND status IN ('queued', 'interrupted', 'partial', 'failed', 'cancelled')
+        """, (time.time(), leader_election.claim_id(), job_id))
+        if not claimed.rowcount:
+            job = self.status(job_id)
+            return {"status": "error", "message": f"Job {job_id} is {job['status']}" if job else f"No job {job_id}"}
+        self.db.execute("UPDATE transfer_items SET status = 'pending', error = NULL WHERE job_id = ? AND status = 'failed'",
+                        (job_id,))
+        # Bytes of files finished by earlier runs count as progress
+        row = self.db.fetch_one("SELECT COALESCE(SUM(size), 0) FROM transfer_items WHERE job_id = ? AND status IN ('done', 'skipped')",
+                                (job_id,))
+        with self._lock:
+            self._live[job_id] = {"bytes": row[0], "base_bytes": row[0], "cancel": threading.Event()}
+        threading.Thread(target=self._run, args=(job_id,), name=f"transfer-{job_id}", daemon=True).start()
+        return {"status": "running", "job_id": job_id}
+
+    def cancel(self, job_id: int) -> Dict[str, Any]:
+        live = self._live.get(job_id)
+        if live:
+            live["cancel"].set()  # Files already in flight finish; the rest stay pending for a resume
+        # A job run by another worker process sees the flag at its next progress save
+        elif not self.db.execute("UPDATE transfer_jobs SET cancel_requested = 1 WHERE id = ? AND status = 'running'",
+                                 (job_id,)).rowcount:
+            return {"status": "error", "message": f"Job {job_id} is not running"}
+        return {"status": "cancelling", "job_id": job_id}
+
+    # ─── WORKERS ───────────────────────────────────────────────────────
+
+    def _progress(self, job_id: int):
+        def add(n: int):
+            with self._lock:
+                self._live[job_id]["bytes"] += n
+        return add
+
+    def _transfer(self, job_id: int, item: Dict[str, Any], op: str, verify: bool) -> str:
+        src, dest, progress = item["src"], item["dest"], self._progress(job_id)
+        st = os.stat(src)
+        if os.path.exists(dest):
+            d = os.stat(dest)
+            if d.st_size == st.st_size and int(d.st_mtime) == int(st.st_mtime):
+                # Probably copied by an earlier run before its row was saved; only a checksum proves it
+                if verify and _digest(src) != _digest(dest):
+                    raise FileExistsError(f"Destination exists with different content: {dest}")
+                if op == "move" and not verify:
+                    # Size and timestamp alone are not enough to delete the only other copy
+                    raise TransferConflict(f"Destination exists with the same size and time (not verified), source kept: {dest}")
+                progress(st.st_size)
+                if op == "move":
+                    os.remove(src)
+                return "skipped"
+            raise FileExistsError(f"Destination exists with different content: {dest}")
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+
+        if op == "move" and os.stat(os.path.dirname(dest)).st_dev == st.st_dev:
+            os.rename(src, dest)  # Same device: no data is copied, so there is nothing to verify
+            progress(st.st_size)
+            return "done"
+
+        part = dest + PART_SUFFIX
+        offset = 0
+        if os.path.exists(part) and item["mtime"] == st.st_mtime and item["size"] == st.st_size:
+            offset = min(os.path.getsize(part), st.st_size)  # Resume an interrupted copy of the unchanged source
+            progress(offset)
+        _copy_range(src, part, offset, st.st_size, progress)
+        shutil.copystat(src, part)
+        if verify and _digest(src) != _digest(part):
+            os.remove(part)
+            raise IOError(f"Checksum mismatch copying {src}")
+        os.replace(part, dest)
+        if op == "move":
+            os.remove(src)
+        return "done"
+
+    def _run(self, job_id: int):
+        job = self.db.fetch_all("SELECT op, sources, verify FROM transfer_jobs WHERE id = ?", (job_id,))[0]
+        op, verify = job["op"], bool(job["verify"])
+        cancel = self._live[job_id]["cancel"]
+        items = self.db.fetch_all("SELECT seq, src, dest, size, mtime FROM transfer_items WHERE job_id = ? AND status = 'pending' ORDER BY seq",
+                                  (job_id,))
+
+        def work(item):
+            if cancel.is_set():
+                return item["seq"], "pending", None
+            try:
+                return item["seq"], self._transfer(job_id, item, op, verify), None
+            except TransferConflict as e:
+                return item["seq"], "conflict", str(e)
+            except Exception as e:
+                return item["seq"], "failed", str(e)
+
+        pending_updates, last_flush = [], time.monotonic()
+
+        def flush():
+            with self.db.transaction() as cursor:
+                cursor.executemany("UPDATE transfer_items SET status = ?, error = ? WHERE job_id = ? AND seq = ?",
+                                   [(status, error, job_id, seq) for seq, status, error in pending_updates])
+            pending_updates.clear()
+            if self.db.fetch_one("SELECT cancel_requested FROM transfer_jobs WHERE id = ?", (job_id,))[0]:
+                cancel.set()
+
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, settings.TRANSFER_CONCURRENCY)) as pool:
+                for future in as_completed([pool.submit(work, item) for item in items]):
+                    seq, status, error = future.result()
+                    if status != "pending":
+                        pending_updates.append((seq, status, error))
+                    # Item states are saved in batches; a crash loses at most ~1s, which the next run re-checks
+                    if len(pending_updates) >= 200 or time.monotonic() - last_flush > 1.0:
+                        flush()
+                        last_flush = time.monotonic()
+            flush()
+            if op == "move":
+                self._remove_empty_source_dirs(json.loads(job["sources"]))
+            counts = {r["status"]: r["n"] for r in self.db.fetch_all(
+                "SELECT status, COUNT(*) AS n FROM transfer_items WHERE job_id = ? GROUP BY status", (job_id,))}
+            status = "cancelled" if counts.get("pending") else "partial" if counts.get("failed") or counts.get("conflict") else "done"
+            self.db.execute("UPDATE transfer_jobs SET status = ?, finished_at = ? WHERE id = ?", (status, time.time(), job_id))
+            logger.info(f"Transfer job {job_id} {status}: {counts}")
+        except Exception as e:
+            logger.error(f"Transfer job {job_id} failed: {e}")
+            self.db.execute("UPDATE transfer_jobs SET status = 'failed', error = ?, finished_at = ? WHERE id = ?",
+                            (str(e), time.time(), job_id))
+        finally:
+            with self._lock:
+                self._live.pop(job_id, None)
+
+    @staticmethod
+    def _remove_empty_source_dirs(sources: List[str]):
+        for source in sources:
+            source = os.path.abspath(os.path.expanduser(source))
+            if not os.path.isdir(source):
+                continue
+            for dirpath, _, _ in sorted(os.walk(source), key=lambda w: len(w[0]), reverse=True):
+                try:
+                    os.rmdir(dirpath)  # Fails (and is left alone) if anything remains, e.g. a failed file
+                except OSError:
+                    pass
+
+    # ─── STATUS ────────────────────────────────────────────────────────
+
+    def status(self, job_id: int) -> Optional[Dict[str, Any]]:
+        rows = self.db.fetch_all("SELECT * FROM transfer_jobs WHERE id = ?", (job_id,))
+        if not rows:
+            return None
+        job = rows[0]
+        job["sources"] = json.loads(job["sources"])
+        counts = {r["status"]: r["n"] for r in self.db.fetch_all(
+            "SELECT status, COUNT(*) AS n FROM transfer_items WHERE job_id = ? GROUP BY status", (job_id,))}
+        live = self._live.get(job_id)
+        if live:
+            done_bytes = live["bytes"]
+        else:
+            row = self.db.fetch_one("SELECT COALESCE(SUM(size), 0) FROM transfer_items WHERE job_id = ? AND status IN ('done', 'skipped')",
+                                    (job_id,))
+            done_bytes = row[0]
+        elapsed = ((job["finished_at"] or time.time()) - job["started_at"]) if job["started_at"] else 0
+        job.update({
+            "files": counts,
+            "done_bytes": done_bytes,
+            "percent": round(100 * done_bytes / job["total_bytes"], 1) if job["total_bytes"] else 100.0,
+            "mb_per_second": round((done_bytes - live["base_bytes"]) / elapsed / 1e6, 1) if elapsed > 0 and live else None,
+        })
+        return job
+
+    def failures(self, job_id: int, limit: int = 100) -> List[Dict[str, Any]]:
+        return self.db.fetch_all("""
+            SELECT src, dest, status, error FROM transfer_items WHERE job_id = ? AND status IN ('failed', 'conflict') ORDER BY seq LIMIT ?
+        """, (job_id, limit))
+
+    def list_jobs(self, limit: int = 20) -> List[Dict[str, Any]]:
+        return self.db.fetch_all("""
+            SELECT id, op, dest, status, total_files, total_bytes, created_at FROM transfer_jobs ORDER BY id DESC LIMIT ?
+        """, (limit,))
+
+    async def events(self, job_id: int, interval: float = 0.5):
+        """Server-sent events: a status snapshot every `interval` seconds until the job finishes."""
+        while True:
+            job = await asyncio.to_thread(self.status, job_id)
+            if job is None:
+                yield f"data: {json.dumps({'status': 'error', 'message': 'Job not found'})}\n\n"
+                return
+            yield f"data: {json.dumps(job)}\n\n"
+            if job["status"] != "running":
+                return
+            await asyncio.sleep(interval)
+
+
+transfer_manager = LazySingleton("transfers", TransferManager)
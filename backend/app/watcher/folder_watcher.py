@@ -1,42 +1,86 @@
-import time
+import os
 import logging
 import asyncio
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 from app.core.config import settings
 from app.agents.procurement_agent import procurement_agent
+from app.core.memory import memory_manager
+from app.watcher.ingest_queue import IngestionQueue
+from app.watcher.polling_watcher import PollingWatcher, needs_polling
+from app.core.startup import LazySingleton
+
+logger = logging.getLogger(__name__)
+
+ingestion_queue = LazySingleton("ingestion queue",
+                                lambda: IngestionQueue(procurement_agent.process_new_document, memory_manager.jobs))
+polling_watchers = []
+
 
 class ProcurementFolderHandler(FileSystemEventHandler):
-    def __init__(self, loop):
-        self.loop = loop
+    """Forwards file events to the ingestion queue, which debounces and dedupes them."""
+
+    def __init__(self, queue: IngestionQueue):
+        self.queue = queue
 
     def on_created(self, event):
         if not event.is_directory:
-            print(f"New file detected: {event.src_path}")
-            # Run the async agent process in the main loop
-            asyncio.run_coroutine_threadsafe(
-                procurement_agent.process_new_document(event.src_path), 
-                self.loop
-            )
+            self.queue.submit(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.queue.submit(event.src_path)
+
+    def on_moved(self, event):
+        # Downloads and copy tools often write a temp name and rename when complete
+        if not event.is_directory:
+            self.queue.submit(event.dest_path)
+
+
+def _use_polling(path: str) -> bool:
+    mode = settings.WATCH_MODE.lower()
+    if mode in ("poll", "native"):
+        return mode == "poll"
+    return needs_polling(path)
+
+
+def watcher_metrics() -> dict:
+    return {**ingestion_queue.metrics(), "pollers": [w.metrics() for w in polling_watchers]}
+
 
 async def start_watcher():
-    loop = asyncio.get_running_loop()
-    event_handler = ProcurementFolderHandler(loop)
+    ingestion_queue.start(asyncio.get_running_loop())
+    event_handler = ProcurementFolderHandler(ingestion_queue)
     observer = Observer()
     
-    # Watch RFQ and Inbox specifically
-    import os
+    # Watch RFQ and Inbox specifically, plus any configured shares (recursively)
     os.makedirs(settings.RFQ_DIR, exist_ok=True)
     os.makedirs(settings.INBOX_DIR, exist_ok=True)
-    
-    observer.schedule(event_handler, settings.RFQ_DIR, recursive=False)
-    observer.schedule(event_handler, settings.INBOX_DIR, recursive=False)
+    targets = [(settings.RFQ_DIR, False), (settings.INBOX_DIR, False)]
+    targets += [(p, True) for p in settings.WATCH_PATH_LIST if os.path.isdir(p)]
+
+    polled = {False: [], True: []}
+    for path, recursive in targets:
+        if _use_polling(path):
+            polled[recursive].append(path)
+        else:
+            observer.schedule(event_handler, path, recursive=recursive)
+    for recursive, roots in polled.items():
+        if roots:
+            polling_watchers.append(PollingWatcher(ingestion_queue, roots, recursive=recursive))
     
     observer.start()
-    print(f"Watcher started on {settings.RFQ_DIR} and {settings.INBOX_DIR}")
+    logger.info(f"Watcher started on {', '.join(p for p, _ in targets)}")
+    tasks = [asyncio.create_task(w.run()) for w in polling_watchers]
+    # Catch up on work interrupted by, or arriving during, the last shutdown
+    await ingestion_queue.resume()
+    await ingestion_queue.reconcile([settings.RFQ_DIR, settings.INBOX_DIR])
     try:
         while True:
             await asyncio.sleep(1)
-    except Exception:
+    except asyncio.CancelledError:
         observer.stop()
+        for task in tasks:
+            task.cancel()
+        await ingestion_queue.stop()
     observer.join()
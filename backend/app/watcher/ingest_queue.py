@@ -0,0 +1,247 @@
+import os
+import time
+import asyncio
+import hashlib
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.jobs import JobStore, MISSING_ERROR, SUPERSEDED_ERROR
+
+logger = logging.getLogger(__name__)
+
+# Partial downloads / editor lock files never get ingested
+IGNORED_PREFIXES = ("~$", ".~")
+IGNORED_SUFFIXES = (".tmp", ".part", ".crdownload", ".download", ".swp")
+
+
+def file_digest(path: str, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class IngestionQueue:
+    """
+    Debounced ingestion for watched folders: a file is only handed to the pipeline once its size and
+    mtime have stopped changing, each file version/content is processed once (tracked durably in the
+    job store, so restarts neither lose nor repeat work), and at most `concurrency` pipelines run at a time.
+    """
+
+    def __init__(self, handler: Callable[[str], Awaitable[Any]], jobs: JobStore, concurrency: int = None,
+                 settle_seconds: float = None, max_wait_seconds: float = 600.0):
+        self.handler = handler
+        self.jobs = jobs
+        self.concurrency = concurrency or settings.INGEST_CONCURRENCY
+        self.settle_seconds = settings.INGEST_SETTLE_SECONDS if settle_seconds is None else settle_seconds
+        self.max_wait_seconds = max_wait_seconds
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.queue: Optional[asyncio.Queue] = None
+        self._workers = []
+        self._pending: Dict[str, float] = {}  # path -> time of the latest event (still being written)
+        self._sources: Dict[str, str] = {}
+        self._queued = set()
+        self._in_flight = set()
+        self._completed = deque()  # completion timestamps for throughput
+        self.stats = {"received": 0, "processed": 0, "failed": 0, "duplicates": 0, "vanished": 0,
+                      "busy_seconds": 0.0}
+
+    # ─── LIFECYCLE ─────────────────────────────────────────────────────
+
+    def start(self, loop: asyncio.AbstractEventLoop = None):
+        if self._workers:
+            return
+        self.loop = loop or asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+        self._workers = [self.loop.create_task(self._worker(i)) for i in range(self.concurrency)]
+        logger.info(f"Ingestion queue started with {self.concurrency} workers")
+
+    async def stop(self):
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def resume(self) -> int:
+        """Re-queue jobs that were pending, interrupted mid-run or failed with attempts left when the engine last stopped."""
+        interrupted = self.jobs.recover_interrupted()
+        retried = self.jobs.retry_failed()
+        resumed = 0
+        for job in self.jobs.pending():
+            try:
+                st = os.stat(job["path"])
+            except FileNotFoundError:
+                self.jobs.fail(job["id"], MISSING_ERROR)
+                continue
+            if (st.st_size, st.st_mtime) != (job["size"], job["mtime"]):
+                self.jobs.fail(job["id"], SUPERSEDED_ERROR)
+                continue  # The reconciliation scan creates a job for the new version
+            if job["path"] not in self._queued:
+                self._queued.add(job["path"])
+                await self.queue.put((job["path"], job["id"]))
+                resumed += 1
+        if interrupted or resumed:
+            logger.info(f"Resumed {resumed} ingestion jobs ({interrupted} were interrupted, {retried} failed earlier)")
+        return resumed
+
+    async def reconcile(self, folders: List[str]) -> int:
+        """Queue files that arrived while the engine was down (no job for their current version)."""
+        found = {}
+        for folder in folders:
+            try:
+                with os.scandir(folder) as it:
+                    for entry in it:
+                        if entry.is_file() and not self.is_ignored(entry.path):
+                            st = entry.stat()
+                            found[os.path.abspath(entry.path)] = (st.st_size, st.st_mtime)
+            except FileNotFoundError:
+                continue
+        known = self.jobs.known_versions(list(found))
+        missing = [p for p, (size, mtime) in found.items() if (p, size, mtime) not in known]
+        for path in missing:
+            self._on_event(path, "reconcile")
+        logger.info(f"Startup scan: {len(found)} files in watched folders, {len(missing)} not yet ingested")
+        return len(missing)
+
+    # ─── EVENTS ────────────────────────────────────────────────────────
+
+    @staticmethod
+    def is_ignored(path: str) -> bool:
+        name = os.path.basename(path).lower()
+        return name.startswith(IGNORED_PREFIXES) or name.endswith(IGNORED_SUFFIXES)
+
+    def submit(self, path: str, source: str = "watcher"):
+        """Thread-safe entry point for filesystem event callbacks."""
+        if self.loop is None or self.is_ignored(path):
+            return
+        self.loop.call_soon_threadsafe(self._on_event, os.path.abspath(path), source)
+
+    def _on_event(self, path: str, source: str = "watcher"):
+        self.stats["received"] += 1
+        if path in self._pending:
+            self._pending[path] = time.monotonic()  # Still being written: restart the quiet period
+            return
+        if path in self._queued or path in self._in_flight:
+            return
+        self._pending[path] = time.monotonic()
+        self._sources[path] = source
+        self.loop.create_task(self._stabilize(path))
+
+    async def run_now(self, path: str, source: str = "upload") -> Any:
+        """
+        Process a file immediately (bypassing the queue, no content dedupe) and record it as a job,
+        so the watcher event for the same file version is recognised as already handled.
+        """
+        st = os.stat(path)
+        job = self.jobs.enqueue(os.path.abspath(path), st.st_size, st.st_mtime, source)
+        return await self._run_job(path, job["id"], dedupe=False)
+
+    async def _stabilize(self, path: str):
+        """Wait until size and mtime are unchanged for `settle_seconds` after the last event."""
+        started = time.monotonic()
+        last = None
+        source = self._sources.pop(path, "watcher")
+        try:
+            while True:
+                await asyncio.sleep(self.settle_seconds or 0)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    self.stats["vanished"] += 1  # Renamed away or deleted mid-copy
+                    return
+                current = (st.st_size, st.st_mtime)
+                quiet = time.monotonic() - self._pending.get(path, 0) >= self.settle_seconds
+                if current == last and quiet and st.st_size > 0:
+                    break
+                if time.monotonic() - started > self.max_wait_seconds:
+                    logger.warning(f"{path} kept changing for {self.max_wait_seconds:.0f}s; ingesting anyway")
+                    break
+                last = current
+        finally:
+            self._pending.pop(path, None)
+
+        job = self.jobs.enqueue(path, *current, source)
+        if not job["created"] and job["status"] != "pending":
+            self.stats["duplicates"] += 1  # Modify/rename burst for a file version we already handled
+            return
+        if path in self._queued or path in self._in_flight:
+            return
+        self._queued.add(path)
+        await self.queue.put((path, job["id"]))
+
+    # ─── WORKERS ───────────────────────────────────────────────────────
+
+    async def _worker(self, index: int):
+        while True:
+            path, job_id = await self.queue.get()
+            self._queued.discard(path)
+            self._in_flight.add(path)
+            try:
+                await self._run_job(path, job_id)
+            finally:
+                self._in_flight.discard(path)
+                self.queue.task_done()
+
+    async def _run_job(self, path: str, job_id: int, dedupe: bool = True) -> Any:
+        try:
+            digest = await asyncio.to_thread(file_digest, path)
+        except OSError as e:
+            self.stats["vanished"] += 1
+            self.jobs.fail(job_id, f"Could not read file: {e}")
+            return None
+        if dedupe:
+            original = self.jobs.find_done_by_digest(digest, exclude_id=job_id)
+            if original:
+                self.stats["duplicates"] += 1
+                logger.info(f"Skipping {path}: same content as job {original}")
+                if self.jobs.start(job_id, digest):
+                    self.jobs.finish(job_id, {"type": "Duplicate", "duplicate_of": original}, 0.0)
+                return None
+
+        if not self.jobs.start(job_id, digest):
+            logger.info(f"Skipping {path}: job {job_id} is being processed by another worker")
+            return None
+        started = time.monotonic()
+        try:
+            result = await self.handler(path)
+            error = result.get("error") if isinstance(result, dict) else None
+            if error:
+                # The pipeline reported a failure (unreadable file, extraction or LLM error) instead of raising
+                self.jobs.fail(job_id, str(error), round(time.monotonic() - started, 3))
+                self.stats["failed"] += 1
+                logger.warning(f"Ingestion failed for {path}: {error}")
+                return result
+            self.jobs.finish(job_id, result, round(time.monotonic() - started, 3))
+            self.stats["processed"] += 1
+            return result
+        except Exception as e:
+            self.jobs.fail(job_id, str(e), round(time.monotonic() - started, 3))
+            self.stats["failed"] += 1
+            logger.error(f"Ingestion failed for {path}: {e}")
+            if not dedupe:
+                raise
+            return None
+        finally:
+            self.stats["busy_seconds"] += time.monotonic() - started
+            self._completed.append(time.monotonic())
+
+    # ─── METRICS ───────────────────────────────────────────────────────
+
+    def metrics(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        while self._completed and now - self._completed[0] > 60:
+            self._completed.popleft()
+        done = self.stats["processed"] + self.stats["failed"]
+        return {
+            **self.stats,
+            "busy_seconds": round(self.stats["busy_seconds"], 2),
+            "concurrency": self.concurrency,
+            "stabilizing": len(self._pending),
+            "queue_depth": self.queue.qsize() if self.queue else 0,
+            "in_flight": len(self._in_flight),
+            "throughput_per_min": len(self._completed),
+            "avg_seconds_per_file": round(self.stats["busy_seconds"] / done, 2) if done else None,
+        }
@@ -0,0 +1,189 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.watcher.ingest_queue import IngestionQueue
+
+logger = logging.getLogger(__name__)
+
+# Filesystems where inotify / ReadDirectoryChangesW events do not arrive (SMB, NFS, Docker Desktop bind mounts)
+REMOTE_FS_TYPES = {"cifs", "smb3", "smbfs", "nfs", "nfs4", "9p", "drvfs", "virtiofs", "fakeowner", "grpcfuse"}
+
+# dir -> [dir mtime_ns, {file name: [inode, size, mtime_ns]}, [subdir names]]
+Snapshot = Dict[str, list]
+
+
+def _mount_types() -> List[Tuple[str, str]]:
+    try:
+        with open("/proc/mounts", "r", encoding="utf-8") as f:
+            mounts = [line.split()[1:3] for line in f if len(line.split()) >= 3]
+    except OSError:
+        return []
+    # Longest mount point first so nested mounts win
+    return sorted(((m.replace("\\040", " "), t) for m, t in mounts), key=lambda m: len(m[0]), reverse=True)
+
+
+def needs_polling(path: str) -> bool:
+    """True for UNC paths and network / bind-mounted filesystems, where native change events are unreliable."""
+    if path.startswith(("\\\\", "//")):
+        return True
+    real = os.path.realpath(path)
+    for mount, fstype in _mount_types():
+        if real == mount or real.startswith(mount.rstrip("/") + "/"):
+            return fstype in REMOTE_FS_TYPES or fstype.startswith("fuse")
+    return False
+
+
+class PollingWatcher:
+    """
+    Watches trees by diffing a compact (inode, size, mtime) snapshot. Quick polls only re-list
+    directories whose mtime moved (new, renamed and deleted files); every `deep_minutes` all files
+    are re-stat'ed to catch in-place edits (on a clock, so a busy tree polled every few seconds is not
+    fully re-stat'ed every few seconds too). The interval shrinks while there is activity and backs off
+    towards `max_interval` while the tree is quiet. Snapshots persist, so changes made while the engine
+    was down are reported on the first poll.
+    """
+
+    def __init__(self, queue: IngestionQueue, roots: List[str], recursive: bool = True,
+                 min_interval: float = None, max_interval: float = None, deep_minutes: float = None):
+        self.queue = queue
+        self.roots = [os.path.abspath(r) for r in roots]
+        self.recursive = recursive
+        self.min_interval = min_interval or settings.POLL_MIN_INTERVAL
+        self.max_interval = max_interval or settings.POLL_MAX_INTERVAL
+        self.deep_seconds = (deep_minutes or settings.POLL_DEEP_MINUTES) * 60
+        self._last_deep = time.monotonic()  # The first poll per root is already a full scan
+        self.interval = self.min_interval
+        self.snapshots: Dict[str, Snapshot] = {}
+        self.stats = {"polls": 0, "deep_polls": 0, "changes": 0, "dirs_listed": 0, "last_scan_seconds": 0.0}
+
+    # ─── SNAPSHOT PERSISTENCE ──────────────────────────────────────────
+
+    @staticmethod
+    def _snapshot_path(root: str) -> str:
+        key = hashlib.sha1(root.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(settings.MEMORY_DIR, "watch_snapshots", f"{key}.json")
+
+    def _load(self, root: str) -> Optional[Snapshot]:
+        try:
+            with open(self._snapshot_path(root), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data["dirs"] if data.get("root") == root else None
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _save(self, root: str, snapshot: Snapshot):
+        path = self._snapshot_path(root)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"root": root, "dirs": snapshot}, f, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    # ─── SCANNING ──────────────────────────────────────────────────────
+
+    def _list_dir(self, path: str) -> Tuple[Dict[str, list], List[str]]:
+        files, dirs = {}, []
+        self.stats["dirs_listed"] += 1
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if self.recursive and not entry.name.startswith("."):
+                            dirs.append(entry.name)
+                    elif entry.is_file() and not IngestionQueue.is_ignored(entry.name):
+                        st = entry.stat()
+                        files[entry.name] = [st.st_ino, st.st_size, st.st_mtime_ns]
+                except OSError:
+                    continue
+        return files, dirs
+
+    def scan(self, root: str, previous: Optional[Snapshot], deep: bool) -> Tuple[Snapshot, List[str]]:
+        """Return the new snapshot and the files that are new or changed since `previous`."""
+        previous = previous or {}
+        snapshot: Snapshot = {}
+        changed: List[str] = []
+        stack = [root]
+        while stack:
+            path = stack.pop()
+            try:
+                dir_mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                continue  # Directory vanished or share temporarily unreachable
+            old = previous.get(path)
+            if old is not None and old[0] == dir_mtime and not deep:
+                # Listing unchanged: keep it, but subdirectories carry their own mtimes
+                snapshot[path] = old
+                stack.extend(os.path.join(path, d) for d in old[2])
+                continue
+            try:
+                files, dirs = self._list_dir(path)
+            except OSError:
+                if old is not None:
+                    snapshot[path] = old
+                continue
+            old_files = old[1] if old is not None else {}
+            for name, sig in files.items():
+                if old_files.get(name) != sig:
+                    changed.append(os.path.join(path, name))
+            snapshot[path] = [dir_mtime, files, dirs]
+            stack.extend(os.path.join(path, d) for d in dirs)
+        return snapshot, changed
+
+    def poll_once(self, deep: bool = False) -> List[str]:
+        """One pass over every root (blocking; run in a thread). Returns changed paths."""
+        started = time.monotonic()
+        changed_all = []
+        for root in self.roots:
+            previous = self.snapshots.get(root)
+            baseline = previous is None
+            if baseline:
+                previous = self._load(root)
+            snapshot, changed = self.scan(root, previous, deep or previous is None)
+            self.snapshots[root] = snapshot
+            if previous is None:
+                # Very first sight of this tree: existing files are history (see /backfill), not new arrivals
+                changed = []
+            if changed or baseline:
+                self._save(root, snapshot)
+            changed_all.extend(changed)
+        self.stats["polls"] += 1
+        self.stats["deep_polls"] += int(deep)
+        self.stats["changes"] += len(changed_all)
+        self.stats["last_scan_seconds"] = round(time.monotonic() - started, 3)
+        return changed_all
+
+    # ─── LOOP ──────────────────────────────────────────────────────────
+
+    def _next_interval(self, had_changes: bool) -> float:
+        if had_changes:
+            interval = self.min_interval
+        else:
+            interval = min(self.interval * 1.5, self.max_interval)
+        # Never spend more than about a third of the time scanning
+        return max(interval, self.stats["last_scan_seconds"] * 3)
+
+    async def run(self):
+        logger.info(f"Polling watcher on {', '.join(self.roots)} (every {self.min_interval:g}-{self.max_interval:g}s)")
+        while True:
+            deep = time.monotonic() - self._last_deep >= self.deep_seconds
+            if deep:
+                self._last_deep = time.monotonic()
+            try:
+                changed = await asyncio.to_thread(self.poll_once, deep)
+            except Exception as e:
+                logger.error(f"Polling watcher scan failed: {e}")
+                changed = []
+            for path in changed:
+                self.queue.submit(path, source="poll")
+            self.interval = self._next_interval(bool(changed))
+            await asyncio.sleep(self.interval)
+
+    def metrics(self):
+        return {**self.stats, "roots": self.roots, "interval": round(self.interval, 2),
+                "directories": sum(len(s) for s in self.snapshots.values())}
@@ -0,0 +1,39 @@
+import os
+import sys
+import socket
+import tempfile
+
+import pytest
+
+# Settings are read at import time; these make the app importable without a .env or a model download
+os.environ.setdefault("DEEPSEEK_API_KEY", "test")
+os.environ.setdefault("EMBEDDING_BACKEND", "hashing")
+os.environ.setdefault("WORKSPACE_ROOT", tempfile.mkdtemp(prefix="omnimind-tests-"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings  # noqa: E402
+from app.core.leader import LeaderElection, leader_election  # noqa: E402
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    """A fresh WORKSPACE_ROOT (every workspace path in `settings` derives from it)."""
+    monkeypatch.setattr(settings, "WORKSPACE_ROOT", str(tmp_path))
+    os.makedirs(settings.MEMORY_DIR, exist_ok=True)
+    return tmp_path
+
+
+@pytest.fixture
+def other_worker():
+    """A second, live worker process as seen by this one (its liveness lock is held in the shared lock dir)."""
+    other = LeaderElection(lock_dir=leader_election.lock_dir)
+    other.worker_id = f"{socket.gethostname()}:{os.getpid() + 100000}:1"
+    other.register()
+    yield other.worker_id
+    other._alive.release()
+
+
+@pytest.fixture
+def dead_worker():
+    """Id of a worker process on this machine that has exited (no liveness lock)."""
+    return f"{socket.gethostname()}:{os.getpid() + 200000}:1"
@@ -0,0 +1,54 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from app.core.config import settings
+
+
+@pytest.fixture
+def chat(workspace, monkeypatch):
+    calls = {"planned": [], "executed": []}
+    monkeypatch.setattr(main.llm_engine, "chat", lambda messages, **kw: "NONE")
+    monkeypatch.setattr(main.computer_tools, "plan_organize",
+                        lambda path: calls["planned"].append(path) or {"plan_id": len(calls["planned"]), "moves": []})
+    monkeypatch.setattr(main.computer_tools, "execute_organize",
+                        lambda plan_id: calls["executed"].append(plan_id) or {"status": "done"})
+    client = TestClient(main.app)
+    session_id = client.post("/chat", json={"query": "hello there"}).json()["session_id"]
+
+    def say(query):
+        return client.post("/chat", json={"query": query, "session_id": session_id}).json()
+    say.calls = calls
+    return say
+
+
+@pytest.mark.parametrize("reply, confirms", [
+    ("yes", True), ("OK, go ahead!", True), ("yes please", True), ("do it.", True),
+    ("ok, now show the Tata quote", False), ("yes but only the PDFs", False), ("okay then what", False),
+])
+def test_confirmation_must_be_the_whole_reply(reply, confirms):
+    assert main._is_confirmation(reply.lower()) is confirms
+
+
+def test_confirmation_executes_the_previewed_plan(chat):
+    chat("organize my inbox")
+    assert chat.calls["planned"] == [settings.INBOX_DIR]
+    chat("yes, go ahead")
+    assert chat.calls["executed"] == [1]
+
+
+def test_plan_is_disarmed_by_any_other_turn(chat):
+    chat("organize my inbox")
+    chat("ok, now show the Tata quote")
+    chat("yes")
+    assert chat.calls["executed"] == []
+
+
+def test_sorted_is_not_an_organize_request(chat):
+    chat("show quotes sorted by price")
+    assert chat.calls["planned"] == []
+
+
+def test_organize_without_a_folder_plans_nothing(chat):
+    chat("please organize everything")
+    assert chat.calls["planned"] == []
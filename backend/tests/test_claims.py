@@ -0,0 +1,97 @@
+"""Rows claimed by a worker process: one claimant at a time, and only a dead claimant's rows are recovered."""
+import pytest
+
+from app.core.config import settings
+from app.core.leader import leader_election
+from app.core.memory import MemoryManager
+from app.tools.email_service import EmailService
+from app.tools.transfers import TransferManager
+
+
+@pytest.fixture
+def memory(workspace):
+    return MemoryManager()
+
+
+def _set_worker(db, table, column, worker, row_id):
+    db.execute(f"UPDATE {table} SET {column} = ? WHERE id = ?", (worker, row_id))
+
+
+# ─── INGEST JOBS ───────────────────────────────────────────────────
+
+def test_job_runs_once_while_its_worker_is_alive(memory, other_worker):
+    jobs = memory.jobs
+    job = jobs.enqueue("/inbox/quote.pdf", 10, 1.0)
+    assert jobs.start(job["id"])
+    assert jobs.get(job["id"])["worker"] == leader_election.worker_id
+    _set_worker(memory.db, "ingest_jobs", "worker", other_worker, job["id"])
+    assert not jobs.start(job["id"])
+
+
+def test_running_job_of_a_dead_worker_is_taken_over(memory, dead_worker):
+    jobs = memory.jobs
+    job = jobs.enqueue("/inbox/quote.pdf", 10, 1.0)
+    jobs.start(job["id"])
+    _set_worker(memory.db, "ingest_jobs", "worker", dead_worker, job["id"])
+    assert jobs.start(job["id"])
+
+
+def test_only_dead_workers_jobs_are_recovered(memory, other_worker, dead_worker):
+    jobs = memory.jobs
+    live, dead = (jobs.enqueue(f"/inbox/{n}.pdf", 10, 1.0)["id"] for n in ("live", "dead"))
+    for job_id, worker in ((live, other_worker), (dead, dead_worker)):
+        jobs.start(job_id)
+        _set_worker(memory.db, "ingest_jobs", "worker", worker, job_id)
+    assert jobs.recover_interrupted() == 1
+    assert (jobs.get(live)["status"], jobs.get(dead)["status"]) == ("running", "pending")
+
+
+# ─── EMAIL OUTBOX ──────────────────────────────────────────────────
+
+class _Smtp:
+    def __init__(self, sent):
+        self.sent = sent
+
+    def send_message(self, msg):
+        self.sent.append(msg["Subject"])
+
+    def quit(self):
+        pass
+
+
+@pytest.fixture
+def outbox(memory, monkeypatch):
+    monkeypatch.setattr(settings, "SMTP_SECURITY", "none")
+    sent = []
+    monkeypatch.setattr(EmailService, "_connect", staticmethod(lambda: _Smtp(sent)))
+    service = EmailService(memory.db)
+    service.sent = sent
+    return service
+
+
+def test_outbox_skips_messages_claimed_by_another_worker(outbox, other_worker):
+    ids = outbox.queue_emails([{"to": "a@example.com", "subject": f"RFQ {i}"} for i in range(3)])["ids"]
+    outbox.db.execute("UPDATE email_outbox SET status = 'sending', claimed_by = ? WHERE id = ?", (other_worker, ids[0]))
+    assert outbox.deliver_due()["sent"] == 2
+    assert outbox.sent == ["RFQ 1", "RFQ 2"]
+
+
+def test_outbox_recovers_only_dead_claimers(outbox, other_worker, dead_worker):
+    ids = outbox.queue_emails([{"to": "a@example.com", "subject": f"RFQ {i}"} for i in range(3)])["ids"]
+    for message_id, worker in zip(ids, (other_worker, dead_worker, None)):
+        outbox.db.execute("UPDATE email_outbox SET status = 'sending', claimed_by = ? WHERE id = ?", (worker, message_id))
+    assert outbox.recover_interrupted() == 2  # The dead worker's and the pre-migration (unclaimed) message
+    assert [outbox.outbox_status(i)["status"] for i in ids] == ["sending", "queued", "queued"]
+
+
+# ─── TRANSFERS ─────────────────────────────────────────────────────
+
+def test_transfers_of_dead_workers_are_marked_interrupted(memory, workspace, other_worker, dead_worker):
+    source = workspace / "quote.pdf"
+    source.write_bytes(b"%PDF")
+    transfers = TransferManager(memory.db)
+    live, dead = (transfers.create([str(source)], str(workspace / d))["job_id"] for d in ("a", "b"))
+    _set_worker(memory.db, "transfer_jobs", "worker", other_worker, live)
+    _set_worker(memory.db, "transfer_jobs", "worker", dead_worker, dead)
+    transfers.recover_interrupted()
+    assert (transfers.status(live)["status"], transfers.status(dead)["status"]) == ("queued", "interrupted")
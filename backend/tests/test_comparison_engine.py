@@ -0,0 +1,27 @@
+import pandas as pd
+import pytest
+
+from app.tools.comparison_engine import ComparisonEngine
+
+
+def _credit_days(terms):
+    quote = {"vendor_name": "V", "unit_price": 100, "currency": "INR", "delivery_weeks": 4, "payment_terms": terms}
+    days = ComparisonEngine.score_quotations([quote])["credit_days"].iloc[0]
+    return None if pd.isna(days) else days
+
+
+@pytest.mark.parametrize("terms, days", [
+    ("30 days from commercial invoice", 30),
+    ("Net 45 days, special terms apply", 45),
+    ("60 days after financial close", 60),
+    ("100% advance", 0),
+    ("CIA", 0),
+    ("Prepaid", 0),
+    ("COD", 0),
+    ("Cash on delivery", 0),
+    ("Immediate payment", 0),
+    ("LC at sight", 60),
+    ("As per HSN code", None),
+])
+def test_payment_terms_to_credit_days(terms, days):
+    assert _credit_days(terms) == days
@@ -0,0 +1,18 @@
+import zipfile
+
+from app.tools.file_processor import FileProcessor
+
+
+def test_read_archive_stops_parsing_members_at_max_chars(tmp_path, monkeypatch):
+    bundle = tmp_path / "bundle.zip"
+    with zipfile.ZipFile(bundle, "w") as z:
+        for i in range(20):
+            z.writestr(f"quote{i}.txt", f"line {i}\n" * 2000)
+    parsed = []
+    sections = FileProcessor._sections
+    monkeypatch.setattr(FileProcessor, "_sections", staticmethod(lambda source, ext: parsed.append(ext) or sections(source, ext)))
+
+    text = FileProcessor.read_archive(str(bundle), max_chars=20000)
+    assert len(text) == 20000
+    assert len(parsed) < 20
+    assert len(FileProcessor.extract_sections(str(bundle))) == 20
@@ -0,0 +1,62 @@
+import threading
+
+import pytest
+
+from app.core.knowledge import KnowledgeStore
+from app.core.memory import MemoryManager
+
+
+@pytest.fixture
+def db(workspace):
+    return MemoryManager().db
+
+
+def test_prompt_block_sees_another_workers_write(db):
+    ours, theirs = KnowledgeStore(db), KnowledgeStore(db)
+    ours.store("general", "User keeps RFQs in D:/Procurement/RFQ")
+    assert ours.prompt_block() == "- User keeps RFQs in D:/Procurement/RFQ"
+
+    theirs.store("general", "Tata Steel quotes are in USD")
+    assert "Tata Steel quotes are in USD" in ours.prompt_block()
+
+
+def test_cached_reads_do_not_scan_the_facts_table(db):
+    store = KnowledgeStore(db)
+    store.store("general", "User keeps RFQs in D:/Procurement/RFQ")
+    store.prompt_block()
+
+    statements = []
+    db.connection().set_trace_callback(statements.append)
+    try:
+        store.prompt_block()
+        store.top_facts()
+    finally:
+        db.connection().set_trace_callback(None)
+    assert not [s for s in statements if "personal_knowledge" in s]
+
+
+def test_identical_fact_in_another_category_is_not_merged(db):
+    store = KnowledgeStore(db)
+    first = store.store("vendor", "Tata Steel quotes are in USD")
+    second = store.store("general", "Tata Steel quotes are in USD")
+    assert second["status"] == "stored" and second["id"] != first["id"]
+    assert store.store("general", "Tata Steel quotes are in USD")["id"] == second["id"]
+
+
+def test_prompt_block_is_not_refilled_with_a_stale_block(db, monkeypatch):
+    store = KnowledgeStore(db)
+    store.store("general", "User keeps RFQs in D:/Procurement/RFQ")
+    original = store.top_facts
+    writer = threading.Thread(target=store.store, args=("general", "Orders go to D:/Procurement/PO"))
+
+    def top_facts_racing_a_write(*args, **kwargs):
+        facts = original(*args, **kwargs)
+        monkeypatch.setattr(store, "top_facts", original)
+        writer.start()  # Another thread stores a fact while this block is being built
+        writer.join(timeout=0.2)
+        return facts
+
+    monkeypatch.setattr(store, "top_facts", top_facts_racing_a_write)
+    store.prompt_block()
+    writer.join()
+    assert "Orders go to D:/Procurement/PO" in store.prompt_block()
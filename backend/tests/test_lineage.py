@@ -0,0 +1,15 @@
+import asyncio
+
+from app.core.memory import MemoryManager
+
+
+def test_back_dated_quote_slots_into_the_chain_by_date(workspace):
+    memory = MemoryManager()
+    quote = lambda price, date: memory.store_quote(
+        {"vendor_name": "Tata Steel", "material": "HR Coil", "unit_price": price, "date": date})
+    march, may = quote(100, "2026-03-01"), quote(120, "2026-05-01")
+    april = quote(110, "2026-04-01")  # Ingested last
+
+    chain = asyncio.run(memory.quote_lineage_async(may))
+    assert [row["id"] for row in chain] == [may, april, march]
+    assert memory.get_revision(may)["fields"]["unit_price"]["old"] == 110
@@ -0,0 +1,38 @@
+from app.core.config import settings
+from app.core.memory import MemoryManager
+
+
+def _quote(vendor="Tata Steel", material="HR Coil", price=100.0, date="2026-01-01"):
+    return {"vendor_name": vendor, "material": material, "unit_price": price, "currency": "INR", "date": date}
+
+
+def test_collection_is_rebuilt_when_the_embedding_model_changes(workspace, monkeypatch):
+    memory = MemoryManager()
+    memory.store_quote(_quote())
+    assert memory.collection.metadata["embedding"] == "hashing:all-MiniLM-L6-v2"
+
+    memory.collection.upsert(ids=["old-space"], documents=["embedded by the old model"])
+
+    monkeypatch.setattr(settings, "EMBEDDING_MODEL", "other-model")
+    reopened = MemoryManager()
+    assert reopened.collection.metadata["embedding"] == "hashing:other-model"
+    # Old-space vectors are gone; the quote was re-embedded from SQLite
+    assert reopened.collection.get()["ids"] == ["quote_1"]
+
+
+def test_reopening_the_store_does_not_reindex_quotes(workspace, monkeypatch):
+    MemoryManager().store_quote(_quote())
+
+    reindexes = []
+    monkeypatch.setattr(MemoryManager, "_reindex_all_quotes", lambda self, *a, **k: reindexes.append(1))
+    reopened = MemoryManager()
+    assert reindexes == []
+    assert reopened.collection.metadata == {"embedding": "hashing:all-MiniLM-L6-v2", "quote_metadata": 2}
+
+
+def test_vector_filters_ignore_case(workspace):
+    memory = MemoryManager()
+    tata = memory.store_quote(_quote())
+    memory.store_quote(_quote(vendor="JSW"))
+    assert memory._vector_search("coil", 10, vendor="TATA steel") == [tata]
+    assert memory.infer_filters("last price from tata steel for hr coil") == {"vendor": "Tata Steel", "material": "HR Coil"}
@@ -0,0 +1,15 @@
+import os
+import subprocess
+import sys
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_importing_the_file_index_tools_touches_no_files(tmp_path):
+    """Like every other subsystem, the content index and the tools sharing its database are built on first use."""
+    code = ("import app.tools.content_index, app.tools.duplicates, app.tools.disk_usage\n"
+            "from app.tools.content_index import content_index\n"
+            "assert not content_index.is_initialized\n")
+    env = {**os.environ, "WORKSPACE_ROOT": str(tmp_path), "PYTHONPATH": BACKEND}
+    subprocess.run([sys.executable, "-c", code], env=env, cwd=str(tmp_path), check=True)
+    assert not os.path.exists(os.path.join(tmp_path, "memory"))
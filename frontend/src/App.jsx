@@ -52,6 +52,7 @@ I'm your **universal operations assistant** with full, autonomous access to your
         }
     ]);
     const [input, setInput] = useState('');
+    const [sessionId, setSessionId] = useState(null);
     const [isDashboardOpen, setIsDashboardOpen] = useState(false);
     const [quotes, setQuotes] = useState([]);
     const [loading, setLoading] = useState(false);
@@ -80,7 +81,7 @@ I'm your **universal operations assistant** with full, autonomous access to your
     };
 
     const fetchQuotes = async () => {
-        try { const res = await axios.get(`${apiUrl}/quotes`); setQuotes(res.data); }
+        try { const res = await axios.get(`${apiUrl}/quotes`, { params: { limit: 200 } }); setQuotes(res.data.items || []); }
         catch (err) { console.error("Fetch error:", err); }
     };
 
@@ -132,10 +133,13 @@ I'm your **universal operations assistant** with full, autonomous access to your
         try {
             const res = await axios.post(`${apiUrl}/chat`, {
                 query: currentInput,
-                history: messages.map(m => ({ role: m.role, content: m.content }))
+                session_id: sessionId,
+                // History is only needed to seed a session the engine doesn't know yet
+                history: sessionId ? [] : messages.map(m => ({ role: m.role, content: m.content }))
             }, {
                 signal: abortControllerRef.current.signal
             });
+            if (res.data.session_id) setSessionId(res.data.session_id);
             setMessages(prev => [...prev, {
                 role: 'assistant',
                 content: res.data.reply,
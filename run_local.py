@@ -8,15 +8,64 @@ def run_command(command):
     print(f"Executing: {command}")
     return subprocess.run(command, shell=True)
 
+def requirements_satisfied(path):
+    """True if every requirement in `path` is already installed at a matching version (no pip, no network)."""
+    from importlib import metadata
+    try:
+        from packaging.requirements import Requirement
+    except ImportError:
+        try:
+            from pip._vendor.packaging.requirements import Requirement
+        except ImportError:
+            return False
+    with open(path) as f:
+        for line in f:
+            line = line.split("#")[0].strip()
+            if not line or line.startswith("-"):
+                continue
+            req = Requirement(line)
+            if req.marker and not req.marker.evaluate():
+                continue
+            try:
+                installed = metadata.version(req.name)
+            except metadata.PackageNotFoundError:
+                return False
+            if req.specifier and not req.specifier.contains(installed, prereleases=True):
+                return False
+    return True
+
+def option(name, default=None):
+    """Value of `--name N` on the command line."""
+    if name in sys.argv[:-1]:
+        return sys.argv[sys.argv.index(name) + 1]
+    return default
+
+def start_chroma_server(env, port=8001):
+    """Shared ChromaDB server over the workspace's vector store, so several workers can use it at once."""
+    chroma_path = subprocess.check_output(
+        [sys.executable, "-c", "from app.core.config import settings; print(settings.CHROMA_PATH)"],
+        cwd="backend", env=env, text=True).strip()
+    print(f"Starting ChromaDB server on localhost:{port} ({chroma_path}) ...")
+    os.makedirs(chroma_path, exist_ok=True)
+    # Run from the memory folder so the server's chroma.log lands next to the data
+    proc = subprocess.Popen([sys.executable, "-m", "chromadb.cli.cli", "run", "--path", chroma_path, "--port", str(port)],
+                            cwd=os.path.dirname(chroma_path))
+    env["CHROMA_SERVER"] = f"localhost:{port}"
+    time.sleep(3)
+    return proc
+
 def main():
     print("🚀 Starting OmniMind Universal Engine...")
     
     # 1. Check for Python
     print("Checking Python environment...")
     
-    # 2. Install dependencies
-    print("Installing/Updating dependencies...")
-    run_command(f"{sys.executable} -m pip install -r backend/requirements.txt")
+    # 2. Install dependencies (only when something is missing or at the wrong version; --install forces it)
+    if "--install" in sys.argv or not requirements_satisfied("backend/requirements.txt"):
+        print("Installing/Updating dependencies...")
+        run_command(f"{sys.executable} -m pip install -r backend/requirements.txt")
+    else:
+        print("Dependencies already satisfied, skipping install.")
     
     # 3. Set environment variables if not present
     if not os.path.exists(".env"):
@@ -25,13 +74,18 @@ def main():
             f.write("DEEPSEEK_API_KEY=your_key_here\n")
         print("Please edit the .env file and add your DEEPSEEK_API_KEY.")
     
-    # 4. Start the backend
-    print("Starting Backend on http://localhost:8000 ...")
+    # 4. Start the backend (--workers N: N processes; one is elected to run the folder watcher)
+    workers = int(option("--workers", os.environ.get("WORKERS", "1")))
+    env = dict(os.environ, WORKERS=str(workers))
+    chroma_proc = None
+    if workers > 1 and not env.get("CHROMA_SERVER"):
+        chroma_proc = start_chroma_server(env)
+    print(f"Starting Backend on http://localhost:8000 with {workers} worker(s) ...")
     
     # We use a subprocess for the backend so we can continue in this script
     backend_proc = subprocess.Popen(
-        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "0.0.0.0", "--port", "8000"],
-        cwd="backend"
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "0.0.0.0", "--port", "8000", "--workers", str(workers)],
+        cwd="backend", env=env
     )
     
     # 5. Open the UI
@@ -53,6 +107,8 @@ def main():
     except KeyboardInterrupt:
         print("\nStopping OmniMind...")
         backend_proc.terminate()
+        if chroma_proc:
+            chroma_proc.terminate()
 
 if __name__ == "__main__":
     main()